@@ -0,0 +1,17 @@
+#!/usr/bin/python3
+"""
+Serves the HTTP JSON API of api/server.py
+
+The server answers from several threads, so the file storage is
+created in thread-safe mode unless HBNB_FILE_THREAD_SAFE is set.
+
+usage: python3 -m api [port [host]]
+"""
+import os
+import sys
+
+os.environ.setdefault('HBNB_FILE_THREAD_SAFE', '1')
+
+from api.server import main  # noqa: E402
+
+main(sys.argv)
@@ -0,0 +1,370 @@
+#!/usr/bin/python3
+"""
+HTTP JSON API over the stored objects
+
+    GET    /api/v1/<class>        objects of the class, see below
+    POST   /api/v1/<class>        creates an object from a JSON object
+    GET    /api/v1/<class>/<id>   the object
+    PUT    /api/v1/<class>/<id>   sets the attributes of a JSON object
+    DELETE /api/v1/<class>/<id>   deletes the object
+
+The classes are those of HBNBCommand.class_mapping. The attributes
+sent must be identifiers that don't start with an underscore and don't
+name a method or a relation. A list takes the
+limit (at most max_limit) and offset query parameters, and any other
+parameter is an attribute the objects must equal, as in storage.find();
+it follows the same rules, and has to be one the class defines.
+It answers {"count": ..., "limit": ..., "offset": ..., "results": [...]}
+where count is the number of matching objects.
+
+Connections are kept alive (HTTP/1.1) and every request is answered by
+a thread of its own. Responses carry an ETag made of the updated_at of
+their objects, and a request whose If-None-Match holds it gets an empty
+304 answer. The JSON text of every object is kept until its updated_at
+changes, so listing an object that didn't change doesn't encode it
+again.
+
+Changes are saved before they are answered; the changes made while a
+save runs are written together by the next one. Unexpected errors are
+answered with a JSON 500, and logged when the server is verbose.
+
+usage: python3 -m api [port [host]]
+"""
+import hashlib
+import json
+import threading
+import traceback
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+from console import HBNBCommand
+from models import storage
+
+PREFIX = "/api/v1/"
+
+
+class APIError(Exception):
+    """Error answered with status and a JSON message"""
+
+    def __init__(self, status, message):
+        """Describes the error"""
+        super().__init__(message)
+        self.status = status
+
+
+class APIServer(ThreadingHTTPServer):
+    """Threaded HTTP server of the API, which keeps the encoded objects
+    and coalesces the saves of its threads
+    """
+
+    daemon_threads = True
+    default_limit = 100
+    max_limit = 1000
+    protected = ('id', 'created_at', 'updated_at', '__class__')
+
+    def __init__(self, address, verbose=False):
+        """Listens on address, a (host, port) pair"""
+        super().__init__(address, APIHandler)
+        self.verbose = verbose
+        self.__bodies = {}
+        self.__saves = threading.Condition()
+        self.__requested = 0
+        self.__written = 0
+        self.__writing = False
+
+    def encode(self, key, obj):
+        """Returns the JSON text of obj, stored under key, as bytes"""
+        updated_at = getattr(obj, 'updated_at', None)
+        cached = self.__bodies.get(key)
+        if cached is not None and cached[0] is obj and \
+                cached[1] == updated_at:
+            return cached[2]
+        # no attribute changes while the object is encoded
+        with storage.changing():
+            body = json.dumps(obj.to_dict()).encode()
+        self.__bodies[key] = (obj, updated_at, body)
+        return body
+
+    def forget(self, key):
+        """Drops the JSON text kept for key"""
+        self.__bodies.pop(key, None)
+
+    def save(self):
+        """Returns once a save started after the call is written"""
+        with self.__saves:
+            self.__requested += 1
+            ticket = self.__requested
+            while self.__writing:
+                self.__saves.wait()
+                if self.__written >= ticket:
+                    return
+            self.__writing = True
+            target = self.__requested
+        written = False
+        try:
+            storage.save()
+            written = True
+        finally:
+            with self.__saves:
+                self.__writing = False
+                if written:
+                    self.__written = target
+                self.__saves.notify_all()
+
+
+class APIHandler(BaseHTTPRequestHandler):
+    """Answers the requests of one connection"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "HBNB"
+    # the headers and the body are two writes, which Nagle's algorithm
+    # would hold until the client acknowledges the first one
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        """Answers an object or a list of objects"""
+        self.__answer(self.__get)
+
+    def do_POST(self):
+        """Creates an object"""
+        self.__answer(self.__post)
+
+    def do_PUT(self):
+        """Updates an object"""
+        self.__answer(self.__put)
+
+    def do_DELETE(self):
+        """Deletes an object"""
+        self.__answer(self.__delete)
+
+    def log_message(self, format, *args):
+        """Logs the requests when the server is verbose"""
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def __answer(self, method):
+        """Calls method with the class, id and query of the request,
+        and sends the (status, body, etag, headers) it returns
+        """
+        try:
+            body = self.__read_body()
+            cls, id, query = self.__route()
+            storage.refresh()
+            status, data, etag, headers = method(cls, id, query, body)
+        except APIError as error:
+            status, etag, headers = error.status, None, {}
+            data = json.dumps({"error": str(error)}).encode()
+        except Exception:
+            self.log_error("%s", traceback.format_exc())
+            status, etag, headers = HTTPStatus.INTERNAL_SERVER_ERROR, None, {}
+            data = json.dumps({"error": "Internal error"}).encode()
+        if self.command == "GET" and etag is not None and \
+                etag in self.__none_match():
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if etag is not None:
+            self.send_header("ETag", etag)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def __route(self):
+        """Returns the class, the id or None, and the query of the path"""
+        url = urlsplit(self.path)
+        if not url.path.startswith(PREFIX):
+            raise APIError(HTTPStatus.NOT_FOUND, "Not found")
+        parts = url.path[len(PREFIX):].split('/')
+        if len(parts) > 2 or not parts[-1]:
+            raise APIError(HTTPStatus.NOT_FOUND, "Not found")
+        cls = HBNBCommand.class_mapping.get(parts[0])
+        if cls is None:
+            raise APIError(HTTPStatus.NOT_FOUND, "Unknown class")
+        id = parts[1] if len(parts) == 2 else None
+        return cls, id, dict(parse_qsl(url.query))
+
+    def __read_body(self):
+        """Returns the JSON object sent with the request, or None"""
+        length = self.headers.get("Content-Length") or "0"
+        if not length.isdigit():
+            self.close_connection = True
+            raise APIError(HTTPStatus.BAD_REQUEST, "Bad Content-Length")
+        length = int(length)
+        if not length:
+            return None
+        try:
+            body = json.loads(self.rfile.read(length))
+        except ValueError:
+            raise APIError(HTTPStatus.BAD_REQUEST, "Not a JSON")
+        if not isinstance(body, dict):
+            raise APIError(HTTPStatus.BAD_REQUEST, "Not a JSON object")
+        return body
+
+    def __none_match(self):
+        """Returns the ETags of the If-None-Match header"""
+        value = self.headers.get("If-None-Match")
+        if not value:
+            return ()
+        return [tag.strip() for tag in value.split(',')]
+
+    def __object(self, cls, id):
+        """Returns the stored object of cls with id"""
+        obj = storage.get(cls, id)
+        if obj is None:
+            raise APIError(HTTPStatus.NOT_FOUND, "Not found")
+        return obj
+
+    def __one(self, obj, status=HTTPStatus.OK, headers=None):
+        """Returns the answer holding obj"""
+        key = f"{type(obj).__name__}.{obj.id}"
+        return (status, self.server.encode(key, obj), etag(obj),
+                headers or {})
+
+    def __get(self, cls, id, query, body):
+        """Answers an object or a page of the objects of cls"""
+        if id is not None:
+            return self.__one(self.__object(cls, id))
+        limit = number(query.pop('limit', None), self.server.default_limit)
+        offset = number(query.pop('offset', None), 0)
+        limit = min(limit, self.server.max_limit)
+        filters = {name: typed(cls, known(cls, name), value)
+                   for name, value in query.items()}
+        if filters:
+            objs = storage.find(cls, **filters)
+        else:
+            objs = list(storage.all(cls).values())
+        page = objs[offset:offset + limit]
+        tags = hashlib.md5(str(len(objs)).encode())
+        results = []
+        for obj in page:
+            key = f"{type(obj).__name__}.{obj.id}"
+            results.append(self.server.encode(key, obj))
+            tags.update(f" {key} {etag(obj)}".encode())
+        data = (f'{{"count": {len(objs)}, "limit": {limit}, '
+                f'"offset": {offset}, "results": [').encode() + \
+            b", ".join(results) + b"]}"
+        return HTTPStatus.OK, data, f'"{tags.hexdigest()}"', {}
+
+    def __post(self, cls, id, query, body):
+        """Creates an object of cls from the request body"""
+        if id is not None:
+            raise APIError(HTTPStatus.METHOD_NOT_ALLOWED, "Not allowed")
+        obj = cls(**writable(cls, body or {}))
+        self.server.save()
+        return self.__one(obj, HTTPStatus.CREATED, {
+            "Location": f"{PREFIX}{cls.__name__}/{obj.id}"})
+
+    def __put(self, cls, id, query, body):
+        """Sets the attributes of the request body on an object"""
+        if id is None:
+            raise APIError(HTTPStatus.METHOD_NOT_ALLOWED, "Not allowed")
+        if body is None:
+            raise APIError(HTTPStatus.BAD_REQUEST, "Not a JSON")
+        attributes = writable(cls, body)
+        obj = self.__object(cls, id)
+        for name, value in attributes.items():
+            setattr(obj, name, value)
+        obj.updated_at = datetime.now()
+        self.server.save()
+        return self.__one(obj)
+
+    def __delete(self, cls, id, query, body):
+        """Deletes an object"""
+        if id is None:
+            raise APIError(HTTPStatus.METHOD_NOT_ALLOWED, "Not allowed")
+        obj = self.__object(cls, id)
+        storage.delete(obj)
+        self.server.forget(f"{cls.__name__}.{id}")
+        self.server.save()
+        return HTTPStatus.OK, b"{}", None, {}
+
+
+def etag(obj):
+    """Returns the ETag of obj, made of its updated_at"""
+    updated_at = getattr(obj, 'updated_at', None)
+    if updated_at is None:
+        return None
+    return f'"{updated_at.isoformat()}"'
+
+
+def number(value, default):
+    """Returns the non negative integer of a query parameter"""
+    if value is None:
+        return default
+    if not value.isdigit():
+        raise APIError(HTTPStatus.BAD_REQUEST, "Not a positive integer")
+    return int(value)
+
+
+def typed(cls, name, value):
+    """Converts the text of a filter to the type of the class default
+    of the attribute name, so that "4" finds max_guest 4
+    """
+    default = cls._defaults.get(name, getattr(cls, name, None))
+    if isinstance(default, (int, float)):
+        try:
+            return type(default)(value)
+        except ValueError:
+            raise APIError(HTTPStatus.BAD_REQUEST, f"Not a number: {name}")
+    return value
+
+
+def writable(cls, attributes):
+    """Returns the attributes that can be set on an object of cls,
+    leaving out the protected ones
+    """
+    settable = {}
+    for name, value in attributes.items():
+        if name in APIServer.protected:
+            continue
+        settable[checked(cls, name)] = value
+    return settable
+
+
+def checked(cls, name):
+    """Returns name if it is an identifier that doesn't start with an
+    underscore and doesn't name a method or a relation of cls
+    """
+    if not name.isidentifier() or name.startswith('_'):
+        raise APIError(HTTPStatus.BAD_REQUEST,
+                       f"Invalid attribute name: {name}")
+    default = getattr(cls, name, None)
+    if isinstance(default, property) or callable(default):
+        raise APIError(HTTPStatus.BAD_REQUEST,
+                       f"Read-only attribute: {name}")
+    return name
+
+
+def known(cls, name):
+    """Returns the name of a filter if it is checked() and an attribute
+    that every object of cls has
+    """
+    checked(cls, name)
+    if name not in cls._slot_names and name not in cls._defaults and \
+            not hasattr(cls, name):
+        raise APIError(HTTPStatus.BAD_REQUEST,
+                       f"Unknown attribute: {name}")
+    return name
+
+
+def main(argv):
+    """Serves the API until interrupted"""
+    port = int(argv[1]) if len(argv) > 1 else 5000
+    host = argv[2] if len(argv) > 2 else "127.0.0.1"
+    server = APIServer((host, port), verbose=True)
+    print("listening on {}:{}".format(*server.server_address[:2]),
+          flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        storage.save()
+        storage.close()
@@ -0,0 +1,129 @@
+#!/usr/bin/python3
+"""
+Starts the API server on a file of Places in another process and runs
+client threads against it for each kind of request, printing the
+requests per second and the median and 99th percentile latencies
+
+usage: ./benchmarks/api_benchmark.py [number of Places [clients]]
+"""
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(tempfile.mkdtemp())
+
+from models import storage  # noqa: E402
+from models.place import Place  # noqa: E402
+
+DURATION = 2
+
+
+def get(connection, ids, etags):
+    """Reads a Place"""
+    connection.request("GET", "/api/v1/Place/" + random.choice(ids))
+    return connection.getresponse()
+
+
+def get_cached(connection, ids, etags):
+    """Reads a Place the client already has"""
+    id = random.choice(ids)
+    connection.request("GET", "/api/v1/Place/" + id,
+                       headers={"If-None-Match": etags.get(id, "")})
+    response = connection.getresponse()
+    etags[id] = response.getheader("ETag")
+    return response
+
+
+def get_closed(connection, ids, etags):
+    """Reads a Place on a connection of its own"""
+    connection.close()
+    connection.request("GET", "/api/v1/Place/" + random.choice(ids),
+                       headers={"Connection": "close"})
+    return connection.getresponse()
+
+
+def list_page(connection, ids, etags):
+    """Reads a page of 20 Places of a city"""
+    connection.request("GET", "/api/v1/Place?limit=20&city_id=city%20" +
+                       str(random.randrange(10)))
+    return connection.getresponse()
+
+
+def put(connection, ids, etags):
+    """Updates a Place"""
+    connection.request("PUT", "/api/v1/Place/" + random.choice(ids),
+                       json.dumps({"max_guest": random.randrange(10)}))
+    return connection.getresponse()
+
+
+def client(address, request, ids, stop, latencies):
+    """Sends requests until stop is set"""
+    connection = http.client.HTTPConnection(*address)
+    etags = {}
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = request(connection, ids, etags)
+        response.read()
+        assert response.status in (200, 304), response.status
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+
+
+def run(address, request, ids, clients):
+    """Runs clients threads for DURATION seconds, returns the requests
+    per second and the median and 99th percentile latencies in ms
+    """
+    stop = threading.Event()
+    latencies = []
+    threads = [threading.Thread(target=client, args=(
+        address, request, ids, stop, latencies)) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(DURATION)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return (len(latencies) / DURATION,
+            latencies[len(latencies) // 2] * 1000,
+            latencies[int(len(latencies) * 0.99)] * 1000)
+
+
+def main(size, clients):
+    """Runs the benchmark on size Places with clients threads"""
+    for i in range(size):
+        place = Place()
+        place.city_id = f"city {i % 10}"
+    ids = [place.id for place in storage.all(Place).values()]
+    storage.save()
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "api", "0"], stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL, text=True,
+        env=dict(os.environ, PYTHONPATH=ROOT))
+    try:
+        host, _, port = server.stdout.readline().split()[-1].rpartition(':')
+        address = (host, int(port))
+        print(f"{size} Places, {clients} clients")
+        print(f"{'request':>12}{'requests/s':>12}{'p50 (ms)':>10}"
+              f"{'p99 (ms)':>10}")
+        for request in (get, get_cached, get_closed, list_page, put):
+            rate, p50, p99 = run(address, request, ids, clients)
+            print(f"{request.__name__:>12}{rate:12.0f}{p50:10.2f}"
+                  f"{p99:10.2f}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 8)
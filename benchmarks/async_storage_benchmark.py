@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+"""
+Runs request handlers on an event loop that each change a Place and
+save, calling storage.save() directly or awaiting AsyncFileStorage.save(),
+and prints the requests per second and the longest time the event loop
+was blocked, measured by a task that wakes up every millisecond
+
+usage: ./benchmarks/async_storage_benchmark.py [number of Places]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+os.chdir(tempfile.mkdtemp())
+# the facade writes in the executor while the handlers change the Places
+os.environ['HBNB_FILE_THREAD_SAFE'] = '1'
+
+from models import storage  # noqa: E402
+from models.engine.async_storage import AsyncFileStorage  # noqa: E402
+from models.place import Place  # noqa: E402
+
+HANDLERS = (1, 10, 100)
+REQUESTS = 200
+
+
+async def watch(stop, lags):
+    """Records how late the event loop wakes this task up"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - start - 0.001)
+
+
+async def run(handlers, places, save):
+    """Runs REQUESTS requests on handlers concurrent handlers, returns
+    the requests per second and the longest event loop lag in ms
+    """
+    stop = asyncio.Event()
+    lags = []
+    watcher = asyncio.ensure_future(watch(stop, lags))
+    await asyncio.sleep(0.01)
+
+    async def handle(first):
+        for i in range(first, REQUESTS, handlers):
+            places[i % len(places)].max_guest = i
+            await save()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[handle(first) for first in range(handlers)])
+    duration = time.perf_counter() - start
+    stop.set()
+    await watcher
+    return REQUESTS / duration, max(lags) * 1000
+
+
+def main(size):
+    """Runs the benchmark with size Places"""
+    places = [Place() for _ in range(size)]
+    storage.save()
+    facade = AsyncFileStorage()
+
+    async def blocking_save():
+        storage.save()
+
+    print(f"{'handlers':>10}{'save':>8}{'requests/s':>12}"
+          f"{'max lag (ms)':>14}")
+    for handlers in HANDLERS:
+        for name, save in (('sync', blocking_save), ('async', facade.save)):
+            rate, lag = asyncio.run(run(handlers, places, save))
+            print(f"{handlers:>10}{name:>8}{rate:12.1f}{lag:14.1f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,74 @@
+#!/usr/bin/python3
+"""
+Compares the size, save time, reload time and time of the first get()
+after the reload of the json, ndjson, binary and indexed FileStorage
+formats
+
+usage: ./benchmarks/format_benchmark.py [number of records]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+os.chdir(tempfile.mkdtemp())
+
+from models.engine.file_storage import FileStorage  # noqa: E402
+from models.place import Place  # noqa: E402
+from models.review import Review  # noqa: E402
+
+
+def populate(count):
+    """Creates count Places and as many Reviews"""
+    for i in range(count):
+        place = Place()
+        place.name = f"Place {i}"
+        place.city_id = "0001"
+        place.description = "A cozy place near the beach"
+        place.price_by_night = i % 300
+        place.max_guest = i % 8
+        place.latitude = 37.77 + i * 1e-6
+        place.longitude = -122.41
+        review = Review()
+        review.place_id = place.id
+        review.text = "Great stay"
+
+
+def main(count):
+    """Runs the benchmark with count Places and count Reviews"""
+    populate(count)
+    objects = FileStorage._FileStorage__objects
+    print(f"{len(objects)} records")
+    key = next(iter(objects))
+    print(f"{'format':<8}{'size (MB)':>12}{'save (s)':>12}{'reload (s)':>12}"
+          f"{'get (ms)':>12}")
+    for format in ('json', 'ndjson', 'binary', 'indexed'):
+        FileStorage._FileStorage__file_path = f"file.{format}"
+        FileStorage._FileStorage__objects = objects
+        FileStorage._FileStorage__fragments = {}
+        storage = FileStorage(format=format)
+        # index the objects again before timing
+        storage.count()
+
+        start = time.perf_counter()
+        storage.save()
+        save_time = time.perf_counter() - start
+
+        FileStorage._FileStorage__objects = {}
+        start = time.perf_counter()
+        storage.reload()
+        reload_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        storage.get(Place, key.partition('.')[2])
+        get_time = (time.perf_counter() - start) * 1000
+
+        size = os.path.getsize(f"file.{format}") / 2 ** 20
+        print(f"{format:<8}{size:12.2f}{save_time:12.3f}{reload_time:12.3f}"
+              f"{get_time:12.3f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
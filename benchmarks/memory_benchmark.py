@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+"""
+Measures the memory held per stored Review and Place, with the regular
+models and with the compact models of HBNB_COMPACT_MODELS=1
+
+usage: ./benchmarks/memory_benchmark.py [number of records]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEASURE = """
+import sys
+import tracemalloc
+from models import storage
+from models.place import Place
+from models.review import Review
+
+count = int(sys.argv[1])
+for cls, record in ((Review, {'place_id': '0001', 'user_id': '0002',
+                              'text': 'Great stay'}),
+                    (Place, {'city_id': '0001', 'user_id': '0002',
+                             'name': 'Cozy', 'max_guest': 4,
+                             'price_by_night': 120, 'latitude': 37.77,
+                             'longitude': -122.41})):
+    record = dict(record, __class__=cls.__name__,
+                  created_at='2024-01-01T00:00:00.000001',
+                  updated_at='2024-01-01T00:00:00.000001')
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(count):
+        storage.new(cls.from_dict(dict(record, id=f'{i:08d}')))
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(cls.__name__, (after - before) / count)
+"""
+
+
+def measure(count, compact):
+    """Returns the bytes per object of each class in a new process"""
+    env = dict(os.environ, PYTHONPATH=ROOT,
+               HBNB_COMPACT_MODELS='1' if compact else '0')
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output = subprocess.run(
+            [sys.executable, '-c', MEASURE, str(count)], env=env,
+            cwd=temp_dir, check=True, capture_output=True, text=True).stdout
+    return dict(line.split() for line in output.splitlines())
+
+
+def main(count):
+    """Runs the benchmark with count objects of each class"""
+    regular = measure(count, False)
+    compact = measure(count, True)
+    print(f"{count} objects per class, bytes per stored object")
+    print(f"{'class':<8}{'regular':>10}{'compact':>10}{'saved':>8}")
+    for name in regular:
+        before, after = float(regular[name]), float(compact[name])
+        print(f"{name:<8}{before:10.0f}{after:10.0f}"
+              f"{1 - after / before:8.0%}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
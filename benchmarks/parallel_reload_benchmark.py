@@ -0,0 +1,49 @@
+#!/usr/bin/python3
+"""
+Times FileStorage.reload() of a sharded store and of an ndjson file
+with an increasing number of worker processes
+
+usage: ./benchmarks/parallel_reload_benchmark.py [number of records]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+os.chdir(tempfile.mkdtemp())
+
+from models.engine.file_storage import FileStorage  # noqa: E402
+from models.place import Place  # noqa: E402
+
+
+def reload_time(**options):
+    """Returns the duration of a reload() that builds every object"""
+    FileStorage._FileStorage__objects = {}
+    storage = FileStorage(**options)
+    start = time.perf_counter()
+    storage.reload()
+    storage.count()
+    return time.perf_counter() - start
+
+
+def main(count):
+    """Runs the benchmark with count records"""
+    for i in range(count):
+        place = Place()
+        place.name = f"Place {i}"
+        place.price_by_night = i % 300
+    FileStorage(sharded=True, buckets=16).save()
+    FileStorage(format='ndjson').save()
+
+    print(f"{count} records, {os.cpu_count()} cpus")
+    print(f"{'workers':<8}{'shards (s)':>12}{'ndjson (s)':>12}")
+    for workers in (None, 2, 4, 8):
+        sharded = reload_time(sharded=True, buckets=16, workers=workers)
+        ndjson = reload_time(format='ndjson', workers=workers)
+        print(f"{workers or 1:<8}{sharded:12.3f}{ndjson:12.3f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,109 @@
+#!/usr/bin/python3
+"""
+Times reading the reviews of every place of every city of every state
+through the relation accessors, one lookup per object (N+1), against
+the same walk after storage.prefetch() of each level, with and without
+the attribute indexes of FileStorage (without them every lookup scans
+the class, as on storages that have no such index)
+
+usage: ./benchmarks/relations_benchmark.py [largest number of Places]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+os.chdir(tempfile.mkdtemp())
+
+from models import storage  # noqa: E402
+from models.city import City  # noqa: E402
+from models.engine.base_storage import BaseStorage  # noqa: E402
+from models.engine.file_storage import FileStorage  # noqa: E402
+from models.place import Place  # noqa: E402
+from models.review import Review  # noqa: E402
+from models.state import State  # noqa: E402
+
+STATES = 50
+CITIES_PER_STATE = 10
+REVIEWS_PER_PLACE = 2
+
+
+def walk():
+    """Returns the number of reviews reached through the accessors"""
+    count = 0
+    for state in storage.all(State).values():
+        for city in state.related_cities:
+            for place in city.related_places:
+                count += len(place.related_reviews)
+    return count
+
+
+def walk_prefetched():
+    """Same as walk(), prefetching each level first"""
+    states = list(storage.all(State).values())
+    cities = [city for related in
+              storage.prefetch(states, 'related_cities').values()
+              for city in related]
+    places = [place for related in
+              storage.prefetch(cities, 'related_places').values()
+              for place in related]
+    storage.prefetch(places, 'related_reviews')
+    return walk()
+
+
+def timed(function):
+    """Returns the duration of function in ms and its result"""
+    storage.forget_prefetched()
+    start = time.perf_counter()
+    result = function()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def fill(places):
+    """Stores the states, cities, places and their reviews"""
+    random.seed(0)
+    cities = []
+    for i in range(STATES):
+        state = State.from_dict({'__class__': 'State', 'id': f's{i}'})
+        storage.new(state)
+        for j in range(CITIES_PER_STATE):
+            city = City.from_dict({'__class__': 'City', 'id': f'c{i}.{j}',
+                                   'state_id': state.id})
+            storage.new(city)
+            cities.append(city)
+    for i in range(places):
+        place = Place.from_dict({'__class__': 'Place', 'id': f'p{i}',
+                                 'city_id': random.choice(cities).id})
+        storage.new(place)
+        for j in range(REVIEWS_PER_PLACE):
+            storage.new(Review.from_dict({'__class__': 'Review',
+                                          'id': f'r{i}.{j}',
+                                          'place_id': place.id}))
+
+
+def main(largest):
+    """Runs the benchmark up to largest Places"""
+    print(f"{'places':>10}{'N+1 (ms)':>12}{'prefetch':>12}"
+          f"{'N+1 scan':>12}{'prefetch scan':>15}")
+    size = 1000
+    while size <= largest:
+        FileStorage._FileStorage__objects = {}
+        fill(size)
+        loop, expected = timed(walk)
+        batch, found = timed(walk_prefetched)
+        assert found == expected == size * REVIEWS_PER_PLACE
+        indexed = FileStorage.group_by
+        FileStorage.group_by = BaseStorage.group_by
+        loop_scan, _ = timed(walk)
+        batch_scan, _ = timed(walk_prefetched)
+        FileStorage.group_by = indexed
+        print(f"{size:>10}{loop:12.1f}{batch:12.1f}"
+              f"{loop_scan:12.1f}{batch_scan:15.1f}")
+        size *= 10
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+"""
+Compares building Places with Place(**kwargs) and Place.from_dict,
+and times a full FileStorage.reload() of the same records
+
+usage: ./benchmarks/reload_benchmark.py [number of records]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+os.chdir(tempfile.mkdtemp())
+
+from models import storage  # noqa: E402
+from models.engine.file_storage import FileStorage  # noqa: E402
+from models.place import Place  # noqa: E402
+
+
+def timed(label, function, count):
+    """Runs function and prints its duration and rate"""
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24}{elapsed:8.3f} s {count / elapsed:12.0f} records/s")
+
+
+def main(count):
+    """Runs the benchmark with count records"""
+    for i in range(count):
+        place = Place()
+        place.name = f"Place {i}"
+        place.price_by_night = i % 300
+    records = [obj.to_dict() for obj in storage.all().values()]
+    storage.save()
+
+    def build_kwargs():
+        for record in records:
+            Place(**record)
+
+    def build_from_dict():
+        for record in records:
+            Place.from_dict(record)
+
+    def reload():
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+
+    print(f"{count} records")
+    timed("Place(**kwargs)", build_kwargs, count)
+    timed("Place.from_dict", build_from_dict, count)
+    timed("FileStorage.reload()", reload, count)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
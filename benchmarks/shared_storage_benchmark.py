@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+"""
+Runs 1 to 8 processes that each create and save objects in the same
+JSON file, in shared mode and without it, and prints the saves per
+second and the number of objects missing from the file at the end
+
+usage: ./benchmarks/shared_storage_benchmark.py [saves per process]
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = """
+import sys
+from models.user import User
+for i in range(int(sys.argv[1])):
+    user = User()
+    user.first_name = f"worker {i}"
+    user.save()
+"""
+
+
+def run(processes, saves, shared):
+    """Returns the saves per second of processes writers and the number
+    of objects lost
+    """
+    directory = tempfile.mkdtemp()
+    env = dict(os.environ, PYTHONPATH=ROOT,
+               HBNB_FILE_SHARED='1' if shared else '0')
+    env.pop('HBNB_TYPE_STORAGE', None)
+    start = time.perf_counter()
+    workers = [
+        subprocess.Popen([sys.executable, '-c', SCRIPT, str(saves)],
+                         env=env, cwd=directory,
+                         stderr=subprocess.DEVNULL)
+        for _ in range(processes)
+        ]
+    for worker in workers:
+        worker.wait()
+    duration = time.perf_counter() - start
+    with open(os.path.join(directory, 'file.json'), 'r') as f:
+        stored = len(json.load(f))
+    return processes * saves / duration, processes * saves - stored
+
+
+def main(saves):
+    """Runs the benchmark with saves saves per process"""
+    print(f"{saves} saves per process, {os.cpu_count()} cpus")
+    print(f"{'processes':<10}{'shared/s':>10}{'lost':>6}"
+          f"{'unshared/s':>12}{'lost':>6}")
+    for processes in (1, 2, 4, 8):
+        shared, shared_lost = run(processes, saves, True)
+        unshared, unshared_lost = run(processes, saves, False)
+        print(f"{processes:<10}{shared:10.0f}{shared_lost:6}"
+              f"{unshared:12.0f}{unshared_lost:6}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
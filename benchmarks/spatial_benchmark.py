@@ -0,0 +1,54 @@
+#!/usr/bin/python3
+"""
+Times places_within() on the grid index of FileStorage against a scan
+of every Place, for growing numbers of Places spread over the US
+
+usage: ./benchmarks/spatial_benchmark.py [largest number of Places]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+os.chdir(tempfile.mkdtemp())
+
+from models import storage  # noqa: E402
+from models.engine.base_storage import BaseStorage  # noqa: E402
+from models.place import Place  # noqa: E402
+
+QUERIES = 20
+
+
+def timed(function):
+    """Returns the mean duration of function over QUERIES calls, in ms"""
+    random.seed(1)
+    start = time.perf_counter()
+    for _ in range(QUERIES):
+        function(random.uniform(25, 49), random.uniform(-124, -67), 10)
+    return (time.perf_counter() - start) / QUERIES * 1000
+
+
+def main(largest):
+    """Runs the benchmark up to largest Places"""
+    print(f"{'places':>10}{'grid (ms)':>12}{'scan (ms)':>12}")
+    random.seed(0)
+    count = 0
+    size = 1000
+    while size <= largest:
+        for i in range(count, size):
+            storage.new(Place.from_dict({
+                '__class__': 'Place', 'id': f'{i:08d}',
+                'latitude': random.uniform(25, 49),
+                'longitude': random.uniform(-124, -67)}))
+        count = size
+        grid = timed(storage.places_within)
+        scan = timed(lambda *args: BaseStorage.places_within(storage, *args))
+        print(f"{count:>10}{grid:12.3f}{scan:12.1f}")
+        size *= 10
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+"""
+Runs reader threads querying a thread-safe FileStorage while two writer
+threads change a Place every millisecond and a third one saves in a
+loop, and prints the queries and changes per second and the slowest
+change
+
+usage: ./benchmarks/thread_benchmark.py [number of Places]
+"""
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+os.chdir(tempfile.mkdtemp())
+os.environ['HBNB_FILE_THREAD_SAFE'] = '1'
+
+from models import storage  # noqa: E402
+from models.place import Place  # noqa: E402
+
+DURATION = 2
+WRITERS = 2
+PAUSE = 0.001
+
+
+def read(stop, counts):
+    """Queries the Places until stop is set"""
+    ids = [place.id for place in storage.all(Place).values()]
+    count = 0
+    while not stop.is_set():
+        storage.get(Place, random.choice(ids))
+        storage.find(Place, city_id=f"city {random.randrange(100)}")
+        storage.select(Place, max_guest=(9, None), price_by_night=(0, 10))
+        count += 3
+    counts.append(count)
+
+
+def write(stop, counts, latencies):
+    """Changes Places until stop is set"""
+    places = list(storage.all(Place).values())
+    count = 0
+    while not stop.is_set():
+        place = random.choice(places)
+        start = time.perf_counter()
+        place.max_guest = random.randrange(10)
+        latencies.append(time.perf_counter() - start)
+        count += 1
+        time.sleep(PAUSE)
+    counts.append(count)
+
+
+def save(stop, counts):
+    """Saves until stop is set"""
+    count = 0
+    while not stop.is_set():
+        storage.save()
+        count += 1
+    counts.append(count)
+
+
+def run(readers):
+    """Returns the queries/s, changes/s, saves and slowest change in ms
+    with readers reader threads
+    """
+    stop = threading.Event()
+    reads, writes, saves, latencies = [], [], [], []
+    threads = [threading.Thread(target=read, args=(stop, reads))
+               for _ in range(readers)]
+    threads.extend(threading.Thread(target=write,
+                                    args=(stop, writes, latencies))
+                   for _ in range(WRITERS))
+    threads.append(threading.Thread(target=save, args=(stop, saves)))
+    for thread in threads:
+        thread.start()
+    time.sleep(DURATION)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return (sum(reads) / DURATION, sum(writes) / DURATION, sum(saves),
+            max(latencies) * 1000)
+
+
+def main(count):
+    """Runs the benchmark with count Places"""
+    random.seed(0)
+    for i in range(count):
+        place = Place()
+        place.city_id = f"city {i % 100}"
+        place.max_guest = i % 10
+        place.price_by_night = i % 300
+    storage.save()
+    print(f"{count} places, {WRITERS} writers and a saver, "
+          f"{os.cpu_count()} cpus")
+    print(f"{'readers':<8}{'queries/s':>11}{'changes/s':>11}{'saves':>7}"
+          f"{'max change (ms)':>17}")
+    for readers in (1, 2, 4, 8, 16):
+        queries, changes, saves, slowest = run(readers)
+        print(f"{readers:<8}{queries:11.0f}{changes:11.0f}{saves:7}"
+              f"{slowest:17.1f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -1,9 +1,14 @@
 #!/usr/bin/python3
 """Contains the entry point of the command interpreter"""
 import cmd
+import json
 import shlex
+import time
+import uuid
+from datetime import datetime
 from models import storage
 from models.base_model import BaseModel
+from models.engine.spatial import valid_position, valid_radius
 from models.user import User
 from models.place import Place
 from models.city import City
@@ -35,6 +40,8 @@ class HBNBCommand(cmd.Cmd):
         'count'
     ]
 
+    import_batch_size = 1000
+
     class_mapping = {
         'BaseModel': BaseModel,
         'User': User,
@@ -53,15 +60,14 @@ class HBNBCommand(cmd.Cmd):
         """Do nothing when an empty line is entered"""
         pass
 
+    def precmd(self, line):
+        """Reads the changes saved by other processes before a command"""
+        storage.refresh()
+        return line
+
     def do_count(self, cls_name):
         """Counts the number of instances of a class"""
-        count = 0
-        all_objs = storage.all()
-        for key, value in all_objs.items():
-            class_name = key.split('.')
-            if class_name[0] == cls_name:
-                count += 1
-        print(count)
+        print(storage.count(cls_name))
 
     def do_create(self, args):
         """Creates an instance according to a given class with attributes"""
@@ -108,14 +114,12 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
         else:
             i_id = args[1].strip('"')
-            all_objs = storage.all()
+            value = storage.get(class_name, i_id)
 
-            for value in all_objs.values():
-                if value.__class__.__name__ == class_name and value.id == i_id:
-                    print(value)
-                    return
-
-            print("** no instance found **")
+            if value is None:
+                print("** no instance found **")
+            else:
+                print(value)
 
     def do_destroy(self, arg):
         """
@@ -136,19 +140,13 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
         else:
             instance_id = args[1].strip('"')
-            all_objs = storage.all()
-
-            for key, value in all_objs.items():
-                ob_name = value.__class__.__name__
-                ob_id = value.id
-
-                if ob_name == class_name and ob_id == instance_id:
-                    del value
-                    del storage._FileStorage__objects[key]
-                    storage.save()
-                    return
+            value = storage.get(class_name, instance_id)
 
-            print("** no instance found **")
+            if value is None:
+                print("** no instance found **")
+            else:
+                storage.delete(value)
+                storage.save()
 
     def do_all(self, arg):
         """
@@ -166,14 +164,9 @@ class HBNBCommand(cmd.Cmd):
         if class_name not in HBNBCommand.__allowed_classes:
             print("** class doesn't exist **")
         else:
-            all_objs = storage.all()
-            list_instances = []
-
-            for key, value in all_objs.items():
-                ob_name = value.__class__.__name__
-
-                if ob_name == class_name:
-                    list_instances.append(str(value))
+            list_instances = [
+                str(value) for value in storage.all(class_name).values()
+            ]
 
             print(list_instances)
 
@@ -198,22 +191,21 @@ class HBNBCommand(cmd.Cmd):
         elif len(args) < 2:
             print("** instance id missing **")
         else:
-            all_objs = storage.all()
-            for key, objc in all_objs.items():
-                ob_name = objc.__class__.__name__
-                ob_id = objc.id
-
-                if ob_name == args[0] and ob_id == args[1].strip('"'):
-                    if len(args) < 3:
-                        print("** attribute name missing **")
-                    elif len(args) < 4:
-                        print("** value missing **")
-                    else:
-                        setattr(objc, args[2], args[3])
-                        storage.save()
+            objc = storage.get(args[0], args[1].strip('"'))
+
+            if objc is None:
+                print("** no instance found **")
+            elif len(args) < 3:
+                print("** attribute name missing **")
+            elif len(args) < 4:
+                print("** value missing **")
+            else:
+                try:
+                    setattr(objc, args[2], args[3])
+                except (AttributeError, TypeError):
+                    print("** attribute can't be set **")
                     return
-
-            print("** no instance found **")
+                objc.save()
 
     def strip_clean(self, args):
         """strips the argument and return a string of command
@@ -244,7 +236,14 @@ class HBNBCommand(cmd.Cmd):
         """
         my_list = line.split('.')
         if len(my_list) >= 2:
-            if my_list[1] == "all()":
+            if my_list[1][:4] == "near":
+                # the coordinates have dots of their own
+                arguments = line.partition('.')[2]
+                arguments = arguments[arguments.find('(') + 1:
+                                      arguments.rfind(')')]
+                self.do_near(my_list[0] + ' ' +
+                             ' '.join(arguments.split(',')))
+            elif my_list[1] == "all()":
                 self.do_all(my_list[0])
             elif my_list[1] == "count()":
                 self.do_count(my_list[0])
@@ -255,7 +254,6 @@ class HBNBCommand(cmd.Cmd):
             elif my_list[1][:6] == "update":
                 args = self.strip_clean(my_list)
                 if isinstance(args, list):
-                    obj = storage.all()
                     key = args[0] + ' ' + args[1]
                     for k, v in args[2].items():
                         self.do_update(key + ' "{}" "{}"'.format(k, v))
@@ -264,12 +262,157 @@ class HBNBCommand(cmd.Cmd):
         else:
             cmd.Cmd.default(self, line)
 
+    def do_import(self, arg):
+        """
+        Loads instances of a class from a file holding one
+        JSON dictionary per line: import <class name> <file name>
+        Inside a transaction, an invalid record only undoes the import.
+        """
+        args = shlex.split(arg)
+        class_name = self.__check_file_args(args)
+        if class_name is None:
+            return
+
+        start = time.perf_counter()
+        count = 0
+        selected_model = HBNBCommand.class_mapping[class_name]
+        try:
+            f = open(args[1], 'r')
+        except OSError:
+            print("** file doesn't exist **")
+            return
+        try:
+            with f, storage.transaction():
+                for line in f:
+                    if not line.strip():
+                        continue
+                    count += 1
+                    record = json.loads(line)
+                    if record.pop('__class__', class_name) != class_name:
+                        raise ValueError("class mismatch")
+                    if 'id' not in record:
+                        record['id'] = str(uuid.uuid4())
+                    if 'created_at' not in record:
+                        record['created_at'] = datetime.now().isoformat()
+                    record.setdefault('updated_at', record['created_at'])
+                    storage.new(selected_model.from_dict(record))
+                    if count % HBNBCommand.import_batch_size == 0:
+                        storage.save()
+                storage.save()
+        except (ValueError, TypeError, AttributeError):
+            print(f"** invalid record {count} **")
+            return
+        self.__report("imported", count, class_name, start)
+
+    def do_export(self, arg):
+        """
+        Writes all instances of a class to a file, one
+        JSON dictionary per line: export <class name> <file name>
+        """
+        args = shlex.split(arg)
+        class_name = self.__check_file_args(args)
+        if class_name is None:
+            return
+
+        start = time.perf_counter()
+        count = 0
+        with open(args[1], 'w') as f:
+            for count, value in enumerate(
+                    storage.all(class_name).values(), 1):
+                f.write(json.dumps(value.to_dict()) + "\n")
+        self.__report("exported", count, class_name, start)
+
+    def do_near(self, arg):
+        """
+        Prints the Places at most <km> kilometers away from a point,
+        the closest first: near Place <latitude> <longitude> <km>
+        """
+        args = arg.split()
+        if len(args) == 0:
+            print("** class name missing **")
+        elif args[0] not in HBNBCommand.__allowed_classes:
+            print("** class doesn't exist **")
+        elif args[0] != 'Place':
+            print("** class has no location **")
+        elif len(args) < 4:
+            print("** coordinates missing **")
+        else:
+            try:
+                lat, lon, km = (float(value) for value in args[1:4])
+            except ValueError:
+                print("** invalid coordinates **")
+                return
+            if not valid_position(lat, lon):
+                print("** invalid coordinates **")
+                return
+            if not valid_radius(km):
+                print("** invalid distance **")
+                return
+            print([str(value)
+                   for value in storage.places_within(lat, lon, km)])
+
+    def do_search(self, arg):
+        """
+        Prints the ids of the instances of a class holding words of the
+        terms, the best match first: search <class name> "<terms>"
+        """
+        args = shlex.split(arg)
+        if len(args) == 0:
+            print("** class name missing **")
+        elif args[0] not in HBNBCommand.__allowed_classes:
+            print("** class doesn't exist **")
+        elif len(args) == 1:
+            print("** search terms missing **")
+        else:
+            print(storage.search(args[0], " ".join(args[1:])))
+
+    def __check_file_args(self, args):
+        """Returns the class name of an import or export command,
+        or None after printing the error
+        """
+        if len(args) == 0:
+            print("** class name missing **")
+        elif args[0] not in HBNBCommand.class_mapping:
+            print("** class doesn't exist **")
+        elif len(args) == 1:
+            print("** file name missing **")
+        else:
+            return args[0]
+        return None
+
+    def __report(self, action, count, class_name, start):
+        """Prints the number of records handled and the throughput"""
+        elapsed = time.perf_counter() - start
+        rate = count / elapsed if elapsed else 0
+        print(f"{action} {count} {class_name} in {elapsed:.3f}s "
+              f"({rate:.0f} records/s)")
+
+    def do_begin(self, arg):
+        """Starts a transaction: nothing is written until commit"""
+        storage.begin()
+
+    def do_commit(self, arg):
+        """Saves the changes made since begin"""
+        if not storage.in_transaction:
+            print("** no transaction in progress **")
+            return
+        storage.commit()
+
+    def do_rollback(self, arg):
+        """Drops the changes made since begin"""
+        if not storage.in_transaction:
+            print("** no transaction in progress **")
+            return
+        storage.rollback()
+
     def do_quit(self, line):
         """Quit command to exit the command interpreter"""
+        storage.close()
         return True
 
     def do_EOF(self, line):
         """EOF command to exit the command interpreter"""
+        storage.close()
         return True
 
 
@@ -1,6 +1,27 @@
 #!/usr/bin/python3
 """ Import modules and packages """
-from models.engine.file_storage import FileStorage
+import os
 
-storage = FileStorage()
+# models use __slots__ instead of an instance __dict__, see base_model
+compact_models = os.getenv('HBNB_COMPACT_MODELS') == '1'
+
+if os.getenv('HBNB_TYPE_STORAGE') == 'sqlite':
+    from models.engine.sqlite_storage import SQLiteStorage
+    storage = SQLiteStorage(os.getenv('HBNB_SQLITE_PATH', 'hbnb.db'))
+else:
+    from models.engine.file_storage import FileStorage
+    storage = FileStorage(journal=os.getenv('HBNB_FILE_JOURNAL') == '1',
+                          lazy=os.getenv('HBNB_FILE_LAZY') == '1',
+                          format=os.getenv('HBNB_FILE_FORMAT', 'json'),
+                          flush_interval=float(os.getenv(
+                              'HBNB_FILE_FLUSH_INTERVAL', 0)) or None,
+                          sharded=os.getenv('HBNB_FILE_SHARDS') is not None,
+                          buckets=int(os.getenv('HBNB_FILE_SHARDS') or 1),
+                          shared=os.getenv('HBNB_FILE_SHARED') == '1',
+                          thread_safe=os.getenv('HBNB_FILE_THREAD_SAFE') ==
+                          '1')
 storage.reload()
+if os.getenv('HBNB_TYPE_STORAGE') != 'sqlite':
+    # the worker processes import models, which is still importing here:
+    # only the later reloads read in parallel
+    storage.workers = int(os.getenv('HBNB_FILE_WORKERS') or 0) or None
@@ -2,9 +2,10 @@
 """
 Defines amenities
 """
-from models.base_model import BaseModel
+from models.base_model import BaseModel, compact
 
 
+@compact
 class Amenity(BaseModel):
     """Defines amenities that user can choose from to offer at its place"""
     name = ""
@@ -1,20 +1,85 @@
 #!/usr/bin/python3
 """
 Parent class that will inherit
+
+With HBNB_COMPACT_MODELS=1, BaseModel and the classes decorated with
+compact() keep their declared attributes in __slots__ instead of an
+instance __dict__; other attributes go to an overflow dictionary that
+is only created when one is set. to_dict() and __str__ then list the
+declared attributes in the order of their declaration rather than in
+the order they were set.
 """
 import uuid
 from datetime import datetime
-from models import storage
+from models import compact_models, storage
+
+
+def compact(cls):
+    """Class decorator rebuilding cls with __slots__ for its class
+    attributes in compact mode, their values becoming the defaults
+    returned while they are not set; returns cls as is otherwise
+    """
+    if not compact_models:
+        return cls
+    namespace = dict(cls.__dict__)
+    defaults = {
+        name: value for name, value in namespace.items()
+        if not name.startswith('_') and not callable(value) and
+        not isinstance(value, (classmethod, staticmethod, property))
+        }
+    for name in defaults:
+        del namespace[name]
+    namespace.pop('__dict__', None)
+    namespace.pop('__weakref__', None)
+    namespace['__slots__'] = tuple(defaults)
+    namespace['_defaults'] = dict(cls._defaults, **defaults)
+    namespace['_slot_names'] = cls._slot_names + tuple(defaults)
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+class Relation(property):
+    """Read-only attribute returning the stored objects related to an
+    instance through the attribute key:
+
+        'many'  the objects of class_name whose key is the instance id
+        'one'   the object of class_name whose id is the instance key
+        'ids'   the objects of class_name whose ids the instance key
+                lists
+
+    storage.prefetch() loads a relation for many instances at once.
+    The relations of the models are named related_<name>, so that they
+    don't hide the attributes users set, such as a city.
+    """
+
+    def __init__(self, kind, class_name, key):
+        """Describes the relation"""
+        super().__init__(self.__get)
+        self.kind = kind
+        self.class_name = class_name
+        self.key = key
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        """Remembers the attribute name of the relation"""
+        self.name = name
+
+    def __get(self, obj):
+        """Returns the related objects of obj"""
+        return storage.related(obj, self)
 
 
 class BaseModel:
     """Defines all common attributes/methods for other classes"""
+    if compact_models:
+        __slots__ = ('id', 'created_at', 'updated_at', '_extra')
+    _slot_names = ('id', 'created_at', 'updated_at')
+    _defaults = {}
+
     def __init__(self, *args, **kwargs):
         """initializes all attributes"""
         self.id = str(uuid.uuid4())  # Assign id explicitly in the BaseModel
         self.created_at = datetime.now()
         self.updated_at = self.created_at
-        storage.new(self)
 
         if kwargs:
             date_format = "%Y-%m-%dT%H:%M:%S.%f"
@@ -24,12 +89,148 @@ class BaseModel:
                 if key != '__class__':
                     setattr(self, key, value)
 
+        # register once the stored id is known
+        storage.new(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        """builds an instance from a to_dict() dictionary
+
+        Unlike cls(**data), no throwaway id or dates are generated,
+        the instance is not registered in the storage and the dates
+        are parsed with datetime.fromisoformat.
+        """
+        obj = cls.__new__(cls)
+        if compact_models:
+            attributes = dict(data)
+        else:
+            attributes = obj.__dict__
+            attributes.update(data)
+        attributes.pop('__class__', None)
+        for key in ('created_at', 'updated_at'):
+            if key in attributes:
+                attributes[key] = datetime.fromisoformat(attributes[key])
+        if compact_models:
+            obj.__setstate__(attributes)
+        return obj
+
+    def __getstate__(self):
+        """returns the attributes set on the instance as a dictionary,
+        which must not be modified
+        """
+        if not compact_models:
+            return self.__dict__
+        state = {}
+        for name in self._slot_names:
+            try:
+                state[name] = object.__getattribute__(self, name)
+            except AttributeError:
+                pass
+        extra = self.__extra()
+        if extra:
+            state.update(extra)
+        return state
+
+    def __setstate__(self, state):
+        """replaces the attributes of the instance by those of state,
+        without reporting the change to the storage
+        """
+        if not compact_models:
+            self.__dict__.clear()
+            self.__dict__.update(state)
+            return
+        for name in self._slot_names:
+            try:
+                object.__delattr__(self, name)
+            except AttributeError:
+                pass
+        object.__setattr__(self, '_extra', None)
+        for name, value in state.items():
+            try:
+                self.__store(name, value)
+            except AttributeError:
+                # kept like in the __dict__ of a regular instance, where
+                # a read-only property hides it
+                self.__keep(name, value)
+
+    def __extra(self):
+        """returns the overflow dictionary of a compact instance"""
+        try:
+            return object.__getattribute__(self, '_extra')
+        except AttributeError:
+            return None
+
+    def __store(self, name, value):
+        """sets an attribute of a compact instance, in its slot or in
+        the overflow dictionary
+        """
+        if name in self._slot_names or \
+                isinstance(getattr(type(self), name, None), property):
+            object.__setattr__(self, name, value)
+            return
+        self.__keep(name, value)
+
+    def __keep(self, name, value):
+        """sets an attribute of a compact instance in the overflow
+        dictionary
+        """
+        extra = self.__extra()
+        if extra is None:
+            extra = {}
+            object.__setattr__(self, '_extra', extra)
+        extra[name] = value
+
+    if compact_models:
+        def __getattr__(self, name):
+            """returns the overflow attributes and defaults of a compact
+            instance, called when the normal lookup fails
+            """
+            extra = self.__extra()
+            if extra and name in extra:
+                return extra[name]
+            if name in self._defaults:
+                return self._defaults[name]
+            raise AttributeError(f"'{type(self).__name__}' object has no "
+                                 f"attribute '{name}'")
+
+    def __setattr__(self, name, value):
+        """sets an attribute and reports the change to the storage"""
+        with storage.changing():
+            if storage.in_transaction:
+                storage.before_change(self)
+            if compact_models:
+                self.__store(name, value)
+            else:
+                object.__setattr__(self, name, value)
+            storage.mark_dirty(self, name)
+
+    def __delattr__(self, name):
+        """deletes an attribute and reports the change to the storage"""
+        with storage.changing():
+            if storage.in_transaction:
+                storage.before_change(self)
+            if compact_models:
+                self.__discard(name)
+            else:
+                object.__delattr__(self, name)
+            storage.mark_dirty(self, name)
+
+    def __discard(self, name):
+        """deletes an attribute of a compact instance, from its slot or
+        from the overflow dictionary
+        """
+        extra = self.__extra()
+        if name not in self._slot_names and extra and name in extra:
+            del extra[name]
+        else:
+            object.__delattr__(self, name)
+
     def __str__(self):
         """returns class name, id, and attribute dictionary"""
         class_name = "[" + self.__class__.__name__ + "]"
         attribute_dict = {
             k: v for (k, v) in
-            self.__dict__.items() if v is not None
+            self.__getstate__().items() if v is not None
         }
         return f"{class_name} ({self.id}) {attribute_dict}"
 
@@ -43,9 +244,10 @@ class BaseModel:
         datetimes converted to strings"""
         new_dict = {}
 
-        for key, value in self.__dict__.items():
+        for key, value in self.__getstate__().items():
             if key in ('created_at', 'updated_at'):
-                new_dict[key] = value.strftime("%Y-%m-%dT%H:%M:%S.%f")
+                # same text as strftime("%Y-%m-%dT%H:%M:%S.%f"), faster
+                new_dict[key] = value.isoformat(timespec='microseconds')
             elif value is not None:
                 new_dict[key] = value
 
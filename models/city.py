@@ -2,10 +2,14 @@
 """
 Defines city
 """
-from models.base_model import BaseModel
+from models.base_model import BaseModel, Relation, compact
 
 
+@compact
 class City(BaseModel):
     """defines city to search"""
     state_id = ""
     name = ""
+
+    related_state = Relation('one', 'State', 'state_id')
+    related_places = Relation('many', 'Place', 'city_id')
@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+"""
+Review counts and latest review dates, kept up to date review by review
+"""
+
+
+class ReviewAggregates:
+    """Number and latest creation date of the reviews of each place,
+    and number of reviews of each user
+
+    The latest date of a place is only looked for again among its own
+    reviews when its latest review is removed. A storage calls index()
+    again when one of the attributes of follows changes.
+    """
+
+    follows = {'Review': ('place_id', 'user_id', 'created_at')}
+
+    def __init__(self):
+        """Starts without reviews"""
+        self.__reviews = {}
+        self.__places = {}
+        self.__latest = {}
+        self.__users = {}
+
+    def __eq__(self, other):
+        """Two aggregates are equal when they hold the same reviews and
+        the same counts and dates
+        """
+        if not isinstance(other, ReviewAggregates):
+            return NotImplemented
+        return ((self.__reviews, self.__places, self.__latest,
+                 self.__users) ==
+                (other.__reviews, other.__places, other.__latest,
+                 other.__users))
+
+    def index(self, key, review):
+        """Counts review, stored under key, replacing its previous
+        place, user and date
+        """
+        self.remove(key)
+        place_id = getattr(review, 'place_id', None)
+        user_id = getattr(review, 'user_id', None)
+        created_at = getattr(review, 'created_at', None)
+        self.__reviews[key] = (place_id, user_id, created_at)
+        self.__places.setdefault(place_id, {})[key] = created_at
+        latest = self.__latest.get(place_id)
+        if created_at is not None and (latest is None or created_at > latest):
+            self.__latest[place_id] = created_at
+        self.__users[user_id] = self.__users.get(user_id, 0) + 1
+
+    def remove(self, key):
+        """Stops counting the review stored under key"""
+        entry = self.__reviews.pop(key, None)
+        if entry is None:
+            return
+        place_id, user_id, created_at = entry
+        reviews = self.__places[place_id]
+        del reviews[key]
+        if not reviews:
+            del self.__places[place_id]
+            self.__latest.pop(place_id, None)
+        elif created_at is not None and \
+                created_at == self.__latest.get(place_id):
+            dates = [date for date in reviews.values() if date is not None]
+            if dates:
+                self.__latest[place_id] = max(dates)
+            else:
+                self.__latest.pop(place_id, None)
+        self.__users[user_id] -= 1
+        if not self.__users[user_id]:
+            del self.__users[user_id]
+
+    def place(self, place_id):
+        """Returns the review count and latest review date of a place"""
+        return {'count': len(self.__places.get(place_id, ())),
+                'latest': self.__latest.get(place_id)}
+
+    def user(self, user_id):
+        """Returns the review count of a user"""
+        return self.__users.get(user_id, 0)
@@ -0,0 +1,118 @@
+#!/usr/bin/python3
+"""
+Class AsyncFileStorage that lets asyncio code use a storage without
+blocking its event loop
+"""
+import asyncio
+from functools import partial
+
+
+class AsyncFileStorage:
+    """Asyncio facade of a storage, models.storage by default
+
+    save(), flush() and reload() run the file I/O in an executor, the
+    default one of the event loop unless another is given. get() and
+    all() answer in the event loop when storage.loaded() says every
+    object is already in memory, and go through the executor when they
+    may have to read a shard or decode lazy records.
+
+    Concurrent save() calls are coalesced: a save() returns once a
+    write that started after it was called is done, so the calls made
+    while a write runs all wait for the same next write, and there is
+    never more than one write running and one waiting. Cancelling a
+    save() doesn't cancel the write other calls wait for.
+
+    The objects are changed in the event loop thread while a write may
+    encode them in the executor, so the storage has to be thread-safe
+    (FileStorage(thread_safe=True), or HBNB_FILE_THREAD_SAFE=1 for
+    models.storage). Other queries are reached through the storage
+    attribute.
+    """
+
+    batch_size = 1000
+
+    def __init__(self, storage=None, executor=None):
+        """Wraps storage with the given concurrent.futures executor"""
+        if storage is None:
+            from models import storage
+        if not storage.thread_safe:
+            raise ValueError("AsyncFileStorage needs a thread-safe storage")
+        self.storage = storage
+        self.executor = executor
+        self.__waiting = None
+        self.__running = None
+
+    async def __run(self, function, *args):
+        """Calls function in the executor and returns its result"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, partial(function, *args))
+
+    async def get(self, cls, id):
+        """Returns the object of class cls with the given id, or None"""
+        if self.storage.loaded(cls):
+            return self.storage.get(cls, id)
+        return await self.__run(self.storage.get, cls, id)
+
+    def all(self, cls=None):
+        """Returns the stored objects, or only the objects of cls, to
+        await as a dictionary by key or to go through with async for
+        """
+        return AsyncObjects(self, cls)
+
+    async def objects(self, cls=None):
+        """Returns the dictionary of all(cls), read in the executor if
+        needed
+        """
+        if self.storage.loaded(cls):
+            return self.storage.all(cls)
+        return await self.__run(self.storage.all, cls)
+
+    async def save(self):
+        """Writes the changes made before the call"""
+        if self.__waiting is None or self.__waiting.done():
+            self.__waiting = asyncio.ensure_future(
+                self.__write(self.__running))
+            self.__running = self.__waiting
+        await asyncio.shield(self.__waiting)
+
+    async def __write(self, previous):
+        """Waits for the previous write, then writes"""
+        if previous is not None and not previous.done():
+            await asyncio.wait([previous])
+        # the saves called from now on need another write
+        self.__waiting = None
+        await self.__run(self.storage.save)
+
+    async def flush(self):
+        """Writes the changes left to the background writer"""
+        await self.__run(self.storage.flush)
+
+    async def reload(self):
+        """Reads the objects from the file"""
+        await self.__run(self.storage.reload)
+
+
+class AsyncObjects:
+    """Result of AsyncFileStorage.all(): awaiting it gives the
+    dictionary, async for gives its objects, handing control back to
+    the event loop after every batch_size objects
+    """
+
+    def __init__(self, storage, cls):
+        """Describes the objects of cls in storage"""
+        self.__storage = storage
+        self.__cls = cls
+
+    def __await__(self):
+        """Returns the dictionary of the objects by key"""
+        return self.__storage.objects(self.__cls).__await__()
+
+    async def __aiter__(self):
+        """Yields the objects"""
+        objects = await self.__storage.objects(self.__cls)
+        batch_size = self.__storage.batch_size
+        for count, obj in enumerate(list(objects.values()), 1):
+            yield obj
+            if not count % batch_size:
+                await asyncio.sleep(0)
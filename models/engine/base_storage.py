@@ -0,0 +1,291 @@
+#!/usr/bin/python3
+"""
+Class BaseStorage that defines the interface of the storage engines
+"""
+from contextlib import contextmanager, nullcontext
+from models.engine.columns import as_number, within
+from models.engine.spatial import check_box, check_circle, distance_km, \
+    in_box, position
+from models.engine.text_index import TextIndex
+
+
+class BaseStorage:
+    """Interface shared by the storage engines
+
+    The models and the console only talk to the storage through these
+    methods, so any engine can be selected in models/__init__.py.
+    """
+
+    __model_classes = None
+    __prefetched = {}
+    in_transaction = False
+    thread_safe = False
+    text_attributes = TextIndex.follows
+
+    @staticmethod
+    def classes():
+        """Returns the model classes by class name"""
+        if BaseStorage.__model_classes is not None:
+            return BaseStorage.__model_classes
+
+        from models.base_model import BaseModel
+        from models.user import User
+        from models.place import Place
+        from models.city import City
+        from models.amenity import Amenity
+        from models.state import State
+        from models.review import Review
+
+        BaseStorage.__model_classes = {
+            'BaseModel': BaseModel,
+            'User': User,
+            'Place': Place,
+            'City': City,
+            'Amenity': Amenity,
+            'State': State,
+            'Review': Review
+            }
+        return BaseStorage.__model_classes
+
+    @staticmethod
+    def class_name(cls):
+        """Returns the class name of cls, given as a class or a string"""
+        return cls if isinstance(cls, str) else cls.__name__
+
+    def all(self, cls=None):
+        """Returns the stored objects by key, or only the objects of cls"""
+        raise NotImplementedError
+
+    def get(self, cls, id):
+        """Returns the object of class cls with the given id, or None"""
+        raise NotImplementedError
+
+    def count(self, cls=None):
+        """Returns the number of stored objects, or of objects of cls"""
+        return len(self.all(cls))
+
+    def find(self, cls, **filters):
+        """Returns the objects of cls whose attributes equal filters"""
+        return [
+            obj for obj in self.all(cls).values()
+            if all(getattr(obj, name, None) == value
+                   for name, value in filters.items())
+            ]
+
+    def select(self, cls, **bounds):
+        """Returns the objects of cls whose numeric attributes are within
+        bounds, (low, high) pairs with both ends included and None
+        leaving an end open, e.g. select(Place, max_guest=(4, None))
+        """
+        return [
+            obj for obj in self.all(cls).values()
+            if all(within(as_number(getattr(obj, name, None)), low, high)
+                   for name, (low, high) in bounds.items())
+            ]
+
+    def group_by(self, cls, name, values):
+        """Returns the objects of cls whose attribute name is one of
+        values, as lists by value, in one pass over the objects of cls
+        """
+        groups = {}
+        for obj in self.all(cls).values():
+            value = getattr(obj, name, None)
+            try:
+                if value in values:
+                    groups.setdefault(value, []).append(obj)
+            except TypeError:
+                continue
+        return groups
+
+    def related(self, obj, relation):
+        """Returns the objects related to obj by a models Relation,
+        prefetched ones first
+        """
+        key = (f"{obj.__class__.__name__}.{obj.id}", relation.name)
+        if key not in BaseStorage.__prefetched:
+            return self.__load_related([obj], relation)[obj.id]
+        related = BaseStorage.__prefetched[key]
+        return list(related) if isinstance(related, list) else related
+
+    def prefetch(self, objs, name):
+        """Loads the Relation name of every obj of objs at once, so
+        that reading it doesn't query the storage again until the next
+        change; returns the related objects by obj id
+        """
+        objs = list(objs)
+        related = {}
+        by_class = {}
+        for obj in objs:
+            by_class.setdefault(type(obj), []).append(obj)
+        for cls, group in by_class.items():
+            relation = getattr(cls, name)
+            related.update(self.__load_related(group, relation))
+        for obj in objs:
+            key = f"{obj.__class__.__name__}.{obj.id}"
+            BaseStorage.__prefetched[(key, name)] = related[obj.id]
+        return related
+
+    def forget_prefetched(self):
+        """Drops the prefetched relations, called on every change"""
+        if BaseStorage.__prefetched:
+            BaseStorage.__prefetched.clear()
+
+    def __load_related(self, objs, relation):
+        """Returns the objects related to each obj of objs by id"""
+        if relation.kind == 'many':
+            groups = self.group_by(relation.class_name, relation.key,
+                                   {obj.id for obj in objs})
+            return {obj.id: groups.get(obj.id, []) for obj in objs}
+        if relation.kind == 'one':
+            return {
+                obj.id: self.get(relation.class_name,
+                                 getattr(obj, relation.key, None))
+                for obj in objs
+                }
+        related = {}
+        for obj in objs:
+            ids = getattr(obj, relation.key, None)
+            if not isinstance(ids, (list, tuple)):
+                ids = ()
+            found = (self.get(relation.class_name, id) for id in ids)
+            related[obj.id] = [value for value in found if value is not None]
+        return related
+
+    def search(self, cls, text):
+        """Returns the ids of the objects of cls whose text_attributes
+        hold words of text, the best match first
+        """
+        names = self.text_attributes.get(self.class_name(cls), ())
+        index = TextIndex()
+        for key, obj in self.all(cls).items():
+            index.add(key, [getattr(obj, name, None) for name in names])
+        return [key.partition('.')[2] for key, _ in index.search(text)]
+
+    def review_stats(self, place_id):
+        """Returns the number of reviews of a place and the creation
+        date of the latest one, as {'count': ..., 'latest': ...}
+        """
+        dates = [getattr(review, 'created_at', None)
+                 for review in self.find('Review', place_id=place_id)]
+        known = [date for date in dates if date is not None]
+        return {'count': len(dates), 'latest': max(known, default=None)}
+
+    def user_review_count(self, user_id):
+        """Returns the number of reviews written by a user"""
+        return len(self.find('Review', user_id=user_id))
+
+    def recompute_review_stats(self):
+        """Recomputes the review statistics from every Review, and
+        returns True if they matched the ones kept up to date
+        """
+        return True
+
+    def places_within(self, lat, lon, radius_km):
+        """Returns the Places at most radius_km away from the point
+        (lat, lon), the closest first
+        """
+        check_circle(lat, lon, radius_km)
+        found = []
+        for place in self.all('Place').values():
+            place_lat, place_lon = self.location(place)
+            if place_lat is None:
+                continue
+            distance = distance_km(lat, lon, place_lat, place_lon)
+            if distance <= radius_km:
+                found.append((distance, place))
+        found.sort(key=lambda pair: pair[0])
+        return [place for _, place in found]
+
+    def places_in_box(self, min_lat, min_lon, max_lat, max_lon):
+        """Returns the Places in a box; a box whose min_lon is greater
+        than max_lon crosses the 180th meridian
+        """
+        check_box(min_lat, min_lon, max_lat, max_lon)
+        found = []
+        for place in self.all('Place').values():
+            lat, lon = self.location(place)
+            if lat is not None and in_box(lat, lon, min_lat, min_lon,
+                                          max_lat, max_lon):
+                found.append(place)
+        return found
+
+    @staticmethod
+    def location(place):
+        """Returns the (latitude, longitude) of place, or (None, None)
+        when they aren't valid coordinates
+        """
+        return position(place)
+
+    def new(self, obj):
+        """Registers obj in the storage"""
+        raise NotImplementedError
+
+    def mark_dirty(self, obj, name=None):
+        """Records that the attribute name of a stored obj has changed"""
+        pass
+
+    def refresh(self):
+        """Reads the changes saved by other processes, if the storage
+        can see them; returns True if there were any
+        """
+        return False
+
+    def close(self):
+        """Writes what the storage keeps for the next run and releases
+        its resources; there is nothing to do here
+        """
+
+    def loaded(self, cls=None):
+        """True when get() and all() of cls answer from memory without
+        reading anything; engines that may read return False
+        """
+        return False
+
+    def before_change(self, obj):
+        """Called before an attribute of obj changes in a transaction"""
+        pass
+
+    def changing(self):
+        """Returns the context in which the models set and delete their
+        attributes; nothing is held here
+        """
+        return nullcontext()
+
+    def delete(self, obj=None):
+        """Removes obj from the storage"""
+        raise NotImplementedError
+
+    def save(self):
+        """Persists the changes"""
+        raise NotImplementedError
+
+    def reload(self):
+        """Loads the persisted objects"""
+        raise NotImplementedError
+
+    def begin(self):
+        """Starts a transaction: save() is deferred until commit()"""
+        raise NotImplementedError
+
+    def commit(self):
+        """Ends the transaction and saves its changes"""
+        raise NotImplementedError
+
+    def rollback(self):
+        """Ends the transaction and drops its changes"""
+        raise NotImplementedError
+
+    @contextmanager
+    def transaction(self):
+        """Runs the with block in a transaction
+
+        The transaction is committed when the block ends normally and
+        rolled back when it raises.
+        """
+        self.begin()
+        try:
+            yield self
+        except BaseException:
+            self.rollback()
+            raise
+        self.commit()
@@ -0,0 +1,397 @@
+#!/usr/bin/python3
+"""
+Compact binary encoding of the to_dict() dictionaries
+
+A file starts with MAGIC and the table of the class and attribute
+names, followed by the records:
+
+    length      uint32, size of the rest of the record
+    class       uint16, index in the name table
+    id          0 + 16 raw bytes for a uuid4 string, 1 + string otherwise
+    created_at  int64, microseconds since 1970-01-01
+    updated_at  int64, microseconds since 1970-01-01
+    count       uint16, number of other attributes
+    attributes  uint16 name index + tagged value, count times
+
+All integers are little-endian.
+
+BinaryFile reads a file through mmap: opening it only finds where the
+records are, and a record is decoded when it is looked up.
+"""
+import mmap
+import struct
+from datetime import datetime, timedelta
+
+MAGIC = b"HBNBBIN\x01"
+EPOCH = datetime(1970, 1, 1)
+NO_DATE = -2 ** 63
+MIN_INT = -2 ** 63
+MAX_INT = 2 ** 63 - 1
+
+U16 = struct.Struct("<H")
+U32 = struct.Struct("<I")
+I64 = struct.Struct("<q")
+F64 = struct.Struct("<d")
+RECORD = struct.Struct("<IH")
+DATES = struct.Struct("<qq")
+NAME_TAG = struct.Struct("<HB")
+NAME_TAG_SIZE = struct.Struct("<HBI")
+NAME_TAG_INT = struct.Struct("<HBq")
+NAME_TAG_FLOAT = struct.Struct("<HBd")
+
+NONE, TRUE, FALSE, INT, FLOAT, STR, LIST, DICT, BIGINT = range(9)
+SPECIAL = frozenset(('__class__', 'id', 'created_at', 'updated_at'))
+
+
+def is_binary(path):
+    """Returns True if the file at path starts with MAGIC"""
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def read_names(data):
+    """Returns the name table of a file content and the offset of its
+    first record
+    """
+    offset = len(MAGIC)
+    count, = U32.unpack_from(data, offset)
+    offset += 4
+    names = []
+    for _ in range(count):
+        size, = U16.unpack_from(data, offset)
+        offset += 2
+        names.append(str(data[offset:offset + size], 'utf-8'))
+        offset += size
+    return names, offset
+
+
+class BinaryFormat:
+    """Encoder and decoder of the binary format
+
+    The names interned by encode() keep their index for the lifetime of
+    the instance, so encoded records can be cached and written again
+    after the header of a later snapshot.
+    """
+
+    def __init__(self):
+        """Starts with an empty name table"""
+        self.names = []
+        self.__indexes = {}
+
+    def header(self):
+        """Returns MAGIC followed by the name table"""
+        parts = [MAGIC, U32.pack(len(self.names))]
+        for name in self.names:
+            data = name.encode()
+            parts.append(U16.pack(len(data)))
+            parts.append(data)
+        return b"".join(parts)
+
+    def adopt(self, names):
+        """Extends the table with the names of a file when the table is
+        a prefix of them, and returns True if the records of that file
+        can be copied as they are after header()
+        """
+        if names[:len(self.names)] == self.names:
+            for name in names[len(self.names):]:
+                self.__intern(name)
+        return self.names[:len(names)] == names
+
+    def encode(self, record):
+        """Returns the bytes of one to_dict() dictionary"""
+        id = record['id']
+        uuid_bytes = self.__uuid_bytes(id)
+        if uuid_bytes is not None:
+            parts = [b"\x00", uuid_bytes]
+        else:
+            parts = [b"\x01"]
+            self.__value(parts, id)
+        parts.append(DATES.pack(self.__date(record.get('created_at')),
+                                self.__date(record.get('updated_at'))))
+
+        count = 0
+        attributes = []
+        indexes = self.__indexes
+        for key, value in record.items():
+            if key in SPECIAL:
+                continue
+            count += 1
+            index = indexes.get(key)
+            if index is None:
+                index = self.__intern(key)
+            kind = type(value)
+            # most attributes are strings and numbers, write them inline
+            if kind is str:
+                data = value.encode()
+                attributes.append(NAME_TAG_SIZE.pack(index, STR, len(data)))
+                attributes.append(data)
+            elif kind is int and MIN_INT <= value <= MAX_INT:
+                attributes.append(NAME_TAG_INT.pack(index, INT, value))
+            elif kind is float:
+                attributes.append(NAME_TAG_FLOAT.pack(index, FLOAT, value))
+            else:
+                attributes.append(U16.pack(index))
+                self.__value(attributes, value)
+        parts.append(U16.pack(count))
+        parts.extend(attributes)
+
+        body = b"".join(parts)
+        return RECORD.pack(len(body) + 2,
+                           self.__intern(record['__class__'])) + body
+
+    @staticmethod
+    def __uuid_bytes(id):
+        """Returns the 16 bytes of a canonical uuid string, or None"""
+        if type(id) is not str or len(id) != 36 or \
+                id[8] != '-' or id[13] != '-' or \
+                id[18] != '-' or id[23] != '-':
+            return None
+        digits = id.replace('-', '')
+        try:
+            data = bytes.fromhex(digits)
+        except ValueError:
+            return None
+        if data.hex() != digits:
+            return None
+        return data
+
+    def records(self, data):
+        """Yields the (key, dictionary) pairs of a whole file content"""
+        view = memoryview(data)
+        names, offset = read_names(view)
+        while offset < len(view):
+            size, class_index = RECORD.unpack_from(view, offset)
+            end = offset + 4 + size
+            record = self.decode(view[offset + 6:end], names[class_index],
+                                 names)
+            offset = end
+            yield f"{record['__class__']}.{record['id']}", record
+
+    def decode(self, view, class_name, names):
+        """Returns the dictionary of a record body, after its class,
+        given the name table of its file
+        """
+        id, offset = self.read_id(view, 0)
+        record = {'id': id}
+        created_at, updated_at = DATES.unpack_from(view, offset)
+        offset += 16
+        if created_at != NO_DATE:
+            record['created_at'] = (
+                EPOCH + timedelta(microseconds=created_at)
+                ).isoformat(timespec='microseconds')
+        if updated_at != NO_DATE:
+            record['updated_at'] = (
+                EPOCH + timedelta(microseconds=updated_at)
+                ).isoformat(timespec='microseconds')
+
+        count, = U16.unpack_from(view, offset)
+        offset += 2
+        for _ in range(count):
+            name_index, tag = NAME_TAG.unpack_from(view, offset)
+            # most attributes are strings and numbers, read them inline
+            if tag == STR:
+                size, = U32.unpack_from(view, offset + 3)
+                offset += 7
+                record[names[name_index]] = str(
+                    view[offset:offset + size], 'utf-8')
+                offset += size
+            elif tag == INT:
+                record[names[name_index]] = NAME_TAG_INT.unpack_from(
+                    view, offset)[2]
+                offset += NAME_TAG_INT.size
+            elif tag == FLOAT:
+                record[names[name_index]] = NAME_TAG_FLOAT.unpack_from(
+                    view, offset)[2]
+                offset += NAME_TAG_FLOAT.size
+            else:
+                record[names[name_index]], offset = self.__read(
+                    view, offset + 2)
+        record['__class__'] = class_name
+        return record
+
+    def read_id(self, data, offset):
+        """Returns the id stored at offset and the offset after it"""
+        if data[offset] == 0:
+            h = data[offset + 1:offset + 17].hex()
+            return (f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}",
+                    offset + 17)
+        return self.__read(data, offset + 1)
+
+    def __intern(self, name):
+        """Returns the index of name, adding it to the table if needed"""
+        index = self.__indexes.get(name)
+        if index is None:
+            index = self.__indexes[name] = len(self.names)
+            self.names.append(name)
+        return index
+
+    @staticmethod
+    def __date(value):
+        """Returns a datetime or a to_dict() date string as microseconds"""
+        if value is None:
+            return NO_DATE
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        delta = value - EPOCH
+        return ((delta.days * 86400 + delta.seconds) * 1000000 +
+                delta.microseconds)
+
+    def __value(self, parts, value):
+        """Appends the tagged encoding of value to parts"""
+        if value is None:
+            parts.append(bytes((NONE,)))
+        elif value is True:
+            parts.append(bytes((TRUE,)))
+        elif value is False:
+            parts.append(bytes((FALSE,)))
+        elif isinstance(value, int):
+            if -2 ** 63 <= value < 2 ** 63:
+                parts.append(bytes((INT,)) + I64.pack(value))
+            else:
+                data = str(value).encode()
+                parts.append(bytes((BIGINT,)) + U32.pack(len(data)) + data)
+        elif isinstance(value, float):
+            parts.append(bytes((FLOAT,)) + F64.pack(value))
+        elif isinstance(value, str):
+            data = value.encode()
+            parts.append(bytes((STR,)) + U32.pack(len(data)) + data)
+        elif isinstance(value, (list, tuple)):
+            parts.append(bytes((LIST,)) + U32.pack(len(value)))
+            for item in value:
+                self.__value(parts, item)
+        elif isinstance(value, dict):
+            parts.append(bytes((DICT,)) + U32.pack(len(value)))
+            for key, item in value.items():
+                self.__value(parts, str(key))
+                self.__value(parts, item)
+        else:
+            raise TypeError(f"can't encode {type(value).__name__} values")
+
+    def __read(self, view, offset):
+        """Returns the tagged value at offset and the offset after it"""
+        tag = view[offset]
+        offset += 1
+        if tag == STR:
+            size, = U32.unpack_from(view, offset)
+            offset += 4
+            return str(view[offset:offset + size], 'utf-8'), offset + size
+        if tag == INT:
+            return I64.unpack_from(view, offset)[0], offset + 8
+        if tag == FLOAT:
+            return F64.unpack_from(view, offset)[0], offset + 8
+        if tag == NONE:
+            return None, offset
+        if tag == TRUE:
+            return True, offset
+        if tag == FALSE:
+            return False, offset
+        if tag == BIGINT:
+            size, = U32.unpack_from(view, offset)
+            offset += 4
+            return int(str(view[offset:offset + size], 'utf-8')), offset + size
+        size, = U32.unpack_from(view, offset)
+        offset += 4
+        if tag == LIST:
+            items = []
+            for _ in range(size):
+                item, offset = self.__read(view, offset)
+                items.append(item)
+            return items, offset
+        items = {}
+        for _ in range(size):
+            key, offset = self.__read(view, offset)
+            items[key], offset = self.__read(view, offset)
+        return items, offset
+
+
+class BinaryFile:
+    """Read-only view of a binary file
+
+    Opening it maps the file and only reads the name table and the
+    class, id and position of every record; get() and records() decode
+    the records they return.
+    """
+
+    def __init__(self, path):
+        """Maps the file at path and finds its records"""
+        with open(path, 'rb') as f:
+            self.__map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.__binary = BinaryFormat()
+        data = self.__map
+        self.names, offset = read_names(data)
+        self.__classes = {}
+        while offset < len(data):
+            size, class_index = RECORD.unpack_from(data, offset)
+            class_name = self.names[class_index]
+            id, _ = self.__binary.read_id(data, offset + 6)
+            entries = self.__classes.get(class_name)
+            if entries is None:
+                entries = self.__classes[class_name] = {}
+            entries[f"{class_name}.{id}"] = (offset, size + 4)
+            offset += size + 4
+
+    def close(self):
+        """Unmaps the file"""
+        self.__map.close()
+
+    def count(self, class_name=None):
+        """Returns the number of records, or of records of class_name"""
+        if class_name is None:
+            return sum(len(entries) for entries in self.__classes.values())
+        return len(self.__classes.get(class_name, ()))
+
+    def class_names(self):
+        """Returns the names of the classes stored in the file"""
+        return list(self.__classes)
+
+    def contains(self, key):
+        """Returns True if a record is stored under key"""
+        return key in self.__classes.get(key.partition(".")[0], ())
+
+    def get(self, key):
+        """Returns the dictionary stored under key, or None"""
+        entry = self.__classes.get(key.partition(".")[0], {}).get(key)
+        if entry is None:
+            return None
+        return self.__record(key, entry)
+
+    def keys(self, class_name=None):
+        """Yields the keys of all records, or of records of class_name"""
+        for entries in self.__entries(class_name):
+            yield from entries
+
+    def records(self, class_name=None, exclude=()):
+        """Yields the (key, dictionary) pairs of the records, or of the
+        records of class_name, leaving out the keys in exclude
+        """
+        for entries in self.__entries(class_name):
+            for key, entry in entries.items():
+                if key not in exclude:
+                    yield key, self.__record(key, entry)
+
+    def encoded(self, class_name=None, exclude=()):
+        """Yields the (key, encoded bytes) pairs of the records, or of
+        the records of class_name, leaving out the keys in exclude
+        """
+        for entries in self.__entries(class_name):
+            for key, (offset, length) in entries.items():
+                if key not in exclude:
+                    yield key, self.__map[offset:offset + length]
+
+    def __entries(self, class_name):
+        """Returns the {key: (offset, length)} dictionaries of every
+        class, or of class_name
+        """
+        if class_name is None:
+            return list(self.__classes.values())
+        return [self.__classes.get(class_name, {})]
+
+    def __record(self, key, entry):
+        """Returns the dictionary of the record of key at entry"""
+        offset, length = entry
+        view = memoryview(self.__map)[offset + 6:offset + length]
+        try:
+            return self.__binary.decode(view, key.partition(".")[0],
+                                        self.names)
+        finally:
+            view.release()
@@ -0,0 +1,122 @@
+#!/usr/bin/python3
+"""
+Columnar copy of numeric attributes, filtered in a single pass
+
+Each attribute is kept in an array('d') with one row per object, NaN
+standing for a missing or non-numeric value. When NumPy is installed
+the arrays are filtered through zero-copy NumPy views, otherwise with
+plain Python loops over the arrays.
+"""
+import math
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def as_number(value):
+    """Returns value as a float, or NaN when it isn't a number"""
+    if isinstance(value, bool):
+        return math.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return math.nan
+    return math.nan
+
+
+def within(value, low, high):
+    """Returns True if low <= value <= high, None leaving an end open"""
+    return ((low is None or value >= low) and
+            (high is None or value <= high))
+
+
+class Columns:
+    """Rows of the numeric attributes names of a set of objects
+
+    Removing a row moves the last row into its place, so the arrays
+    stay dense.
+    """
+
+    def __init__(self, names):
+        """Creates empty columns for the attributes names"""
+        self.names = tuple(names)
+        self.keys = []
+        self.objects = []
+        self.__rows = {}
+        self.__columns = {name: array('d') for name in self.names}
+
+    def __len__(self):
+        """Returns the number of rows"""
+        return len(self.keys)
+
+    def add(self, key, obj):
+        """Adds or replaces the row of obj stored under key"""
+        if key in self.__rows:
+            self.remove(key)
+        self.__rows[key] = len(self.keys)
+        self.keys.append(key)
+        self.objects.append(obj)
+        for name, column in self.__columns.items():
+            column.append(as_number(getattr(obj, name, None)))
+
+    def update(self, key, name, value):
+        """Sets the value of the attribute name in the row of key"""
+        row = self.__rows.get(key)
+        if row is not None and name in self.__columns:
+            self.__columns[name][row] = as_number(value)
+
+    def remove(self, key):
+        """Removes the row of key"""
+        row = self.__rows.pop(key, None)
+        if row is None:
+            return
+        last = len(self.keys) - 1
+        if row != last:
+            moved = self.keys[last]
+            self.keys[row] = moved
+            self.objects[row] = self.objects[last]
+            self.__rows[moved] = row
+            for column in self.__columns.values():
+                column[row] = column[last]
+        self.keys.pop()
+        self.objects.pop()
+        for column in self.__columns.values():
+            column.pop()
+
+    def select(self, bounds):
+        """Returns the objects whose attributes are within bounds
+
+        bounds maps attribute names to (low, high) pairs, both ends
+        included and None leaving an end open.
+        """
+        for name in bounds:
+            if name not in self.__columns:
+                raise KeyError(f"no column for {name}")
+        if not self.keys:
+            return []
+        if numpy is not None:
+            mask = numpy.ones(len(self.keys), dtype=bool)
+            for name, (low, high) in bounds.items():
+                values = numpy.frombuffer(self.__columns[name])
+                if low is not None:
+                    mask &= values >= low
+                if high is not None:
+                    mask &= values <= high
+            return [self.objects[row] for row in numpy.flatnonzero(mask)]
+
+        rows = range(len(self.keys))
+        for name, (low, high) in bounds.items():
+            values = self.__columns[name]
+            if low is not None and high is not None:
+                rows = [row for row in rows if low <= values[row] <= high]
+            elif low is not None:
+                rows = [row for row in rows if values[row] >= low]
+            elif high is not None:
+                rows = [row for row in rows if values[row] <= high]
+        return [self.objects[row] for row in rows]
@@ -3,61 +3,1369 @@
 Class FileStorage that serializes instances
 to a JSON file and deserializes JSON file to instances
 """
+import atexit
 import json
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
 import os
+import stat
+import tempfile
+import threading
+import time
+import zlib
+from models.engine.base_storage import BaseStorage
+from models.engine.aggregates import ReviewAggregates
+from models.engine.binary_format import BinaryFile, BinaryFormat, is_binary
+from models.engine.columns import Columns
+from models.engine.spatial import GridIndex
+from models.engine.text_index import TextIndex
+from models.engine import indexed_file
+from models.engine.record_reader import chunks, read_file, read_lines, \
+    read_records
+from models.engine.indexed_file import IndexedFile, is_indexed
+from models.engine.locks import FileLock, ReadWriteLock, write_count
 
+# reused by changing() while nothing has to be held
+UNLOCKED = nullcontext()
 
-class FileStorage:
+
+class FileStorage(BaseStorage):
     """Class that serializes instances to a
     JSON file and deserializes JSON file to instances
+
+    Objects are indexed by class, by the attributes of
+    __attribute_indexes and __column_names, and by the indexes of
+    spatial.py, aggregates.py and text_index.py, which list the classes
+    and attributes they follow. save() only encodes the objects changed
+    since the last one, and writes through an fsynced temporary file.
     """
 
     __file_path = "file.json"
     __objects = {}
+    __dirty = set()
+    __fragments = {}
+    __classes = {}
+    __values = {}
+    __indexed_values = {}
+    __indexed = None
+    __raw = {}
+    __mapped = None
+    __taken = {}
+    __shards = {}
+    __generation = None
+    __undo = None
+    __savepoints = []
+    __save_pending = False
+    __rlock = threading.RLock()
+    __rw_lock = ReadWriteLock()
+    __unencoded = set()
+    __binary = BinaryFormat()
+    __attribute_indexes = {
+        'City': ('state_id',),
+        'Place': ('city_id', 'user_id'),
+        'Review': ('place_id', 'user_id')
+        }
+    __columns = {}
+    __places = GridIndex()
+    __text = TextIndex()
+    __reviews = ReviewAggregates()
+    __text_ready = False
+    __followed = {}
+    __followers = {}
+    __column_names = {
+        'Place': ('price_by_night', 'number_rooms', 'max_guest',
+                  'latitude', 'longitude')
+        }
+
+    def __init__(self, journal=False, compact_threshold=1000, lazy=False,
+                 format='json', flush_interval=None, sharded=False,
+                 buckets=1, workers=None, shared=False, thread_safe=False):
+        """Sets the storage options: the format ('json', 'ndjson',
+        'binary' or 'indexed'), the journal, lazy, sharded, shared and
+        thread-safe modes, the background writer and the reload workers
+        """
+        if format not in ('json', 'ndjson', 'binary', 'indexed'):
+            raise ValueError(f"unknown storage format: {format}")
+        if sharded and (journal or format == 'indexed'):
+            raise ValueError("sharded mode can't be used with the journal "
+                             "or the indexed format")
+        if shared and (journal or sharded or format == 'indexed'):
+            raise ValueError("shared mode can't be used with the journal, "
+                             "sharded mode or the indexed format")
+        if buckets < 1:
+            raise ValueError("buckets must be at least 1")
+        self.format = format
+        self.journal = journal
+        self.lazy = lazy
+        self.compact_threshold = compact_threshold
+        self.flush_interval = flush_interval
+        self.sharded = sharded
+        self.buckets = buckets
+        self.workers = workers
+        self.shared = shared
+        # the background writer encodes the objects while other threads
+        # change them
+        self.thread_safe = thread_safe or flush_interval is not None
+        self.__lock = FileStorage.__rw_lock if self.thread_safe else \
+            FileStorage.__rlock
+        self.__journal_records = 0
+        self.__io_lock = threading.Lock()
+        self.__flush_requested = threading.Condition()
+        self.__pending = False
+        self.__writer = None
+        self.__error = None
+
+    @property
+    def in_transaction(self):
+        """True between begin() and commit() or rollback()"""
+        return FileStorage.__undo is not None
+
+    @property
+    def journal_path(self):
+        """Path of the append-only journal next to the JSON file"""
+        return FileStorage.__file_path + ".journal"
+
+    @property
+    def text_index_path(self):
+        """Path of the saved text index next to the JSON file"""
+        return FileStorage.__file_path + ".text"
+
+    def shard_path(self, class_name, bucket=0):
+        """Path of the file of a bucket of class_name in sharded mode"""
+        base, extension = os.path.splitext(FileStorage.__file_path)
+        if self.buckets > 1:
+            return f"{base}.{class_name}.{bucket}{extension}"
+        return f"{base}.{class_name}{extension}"
+
+    def all(self, cls=None):
+        """Returns the dictionary __objects, or only the objects of cls"""
+        if cls is None:
+            self.__prepare()
+            if self.thread_safe:
+                with self.__lock.read():
+                    return dict(FileStorage.__objects)
+            return FileStorage.__objects
+        class_name = self.class_name(cls)
+        self.__prepare(class_name)
+        with self.__reading():
+            return dict(FileStorage.__classes.get(class_name, {}))
+
+    def get(self, cls, id):
+        """Returns the object of class cls with the given id, or None"""
+        class_name = self.class_name(cls)
+        self.__prepare(class_name, build=False)
+        key = f"{class_name}.{id}"
+        obj = FileStorage.__objects.get(key)
+        if obj is not None or (
+                FileStorage.__mapped is None and
+                key not in FileStorage.__raw.get(class_name, ())):
+            return obj
+        with self.__lock:
+            obj = FileStorage.__objects.get(key)
+            if obj is None and key in FileStorage.__raw.get(class_name, ()):
+                obj = self.__build(key,
+                                   FileStorage.__raw[class_name].pop(key))
+            if obj is None and self.__take(key):
+                obj = self.__build(key, FileStorage.__mapped.get(key))
+            return obj
+
+    def count(self, cls=None):
+        """Returns the number of stored objects, or of objects of cls"""
+        class_names = () if cls is None else (self.class_name(cls),)
+        self.__prepare(*class_names, build=False)
+        with self.__reading():
+            mapped = FileStorage.__mapped
+            if cls is None:
+                count = len(FileStorage.__objects) + sum(
+                    len(raw) for raw in FileStorage.__raw.values())
+                if mapped is not None:
+                    count += mapped.count() - sum(
+                        len(taken) for taken in FileStorage.__taken.values())
+                return count
+            class_name = class_names[0]
+            count = (len(FileStorage.__classes.get(class_name, ())) +
+                     len(FileStorage.__raw.get(class_name, ())))
+            if mapped is not None:
+                count += (mapped.count(class_name) -
+                          len(FileStorage.__taken.get(class_name, ())))
+            return count
+
+    def find(self, cls, **filters):
+        """Returns the objects of cls whose attributes equal filters
+
+        The smallest matching attribute index bucket is used as the
+        candidate set when one exists, the class index otherwise.
+        """
+        class_name = self.class_name(cls)
+        self.__prepare(class_name)
+        with self.__reading():
+            indexes = FileStorage.__values.get(class_name, {})
+            candidates = None
+            for name, value in filters.items():
+                if name not in indexes:
+                    continue
+                try:
+                    bucket = indexes[name].get(value, {})
+                except TypeError:
+                    continue
+                if candidates is None or len(bucket) < len(candidates):
+                    candidates = bucket
+            if candidates is None:
+                candidates = FileStorage.__classes.get(class_name, {})
 
-    def all(self):
-        """Returns the dictionary __objects"""
-        return FileStorage.__objects
+            return [
+                obj for obj in candidates.values()
+                if all(getattr(obj, name, None) == value
+                       for name, value in filters.items())
+                ]
+
+    def group_by(self, cls, name, values):
+        """Returns the objects of cls whose attribute name is one of
+        values, as lists by value, from the attribute index when there
+        is one
+        """
+        class_name = self.class_name(cls)
+        if name not in FileStorage.__attribute_indexes.get(class_name, ()):
+            return super().group_by(cls, name, values)
+        self.__prepare(class_name)
+        with self.__reading():
+            buckets = FileStorage.__values.get(class_name, {}).get(name, {})
+            return {
+                value: list(buckets[value].values())
+                for value in values if value in buckets
+                }
+
+    def select(self, cls, **bounds):
+        """Returns the objects of cls whose numeric attributes are within
+        bounds, (low, high) pairs with both ends included and None
+        leaving an end open, e.g. select(Place, max_guest=(4, None))
+
+        The columns of the class are filtered when it has them.
+        """
+        class_name = self.class_name(cls)
+        names = FileStorage.__column_names.get(class_name, ())
+        if not all(name in names for name in bounds):
+            return super().select(cls, **bounds)
+        self.__prepare(class_name)
+        with self.__reading():
+            columns = FileStorage.__columns.get(class_name)
+            if columns is None:
+                return []
+            return columns.select(bounds)
+
+    def search(self, cls, text):
+        """Returns the ids of the objects of cls whose text_attributes
+        hold words of text, the best match first
+        """
+        class_name = self.class_name(cls)
+        if FileStorage.__indexed is not FileStorage.__objects or \
+                not FileStorage.__text_ready:
+            with self.__lock:
+                self.__sync()
+                if not FileStorage.__text_ready:
+                    self.__build_text()
+        with self.__reading():
+            return [key.partition('.')[2] for key, _ in
+                    FileStorage.__text.search(text, class_name + '.')]
+
+    def review_stats(self, place_id):
+        """Returns the number of reviews of a place and the creation
+        date of the latest one, as {'count': ..., 'latest': ...}
+        """
+        self.__prepare('Review')
+        with self.__reading():
+            return FileStorage.__reviews.place(place_id)
+
+    def user_review_count(self, user_id):
+        """Returns the number of reviews written by a user"""
+        self.__prepare('Review')
+        with self.__reading():
+            return FileStorage.__reviews.user(user_id)
+
+    def recompute_review_stats(self):
+        """Recomputes the review statistics from every Review, and
+        returns True if they matched the ones kept up to date
+        """
+        with self.__lock:
+            self.__sync()
+            self.__load_shards('Review')
+            self.__materialize('Review')
+            reviews = ReviewAggregates()
+            for key, review in FileStorage.__classes.get('Review',
+                                                         {}).items():
+                reviews.index(key, review)
+            matched = reviews == FileStorage.__reviews
+            FileStorage.__reviews = reviews
+            self.__follow()
+            return matched
+
+    def places_within(self, lat, lon, radius_km):
+        """Returns the Places at most radius_km away from the point
+        (lat, lon), the closest first
+        """
+        self.__prepare('Place')
+        with self.__reading():
+            return [place for _, place in
+                    FileStorage.__places.within(lat, lon, radius_km)]
+
+    def places_in_box(self, min_lat, min_lon, max_lat, max_lon):
+        """Returns the Places in a box; a box whose min_lon is greater
+        than max_lon crosses the 180th meridian
+        """
+        self.__prepare('Place')
+        with self.__reading():
+            return FileStorage.__places.within_box(
+                min_lat, min_lon, max_lat, max_lon)
 
     def new(self, obj):
         """Sets in __objects the obj with key <obj class name>.id"""
-        key = f"{obj.__class__.__name__}.{obj.id}"
-        FileStorage.__objects[key] = obj
+        with self.__lock:
+            self.__sync()
+            self.__load_shards(obj.__class__.__name__)
+            key = f"{obj.__class__.__name__}.{obj.id}"
+            if FileStorage.__undo is not None:
+                self.__remember(key)
+            if key in FileStorage.__objects:
+                self.__unindex(key)
+            FileStorage.__raw.get(obj.__class__.__name__, {}).pop(key, None)
+            self.__take(key)
+            FileStorage.__objects[key] = obj
+            self.__index(key, obj)
+            self.forget_prefetched()
+            FileStorage.__dirty.add(key)
+            FileStorage.__fragments.pop(key, None)
+
+    def mark_dirty(self, obj, name=None):
+        """Records that an attribute of a stored obj has changed; the
+        indexes are only updated when they follow name. Setting or
+        deleting an attribute calls it, changing a mutable value in
+        place, as place.amenity_ids.append(id), doesn't
+        """
+        class_name = obj.__class__.__name__
+        key = f"{class_name}.{obj.id}"
+        with self.__lock:
+            if key not in FileStorage.__objects:
+                return
+            FileStorage.__dirty.add(key)
+            FileStorage.__fragments.pop(key, None)
+            self.forget_prefetched()
+            followed = FileStorage.__followed.get(class_name)
+            if followed is None:
+                followed = FileStorage.__followed[class_name] = \
+                    self.__followed_names(class_name)
+            if name not in followed:
+                return
+            self.__sync()
+            if name in FileStorage.__attribute_indexes.get(class_name, ()):
+                self.__unindex_value(key, name)
+                self.__index_value(key, obj, name)
+            if name in FileStorage.__column_names.get(class_name, ()):
+                FileStorage.__columns[class_name].update(
+                    key, name, getattr(obj, name, None))
+            for index in FileStorage.__followers.get(class_name, ()):
+                if name in index.follows[class_name]:
+                    index.index(key, obj)
+
+    def __followed_names(self, class_name):
+        """Returns the attribute names of class_name an index follows"""
+        names = set(FileStorage.__attribute_indexes.get(class_name, ()))
+        names.update(FileStorage.__column_names.get(class_name, ()))
+        for index in (FileStorage.__places, FileStorage.__reviews,
+                      FileStorage.__text):
+            names.update(index.follows.get(class_name, ()))
+        return frozenset(names)
+
+    def __follow(self):
+        """Registers by class name the indexes of spatial.py,
+        aggregates.py and text_index.py following its objects, the text
+        index only once search() built it; called when they are replaced
+        """
+        indexes = [FileStorage.__places, FileStorage.__reviews]
+        if FileStorage.__text_ready:
+            indexes.append(FileStorage.__text)
+        followers = {}
+        for index in indexes:
+            for class_name in index.follows:
+                followers.setdefault(class_name, []).append(index)
+        FileStorage.__followers = followers
+        FileStorage.__followed = {}
+
+    def delete(self, obj=None):
+        """Deletes obj from __objects if it's inside"""
+        if obj is None:
+            return
+        with self.__lock:
+            self.__sync()
+            self.__load_shards(obj.__class__.__name__)
+            key = f"{obj.__class__.__name__}.{obj.id}"
+            if FileStorage.__undo is not None:
+                self.__remember(key)
+            raw = FileStorage.__raw.get(obj.__class__.__name__, {})
+            if raw.pop(key, None) is not None or self.__take(key):
+                FileStorage.__dirty.add(key)
+            self.__retext(key)
+            self.forget_prefetched()
+            if FileStorage.__objects.pop(key, None) is not None:
+                self.__unindex(key)
+                FileStorage.__dirty.add(key)
+                FileStorage.__fragments.pop(key, None)
+
+    def loaded(self, cls=None):
+        """True when the objects of cls, or every object, are read and
+        built, so that get() and all() have nothing left to read or
+        decode
+        """
+        class_names = () if cls is None else (self.class_name(cls),)
+        return self.__ready(class_names)
+
+    def refresh(self):
+        """Reads the objects other processes saved since this one last
+        read or wrote the file, in shared mode and outside transactions;
+        returns True if the file had changed
+
+        The objects changed here since the last save are kept, the others
+        take the saved version. save() does the same under an exclusive
+        lock on <file path>.lock before it writes.
+        """
+        if not self.shared or FileStorage.__undo is not None:
+            return False
+        if self.__file_generation() == FileStorage.__generation:
+            return False
+        with FileLock(FileStorage.__file_path, shared=True):
+            return self.__merge()
+
+    def before_change(self, obj):
+        """Keeps the state of a stored obj before its first change"""
+        key = f"{obj.__class__.__name__}.{getattr(obj, 'id', None)}"
+        if FileStorage.__objects.get(key) is obj:
+            self.__remember(key)
+
+    def changing(self):
+        """Returns the context in which the models set and delete their
+        attributes: the write side of the lock in thread-safe mode, so
+        that save() never encodes an object in the middle of a change
+        """
+        if self.thread_safe:
+            return self.__lock
+        return UNLOCKED
+
+    def begin(self):
+        """Starts a transaction, or a savepoint in the one in progress"""
+        if FileStorage.__undo is None:
+            self.__sync()
+            FileStorage.__save_pending = False
+        else:
+            FileStorage.__savepoints.append(
+                (FileStorage.__undo, FileStorage.__save_pending))
+        FileStorage.__undo = {}
+
+    def commit(self):
+        """Ends the transaction, saving once if save() was called, or
+        hands the changes of a savepoint to the enclosing transaction
+        """
+        if FileStorage.__undo is None:
+            return
+        if FileStorage.__savepoints:
+            undo, _ = FileStorage.__savepoints.pop()
+            for key, state in FileStorage.__undo.items():
+                undo.setdefault(key, state)
+            FileStorage.__undo = undo
+            return
+        FileStorage.__undo = None
+        if FileStorage.__save_pending:
+            FileStorage.__save_pending = False
+            self.save()
+
+    def rollback(self):
+        """Ends the transaction, or the savepoint, restoring every key
+        it touched
+        """
+        undo = FileStorage.__undo
+        if undo is None:
+            return
+        if FileStorage.__savepoints:
+            FileStorage.__undo, FileStorage.__save_pending = \
+                FileStorage.__savepoints.pop()
+        else:
+            FileStorage.__undo = None
+            FileStorage.__save_pending = False
+        self.forget_prefetched()
+
+        with self.__lock:
+            for key, (obj, state, raw_value) in undo.items():
+                if key in FileStorage.__objects:
+                    FileStorage.__objects.pop(key)
+                    self.__unindex(key)
+                class_name = key.partition('.')[0]
+                FileStorage.__raw.get(class_name, {}).pop(key, None)
+                if obj is not None:
+                    obj.__setstate__(state)
+                    FileStorage.__objects[key] = obj
+                    self.__index(key, obj)
+                elif raw_value is not None:
+                    FileStorage.__raw.setdefault(
+                        class_name, {})[key] = raw_value
+                self.__retext(key, obj, raw_value)
+                FileStorage.__fragments.pop(key, None)
+                if obj is None and raw_value is not None:
+                    # the unbuilt record is the one in the data files
+                    FileStorage.__dirty.discard(key)
+                else:
+                    FileStorage.__dirty.add(key)
 
     def save(self):
-        """Serializes __objects to the JSON file"""
-        dictionary = {
-            key: value.to_dict()
+        """Serializes __objects to the JSON file
+
+        Between begin() and commit(), it is only done by commit(). With a
+        flush_interval, the write is left to the background writer
+        thread and save() returns at once.
+        """
+        if FileStorage.__undo is not None:
+            FileStorage.__save_pending = True
+            return
+        if self.__error is not None:
+            error, self.__error = self.__error, None
+            raise error
+        if self.flush_interval is None:
+            self.__write()
+            return
+
+        with self.__flush_requested:
+            if self.__writer is None:
+                self.__writer = threading.Thread(
+                    target=self.__write_loop, daemon=True)
+                self.__writer.start()
+                atexit.register(self.flush)
+            self.__pending = True
+            self.__flush_requested.notify()
+
+    def flush(self):
+        """Writes the changes left by save() to the background writer"""
+        with self.__flush_requested:
+            pending, self.__pending = self.__pending, False
+        if pending:
+            self.__write()
+        if self.__error is not None:
+            error, self.__error = self.__error, None
+            raise error
+
+    def compact(self):
+        """Rewrites the JSON file and the text index, and empties the
+        journal
+        """
+        with self.__io_lock:
+            if self.shared:
+                self.__write_shared(text=True)
+                return
+            if self.sharded:
+                self.__write_shards(every=True)
+            else:
+                self.__write_snapshot()
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            self.__journal_records = 0
+            self.__save_text()
+
+    def close(self):
+        """Writes the changes left to the background writer and the
+        text index, so that the next process doesn't rebuild it
+        """
+        self.flush()
+        with self.__io_lock:
+            if not self.shared:
+                self.__save_text()
+                return
+            with FileLock(FileStorage.__file_path):
+                # the index has to match the file it is saved with
+                self.__merge()
+                self.__save_text()
+
+    def __write_loop(self):
+        """Background writer: waits for a save() request, lets more
+        requests gather for flush_interval seconds, then writes them all
+        """
+        while True:
+            with self.__flush_requested:
+                while not self.__pending:
+                    self.__flush_requested.wait()
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as error:
+                self.__error = error
+
+    def __write(self):
+        """Writes the changes to the journal or the JSON file"""
+        if self.shared:
+            with self.__io_lock:
+                self.__write_shared()
+            return
+        if self.sharded:
+            with self.__io_lock:
+                self.__write_shards()
+            return
+        if not self.journal:
+            with self.__io_lock:
+                self.__write_snapshot()
+            return
+
+        with self.__io_lock:
+            with self.__lock:
+                lines = []
+                for key in FileStorage.__dirty:
+                    obj = FileStorage.__objects.get(key)
+                    if obj is None:
+                        lines.append(json.dumps({"op": "del", "key": key}))
+                    else:
+                        lines.append(
+                            '{"op": "put", "key": ' + json.dumps(key) +
+                            ', "value": ' + self.__encode(key, obj, 'json') +
+                            '}')
+                # for the next snapshot, when it isn't in json
+                FileStorage.__unencoded.update(FileStorage.__dirty)
+                written = set(FileStorage.__dirty)
+                FileStorage.__dirty.clear()
+            if lines:
+                try:
+                    with open(self.journal_path, 'a') as f:
+                        f.write("\n".join(lines) + "\n")
+                        f.flush()
+                        os.fsync(f.fileno())
+                except BaseException:
+                    self.__restore_dirty(written)
+                    raise
+            self.__journal_records += len(lines)
+
+        if self.__journal_records >= self.compact_threshold:
+            self.compact()
+
+    def __write_shared(self, text=False):
+        """Merges the changes of other processes and writes the JSON
+        file, and the text index when text is True, under the lock file
+        """
+        with FileLock(FileStorage.__file_path) as lock:
+            self.__merge()
+            self.__write_snapshot()
+            lock.count_write()
+            FileStorage.__generation = self.__file_generation()
+            if text:
+                self.__save_text()
+
+    def __reading(self):
+        """Returns the context of a query: the read side of the lock in
+        thread-safe mode, nothing otherwise
+        """
+        if self.thread_safe:
+            return self.__lock.read()
+        return nullcontext()
+
+    def __prepare(self, *class_names, build=True):
+        """Reads the shards of class_names, of every class without any,
+        and builds their objects left unbuilt unless build is False;
+        the lock is only taken when there is something to do
+        """
+        if self.__ready(class_names, build):
+            return
+        with self.__lock:
+            self.__sync()
+            if not class_names:
+                class_names = set(FileStorage.__shards) | \
+                    set(FileStorage.__raw)
+                if FileStorage.__mapped is not None:
+                    class_names.update(FileStorage.__mapped.class_names())
+            self.__load_shards(*class_names)
+            if build:
+                for class_name in class_names:
+                    self.__materialize(class_name)
+
+    def __ready(self, class_names, build=True):
+        """True when the objects of class_names, or of every class, are
+        all read and, unless build is False, built
+        """
+        if FileStorage.__indexed is not FileStorage.__objects or \
+                FileStorage.__mapped is not None:
+            return False
+        shards, raw = FileStorage.__shards, FileStorage.__raw
+        names = class_names or set(shards) | set(raw)
+        return not any(name in shards or (build and raw.get(name))
+                       for name in names)
+
+    def __remember(self, key):
+        """Records the state of key before its first change in the
+        transaction: the stored instance and a copy of its attributes,
+        or the unbuilt dictionary in lazy mode
+        """
+        if key in FileStorage.__undo:
+            return
+        obj = FileStorage.__objects.get(key)
+        class_name = key.partition('.')[0]
+        raw_value = FileStorage.__raw.get(class_name, {}).get(key)
+        if (raw_value is None and FileStorage.__mapped is not None and
+                key not in FileStorage.__taken.get(class_name, ())):
+            raw_value = FileStorage.__mapped.get(key)
+        FileStorage.__undo[key] = (
+            obj,
+            dict(obj.__getstate__()) if obj is not None else None,
+            raw_value
+            )
+
+    def __index(self, key, obj):
+        """Adds obj to the class and attribute indexes"""
+        class_name = key.partition('.')[0]
+        FileStorage.__classes.setdefault(class_name, {})[key] = obj
+        for name in FileStorage.__attribute_indexes.get(class_name, ()):
+            self.__index_value(key, obj, name)
+        if class_name in FileStorage.__column_names:
+            columns = FileStorage.__columns.get(class_name)
+            if columns is None:
+                columns = FileStorage.__columns[class_name] = Columns(
+                    FileStorage.__column_names[class_name])
+            columns.add(key, obj)
+        for index in FileStorage.__followers.get(class_name, ()):
+            index.index(key, obj)
+
+    def __unindex(self, key):
+        """Removes the object stored under key from the indexes"""
+        class_name = key.partition('.')[0]
+        FileStorage.__classes.get(class_name, {}).pop(key, None)
+        for name in FileStorage.__attribute_indexes.get(class_name, ()):
+            self.__unindex_value(key, name)
+        if class_name in FileStorage.__columns:
+            FileStorage.__columns[class_name].remove(key)
+        for index in FileStorage.__followers.get(class_name, ()):
+            index.remove(key)
+
+    def __retext(self, key, obj=None, value=None):
+        """Indexes the words of obj, or of the unbuilt dictionary value,
+        stored under key, or removes key from the text index without
+        either; nothing is done until the first search() built it
+        """
+        names = FileStorage.__text.follows.get(key.partition('.')[0])
+        if not FileStorage.__text_ready or names is None:
+            return
+        if obj is not None:
+            FileStorage.__text.index(key, obj)
+        elif value is not None:
+            FileStorage.__text.add(key, [value.get(name) for name in names])
+        else:
+            FileStorage.__text.remove(key)
+
+    def __build_text(self):
+        """Reads the saved text index, or indexes the words of every
+        object with text_attributes
+        """
+        FileStorage.__text_ready = True
+        if not self.__load_text():
+            FileStorage.__text = TextIndex()
+            for class_name in FileStorage.__text.follows:
+                self.__load_shards(class_name)
+                self.__materialize(class_name)
+                for key, obj in FileStorage.__classes.get(class_name,
+                                                          {}).items():
+                    self.__retext(key, obj)
+        self.__follow()
+
+    def __stamp(self):
+        """Returns the path, size and modification time of the existing
+        data files, telling if the saved text index is still valid
+        """
+        paths = [FileStorage.__file_path, self.journal_path]
+        if self.sharded:
+            paths.extend(self.shard_path(class_name, bucket)
+                         for class_name in self.classes()
+                         for bucket in range(self.buckets))
+        stamp = []
+        for path in paths:
+            if os.path.exists(path):
+                stat = os.stat(path)
+                stamp.append([path, stat.st_size, stat.st_mtime_ns])
+        return stamp
+
+    def __save_text(self):
+        """Writes the text index next to the data files once built,
+        unless it holds changes they don't
+        """
+        with self.__lock:
+            if not FileStorage.__text_ready or FileStorage.__dirty:
+                return
+            data = json.dumps({"stamp": self.__stamp(),
+                               "documents": FileStorage.__text.dump()})
+        self.__replace(self.text_index_path, lambda f: f.write(data),
+                       binary=False)
+
+    def __load_text(self):
+        """Reads the saved text index if the data files didn't change
+        since it was written, and indexes the changes not saved yet;
+        returns True if it was read
+        """
+        try:
+            with open(self.text_index_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("stamp") != self.__stamp():
+            return False
+        FileStorage.__text = TextIndex(data["documents"])
+        for key in FileStorage.__dirty:
+            self.__retext(key, FileStorage.__objects.get(key))
+        return True
+
+    def __index_value(self, key, obj, name):
+        """Adds obj to the index of its attribute name"""
+        value = getattr(obj, name, None)
+        class_name = key.partition('.')[0]
+        index = FileStorage.__values.setdefault(class_name, {})
+        try:
+            index.setdefault(name, {}).setdefault(value, {})[key] = obj
+        except TypeError:
+            # unhashable values can't be looked up, leave them out
+            return
+        FileStorage.__indexed_values[(key, name)] = value
+
+    def __unindex_value(self, key, name):
+        """Removes the object stored under key from the index of name"""
+        if (key, name) not in FileStorage.__indexed_values:
+            return
+        value = FileStorage.__indexed_values.pop((key, name))
+        class_name = key.partition('.')[0]
+        buckets = FileStorage.__values[class_name][name]
+        bucket = buckets[value]
+        bucket.pop(key, None)
+        if not bucket:
+            del buckets[value]
+
+    def __sync(self):
+        """Rebuilds the indexes when __objects was replaced"""
+        if FileStorage.__indexed is FileStorage.__objects:
+            return
+        FileStorage.__indexed = FileStorage.__objects
+        FileStorage.__raw = {}
+        FileStorage.__mapped = None
+        FileStorage.__taken = {}
+        FileStorage.__shards = {}
+        FileStorage.__classes = {}
+        FileStorage.__values = {}
+        FileStorage.__indexed_values = {}
+        FileStorage.__columns = {}
+        FileStorage.__places = GridIndex()
+        FileStorage.__text = TextIndex()
+        FileStorage.__text_ready = False
+        FileStorage.__reviews = ReviewAggregates()
+        self.__follow()
+        FileStorage.__generation = None
+        FileStorage.__unencoded = set(FileStorage.__objects)
+        # the changes made to the replaced dictionary don't apply
+        FileStorage.__dirty.clear()
+        self.forget_prefetched()
+        for key, obj in FileStorage.__objects.items():
+            self.__index(key, obj)
+
+    def __build(self, key, value):
+        """Builds and registers the instance of a parsed dictionary"""
+        obj = self.classes()[value['__class__']].from_dict(value)
+        self.__register(key, obj)
+        return obj
+
+    def __register(self, key, obj):
+        """Stores a freshly loaded obj without marking it dirty"""
+        if key in FileStorage.__objects:
+            self.__unindex(key)
+        FileStorage.__objects[key] = obj
+        FileStorage.__unencoded.add(key)
+        self.__index(key, obj)
+
+    def __take(self, key):
+        """Marks the record of key in the mapped file as superseded, and
+        returns True if it was there and not superseded yet
+        """
+        mapped = FileStorage.__mapped
+        if mapped is None:
+            return False
+        taken = FileStorage.__taken.setdefault(key.partition('.')[0], set())
+        if key in taken or not mapped.contains(key):
+            return False
+        taken.add(key)
+        return True
+
+    def __materialize(self, class_name):
+        """Builds every parsed dictionary of class_name left in __raw or
+        in the mapped file
+        """
+        raw = FileStorage.__raw.pop(class_name, {})
+        for key, value in raw.items():
+            self.__build(key, value)
+        mapped = FileStorage.__mapped
+        if mapped is not None and mapped.count(class_name):
+            taken = FileStorage.__taken.setdefault(class_name, set())
+            for key, value in list(mapped.records(class_name, taken)):
+                taken.add(key)
+                self.__build(key, value)
+
+    def __unbuilt(self):
+        """Yields the (key, dictionary) pairs of the records that have
+        not been built, in __raw and in the mapped file
+        """
+        for raw in FileStorage.__raw.values():
+            yield from raw.items()
+        mapped = FileStorage.__mapped
+        if mapped is not None:
+            for class_name in mapped.class_names():
+                yield from mapped.records(
+                    class_name, FileStorage.__taken.get(class_name, ()))
+
+    def __encode(self, key, obj, format):
+        """Returns the cached encoding of obj in format, encoding it if
+        needed; see __encode_dict()
+        """
+        cached = FileStorage.__fragments.get(key)
+        if cached is None or cached[0] is not obj:
+            cached = FileStorage.__fragments[key] = (obj, {})
+        payload = cached[1].get(format)
+        if payload is None:
+            payload = cached[1][format] = self.__encode_dict(
+                key, obj.to_dict(), format)
+        return payload
+
+    def __encode_dict(self, key, value, format):
+        """Returns the dictionary value stored under key as a binary
+        record for 'binary', as json text for 'json', or as the
+        "key": value member of the JSON file for 'member'
+        """
+        if format == 'binary':
+            return FileStorage.__binary.encode(value)
+        if format == 'member':
+            return json.dumps(key) + ": " + json.dumps(value)
+        return json.dumps(value)
+
+    def __serialize(self, payloads, unbuilt):
+        """Returns the parts of a file in the configured format holding
+        payloads, the encodings of the objects returned by __encode()
+        in the format of __encoding(), and the (key, dictionary) pairs
+        of unbuilt
+        """
+        if self.format == 'binary':
+            binary = FileStorage.__binary
+            parts = [binary.header()]
+            parts.extend(payloads)
+            parts.extend(binary.encode(value) for _, value in unbuilt)
+        elif self.format == 'ndjson':
+            parts = [payload + "\n" for payload in payloads]
+            parts.extend(json.dumps(value) + "\n" for _, value in unbuilt)
+        else:
+            items = list(payloads)
+            items.extend(
+                json.dumps(key) + ": " + json.dumps(value)
+                for key, value in unbuilt
+                )
+            parts = ["{", ", ".join(items), "}"]
+        return parts
+
+    def __write_snapshot(self):
+        """Writes every object of __objects to the JSON file
+
+        Under the storage lock, the objects that changed or were never
+        encoded are encoded, and the objects and their encodings are
+        copied; the text is then built from the copies and written to a
+        temporary file that is fsynced and renamed over the JSON file,
+        so a crash never leaves a truncated file behind.
+        """
+        format = self.__encoding()
+        with self.__lock:
+            self.__sync()
+            objects = FileStorage.__objects
+            if self.format in ('binary', 'indexed'):
+                records = self.__binary_records()
+                header = FileStorage.__binary.header()
+                FileStorage.__unencoded = set()
+            else:
+                for key in FileStorage.__unencoded | FileStorage.__dirty:
+                    obj = objects.get(key)
+                    if obj is not None:
+                        self.__encode(key, obj, format)
+                FileStorage.__unencoded = set()
+                keys = list(objects)
+                fragments = dict(FileStorage.__fragments)
+                unbuilt = list(self.__unbuilt())
+            written = set(FileStorage.__dirty)
+            FileStorage.__dirty.clear()
+            self.__prune_fragments()
+
+        try:
+            if self.format == 'indexed':
+                self.__replace(
+                    FileStorage.__file_path,
+                    lambda f: indexed_file.write(f, header, records))
+                return
+            if self.format == 'binary':
+                parts = [header]
+                parts.extend(record for _, record in records)
+            else:
+                parts = self.__serialize(
+                    self.__payloads(keys, fragments, format), unbuilt)
+            self.__replace(FileStorage.__file_path,
+                           lambda f: f.writelines(parts))
+        except BaseException:
+            self.__restore_dirty(written)
+            raise
+
+    def __write_shards(self, every=False):
+        """Rewrites the shards holding changed objects, or every shard
+        that was read when every is True
+        """
+        with self.__lock:
+            if every:
+                shards = {
+                    (class_name, bucket)
+                    for class_name in set(FileStorage.__classes) |
+                    set(FileStorage.__raw)
+                    for bucket in range(self.buckets)
+                    }
+            else:
+                shards = {self.__shard(key) for key in FileStorage.__dirty}
+            writes = []
+            for class_name, bucket in shards:
+                objects = FileStorage.__classes.get(class_name, {}).items()
+                unbuilt = FileStorage.__raw.get(class_name, {}).items()
+                if self.buckets > 1:
+                    objects = [item for item in objects
+                               if self.__shard(item[0])[1] == bucket]
+                    unbuilt = [item for item in unbuilt
+                               if self.__shard(item[0])[1] == bucket]
+                payloads = [self.__encode(key, obj, self.__encoding())
+                            for key, obj in objects]
+                writes.append((self.shard_path(class_name, bucket),
+                               self.__serialize(payloads, unbuilt)))
+            written = set(FileStorage.__dirty)
+            FileStorage.__dirty.clear()
+            self.__prune_fragments()
+
+        try:
+            for path, parts in writes:
+                self.__replace(path, lambda f: f.writelines(parts))
+        except BaseException:
+            self.__restore_dirty(written)
+            raise
+
+    def __restore_dirty(self, keys):
+        """Marks keys dirty again after their write failed"""
+        with self.__lock:
+            FileStorage.__dirty.update(keys)
+
+    def __encoding(self):
+        """Returns the encoding of the objects in the data files"""
+        if self.format in ('binary', 'indexed'):
+            return 'binary'
+        return 'json' if self.format == 'ndjson' else 'member'
+
+    def __payloads(self, keys, fragments, format):
+        """Returns the encodings of the objects of keys, read from
+        fragments, a copy of __fragments where every stored object was
+        encoded
+        """
+        try:
+            return [fragments[key][1][format] for key in keys]
+        except KeyError:
+            pass
+        # some objects were only encoded for another format, by another
+        # instance
+        payloads = []
+        for key in keys:
+            cached = fragments.get(key)
+            payload = None if cached is None else cached[1].get(format)
+            if payload is None:
+                obj = FileStorage.__objects.get(key)
+                if obj is None:
+                    continue
+                payload = self.__encode_dict(key, obj.to_dict(), format)
+            payloads.append(payload)
+        return payloads
+
+    def __shard(self, key):
+        """Returns the class name and bucket of key"""
+        class_name = key.partition('.')[0]
+        if self.buckets == 1:
+            return class_name, 0
+        return class_name, zlib.crc32(key.encode()) % self.buckets
+
+    def __prune_fragments(self):
+        """Drops the cached encodings of the objects no longer stored"""
+        objects = FileStorage.__objects
+        fragments = FileStorage.__fragments
+        if len(fragments) > len(objects):
+            for key in [k for k in fragments if k not in objects]:
+                del fragments[key]
+
+    def __replace(self, path, write, binary=None):
+        """Calls write with a temporary file that is fsynced and renamed
+        over path, opened in binary mode for the binary formats unless
+        binary says otherwise; the directory is then fsynced so that the
+        rename itself survives a crash
+        """
+        directory = os.path.dirname(path) or '.'
+        if binary is None:
+            binary = self.format not in ('json', 'ndjson')
+        mode = 'wb' if binary else 'w'
+        # a name of its own, as other threads and processes may be
+        # writing the same file
+        fd, temp_path = tempfile.mkstemp(
+            prefix=os.path.basename(path) + ".", suffix=".tmp",
+            dir=directory)
+        try:
+            with os.fdopen(fd, mode) as f:
+                write(f)
+                f.flush()
+                os.fsync(f.fileno())
+            try:
+                permissions = stat.S_IMODE(os.stat(path).st_mode)
+            except FileNotFoundError:
+                permissions = 0o644
+            os.chmod(temp_path, permissions)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self.__sync_directory(directory)
+
+    @staticmethod
+    def __sync_directory(directory):
+        """Fsyncs directory, where the platform can open one"""
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def __binary_records(self):
+        """Returns the (key, binary record) pairs of every object
+
+        The records of the mapped file that were never built are copied
+        as they are when its name table is compatible with __binary.
+        """
+        binary = FileStorage.__binary
+        records = [
+            (key, self.__encode(key, value, 'binary'))
             for key, value in FileStorage.__objects.items()
-            }
+            ]
+        for raw in FileStorage.__raw.values():
+            records.extend(
+                (key, binary.encode(value)) for key, value in raw.items())
+        mapped = FileStorage.__mapped
+        if mapped is None:
+            return records
+        copy = binary.adopt(mapped.names)
+        for class_name in mapped.class_names():
+            taken = FileStorage.__taken.get(class_name, ())
+            if copy:
+                records.extend(mapped.encoded(class_name, taken))
+            else:
+                records.extend(
+                    (key, binary.encode(value))
+                    for key, value in mapped.records(class_name, taken))
+        return records
+
+    def __map(self, view):
+        """Maps the file with view, IndexedFile or BinaryFile; the keys
+        already stored are taken
+        """
+        mapped = FileStorage.__mapped = view(FileStorage.__file_path)
+        FileStorage.__taken = {}
+        # let the records be copied as they are by the next save()
+        FileStorage.__binary.adopt(mapped.names)
+        for key in FileStorage.__objects:
+            self.__take(key)
+        for raw in FileStorage.__raw.values():
+            for key in raw:
+                self.__take(key)
+
+    def __file_generation(self):
+        """Returns the write count of the lock file and the inode, size
+        and modification time of the JSON file, or None without a file
+        """
+        path = FileStorage.__file_path
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return write_count(path), stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def __merge(self):
+        """Applies the objects saved by other processes since the JSON
+        file was last read or written here, except on the dirty keys,
+        and drops the mapped binary file; returns True if the file had
+        changed
+        """
+        generation = self.__file_generation()
+        if generation == FileStorage.__generation:
+            return False
+        records = dict(read_records(FileStorage.__file_path,
+                                    self.format == 'ndjson'))
+        class_mapping = self.classes()
+        with self.__lock:
+            self.__sync()
+            self.forget_prefetched()
+            if FileStorage.__mapped is not None:
+                # its records are those of the replaced file, records
+                # holds the saved ones
+                FileStorage.__mapped.close()
+                FileStorage.__mapped = None
+                FileStorage.__taken = {}
+            dirty = FileStorage.__dirty
+            objects = FileStorage.__objects
+            for key in [key for key in objects
+                        if key not in records and key not in dirty]:
+                del objects[key]
+                self.__unindex(key)
+                self.__retext(key)
+                FileStorage.__fragments.pop(key, None)
+            for raw in FileStorage.__raw.values():
+                for key in [key for key in raw
+                            if key not in records and key not in dirty]:
+                    del raw[key]
+                    self.__retext(key)
+            for key, value in records.items():
+                class_name = value.get('__class__')
+                if key in dirty or class_name not in class_mapping:
+                    continue
+                obj = objects.get(key)
+                if obj is None:
+                    self.__load(key, value, class_mapping)
+                    self.__retext(key, objects.get(key), value)
+                elif obj.to_dict() != value:
+                    # update the instance in place, it may be referenced
+                    saved = class_mapping[class_name].from_dict(value)
+                    self.__unindex(key)
+                    obj.__setstate__(dict(saved.__getstate__()))
+                    self.__index(key, obj)
+                    FileStorage.__fragments.pop(key, None)
+                    FileStorage.__unencoded.add(key)
+        FileStorage.__generation = generation
+        return True
+
+    def __replay(self):
+        """Returns the last journal record of each key
+
+        Deleted keys map to None. A torn line left by an interrupted
+        append, and anything after it, is cut off the journal, so that
+        the next append starts on a line of its own.
+        """
+        self.__journal_records = 0
+        data = {}
+        if not os.path.exists(self.journal_path):
+            return data
+        with open(self.journal_path, 'r+b') as f:
+            end = 0
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("no end of line")
+                    record = json.loads(line)
+                except ValueError:
+                    f.truncate(end)
+                    os.fsync(f.fileno())
+                    break
+                data[record["key"]] = record.get("value")
+                self.__journal_records += 1
+                end += len(line)
+        return data
 
-        with open(FileStorage.__file_path, 'w') as f:
-            json.dump(dictionary, f)
+    def __read(self, tasks):
+        """Yields the lists of records returned by tasks, pairs of a
+        record_reader function and its arguments, run in a process pool
+        when workers is set
+        """
+        if not self.workers or len(tasks) < 2:
+            for function, args in tasks:
+                yield function(*args)
+            return
+        with ProcessPoolExecutor(self.workers) as pool:
+            futures = [pool.submit(function, *args)
+                       for function, args in tasks]
+            for future in futures:
+                yield future.result()
+
+    def __load(self, key, value, class_mapping):
+        """Registers one record, or keeps it parsed in lazy mode"""
+        class_name = value['__class__']
+        if class_name not in class_mapping:
+            return
+        if self.lazy and key not in FileStorage.__objects:
+            FileStorage.__raw.setdefault(class_name, {})[key] = value
+        else:
+            self.__register(key, class_mapping[class_name].from_dict(value))
+
+    def __load_shards(self, *class_names):
+        """Reads the shards of class_names that were not read yet"""
+        ndjson = self.format == 'ndjson'
+        tasks = [
+            (read_file, (path, ndjson))
+            for class_name in list(class_names)
+            for path in FileStorage.__shards.pop(class_name, ())
+            ]
+        if not tasks:
+            return
+        class_mapping = self.classes()
+        with self.__lock:
+            for records in self.__read(tasks):
+                for key, value in records:
+                    self.__load(key, value, class_mapping)
 
     def reload(self):
         """Deserializes __objects from the JSON file"""
-        from models.base_model import BaseModel
-        from models.user import User
-        from models.place import Place
-        from models.city import City
-        from models.amenity import Amenity
-        from models.state import State
-        from models.review import Review
-
-        class_mapping = {
-            'BaseModel': BaseModel,
-            'User': User,
-            'Place': Place,
-            'City': City,
-            'Amenity': Amenity,
-            'State': State,
-            'Review': Review
-            }
-
-        if os.path.exists(FileStorage.__file_path):
-            with open(FileStorage.__file_path, 'r') as f:
-                data = json.load(f)
-                for key, value in data.items():
-                    class_name = value['__class__']
-                    if class_name in class_mapping:
-                        self.new(class_mapping[class_name](**value))
+        if not self.shared:
+            self.__reload()
+            return
+        with FileLock(FileStorage.__file_path, shared=True):
+            generation = self.__file_generation()
+            self.__reload()
+        FileStorage.__generation = generation
+
+    def __reload(self):
+        """Reads the data files and the journal"""
+        class_mapping = self.classes()
+        journal = self.__replay() if self.journal else {}
+
+        self.__sync()
+        # the first search() reads the saved text index
+        FileStorage.__text = TextIndex()
+        FileStorage.__text_ready = False
+        self.__follow()
+        if FileStorage.__mapped is not None:
+            FileStorage.__mapped.close()
+            FileStorage.__mapped = None
+        path = FileStorage.__file_path
+        if self.sharded:
+            FileStorage.__shards = {}
+            for class_name in class_mapping:
+                paths = [self.shard_path(class_name, bucket)
+                         for bucket in range(self.buckets)]
+                paths = [path for path in paths if os.path.exists(path)]
+                if paths:
+                    FileStorage.__shards[class_name] = paths
+        elif os.path.exists(path) and is_indexed(path):
+            self.__map(IndexedFile)
+        elif os.path.exists(path) and is_binary(path):
+            self.__map(BinaryFile)
+        elif self.workers and self.format == 'ndjson' and \
+                os.path.exists(path):
+            tasks = [(read_lines, (path, start, end))
+                     for start, end in chunks(path, self.workers)]
+            for records in self.__read(tasks):
+                for key, value in records:
+                    if key not in journal:
+                        self.__load(key, value, class_mapping)
+        else:
+            for key, value in read_records(path, self.format == 'ndjson'):
+                if key not in journal:
+                    self.__load(key, value, class_mapping)
+        for key, value in journal.items():
+            self.__take(key)
+            if value is not None:
+                self.__load(key, value, class_mapping)
+        FileStorage.__dirty.clear()
+        self.forget_prefetched()
@@ -0,0 +1,205 @@
+#!/usr/bin/python3
+"""
+Offset-indexed storage file, read through mmap
+
+    header      MAGIC, then uint64 index offset, uint32 entry count,
+                uint32 key width and uint64 class table offset
+    names       name table of the binary records
+    records     binary_format records, one after the other
+    index       entry count entries sorted by key: the key padded with
+                NUL bytes to the key width, uint64 record offset and
+                uint32 record length
+    classes     uint32 count, then for each class: uint16 name length,
+                name, uint32 first entry and uint32 number of entries
+
+Keys are "<class name>.<id>", so the entries of a class are contiguous
+and a record is found by a binary search over the mapped index without
+reading anything else.
+"""
+import mmap
+import struct
+from models.engine.binary_format import MAGIC as BINARY_MAGIC, BinaryFormat
+
+MAGIC = b"HBNBIDX\x01"
+HEADER = struct.Struct("<8sQIIQ")
+ENTRY = struct.Struct("<QI")
+U16 = struct.Struct("<H")
+U32 = struct.Struct("<I")
+CLASS = struct.Struct("<II")
+
+
+def is_indexed(path):
+    """Returns True if the file at path starts with MAGIC"""
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def write(f, header, records):
+    """Writes an indexed file to the binary file object f
+
+    header is the BinaryFormat.header() of the name table used by the
+    records, and records an iterable of (key, record bytes) pairs.
+    """
+    entries = []
+    offset = HEADER.size + len(header) - len(BINARY_MAGIC)
+    f.write(b"\0" * HEADER.size)
+    f.write(header[len(BINARY_MAGIC):])
+    for key, data in records:
+        entries.append((key.encode(), offset, len(data)))
+        f.write(data)
+        offset += len(data)
+
+    entries.sort()
+    width = max((len(key) for key, _, _ in entries), default=0)
+    index_offset = offset
+    classes = {}
+    for position, (key, record_offset, length) in enumerate(entries):
+        f.write(key.ljust(width, b"\0") + ENTRY.pack(record_offset, length))
+        class_name = key.partition(b".")[0]
+        first, count = classes.get(class_name, (position, 0))
+        classes[class_name] = (first, count + 1)
+
+    class_offset = index_offset + len(entries) * (width + ENTRY.size)
+    f.write(U32.pack(len(classes)))
+    for class_name, (first, count) in classes.items():
+        f.write(U16.pack(len(class_name)) + class_name +
+                CLASS.pack(first, count))
+    f.seek(0)
+    f.write(HEADER.pack(MAGIC, index_offset, len(entries), width,
+                        class_offset))
+
+
+class IndexedFile:
+    """Read-only view of an indexed file
+
+    Opening it only reads the header, the name table and the class
+    table; get() and contains() are binary searches over the index.
+    """
+
+    def __init__(self, path):
+        """Maps the file at path"""
+        with open(path, 'rb') as f:
+            self.__map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = self.__map
+        (_, self.__index, self.__count, self.__width,
+         class_offset) = HEADER.unpack_from(view, 0)
+        self.__entry_size = self.__width + ENTRY.size
+
+        offset = HEADER.size
+        count, = U32.unpack_from(view, offset)
+        offset += 4
+        self.names = []
+        for _ in range(count):
+            size, = U16.unpack_from(view, offset)
+            offset += 2
+            self.names.append(view[offset:offset + size].decode())
+            offset += size
+
+        self.__classes = {}
+        count, = U32.unpack_from(view, class_offset)
+        offset = class_offset + 4
+        for _ in range(count):
+            size, = U16.unpack_from(view, offset)
+            offset += 2
+            class_name = view[offset:offset + size].decode()
+            self.__classes[class_name] = CLASS.unpack_from(
+                view, offset + size)
+            offset += size + CLASS.size
+        self.__binary = BinaryFormat()
+
+    def close(self):
+        """Unmaps the file"""
+        self.__map.close()
+
+    def count(self, class_name=None):
+        """Returns the number of records, or of records of class_name"""
+        if class_name is None:
+            return self.__count
+        return self.__classes.get(class_name, (0, 0))[1]
+
+    def class_names(self):
+        """Returns the names of the classes stored in the file"""
+        return list(self.__classes)
+
+    def contains(self, key):
+        """Returns True if a record is stored under key"""
+        return self.__find(key) is not None
+
+    def get(self, key):
+        """Returns the dictionary stored under key, or None"""
+        position = self.__find(key)
+        if position is None:
+            return None
+        return self.__record(key, position)
+
+    def keys(self, class_name=None):
+        """Yields the keys of all records, or of records of class_name"""
+        for position in self.__positions(class_name):
+            yield self.__key(position)
+
+    def records(self, class_name=None, exclude=()):
+        """Yields the (key, dictionary) pairs of the records, or of the
+        records of class_name, leaving out the keys in exclude
+        """
+        for position in self.__positions(class_name):
+            key = self.__key(position)
+            if key not in exclude:
+                yield key, self.__record(key, position)
+
+    def encoded(self, class_name=None, exclude=()):
+        """Yields the (key, encoded bytes) pairs of the records, or of
+        the records of class_name, leaving out the keys in exclude
+        """
+        for position in self.__positions(class_name):
+            key = self.__key(position)
+            if key not in exclude:
+                offset, length = self.__entry(position)
+                yield key, self.__map[offset:offset + length]
+
+    def __positions(self, class_name):
+        """Returns the range of index positions of class_name"""
+        if class_name is None:
+            return range(self.__count)
+        first, count = self.__classes.get(class_name, (0, 0))
+        return range(first, first + count)
+
+    def __key(self, position):
+        """Returns the key of the index entry at position"""
+        start = self.__index + position * self.__entry_size
+        key = self.__map[start:start + self.__width]
+        return key.rstrip(b"\0").decode()
+
+    def __entry(self, position):
+        """Returns the record offset and length of an index entry"""
+        start = self.__index + position * self.__entry_size
+        return ENTRY.unpack_from(self.__map, start + self.__width)
+
+    def __record(self, key, position):
+        """Returns the dictionary of the index entry of key at position"""
+        offset, length = self.__entry(position)
+        view = memoryview(self.__map)[offset + 6:offset + length]
+        try:
+            return self.__binary.decode(view, key.partition(".")[0],
+                                        self.names)
+        finally:
+            view.release()
+
+    def __find(self, key):
+        """Returns the index position of key, or None"""
+        target = key.encode()
+        if len(target) > self.__width:
+            return None
+        target = target.ljust(self.__width, b"\0")
+        positions = self.__positions(key.partition(".")[0])
+        low, high = positions.start, positions.stop
+        while low < high:
+            middle = (low + high) // 2
+            start = self.__index + middle * self.__entry_size
+            current = self.__map[start:start + self.__width]
+            if current < target:
+                low = middle + 1
+            elif current > target:
+                high = middle
+            else:
+                return middle
+        return None
@@ -0,0 +1,188 @@
+#!/usr/bin/python3
+"""
+Locks shared between processes and between threads
+
+FileLock is an advisory lock taken with fcntl.flock() on a separate
+<path>.lock file, since the data file itself is replaced by a rename on
+every write. The lock file also holds the number of writes made under
+the lock, which changes even when two writes get the same modification
+time. Where fcntl doesn't exist the file locks do nothing.
+
+ReadWriteLock lets the threads of a process read together while a
+writer waits for them and then has the lock alone.
+"""
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def write_count(path):
+    """Returns the number of writes counted in the lock file of path"""
+    try:
+        with open(path + ".lock", 'r') as f:
+            return int(f.read() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+class FileLock:
+    """Context manager holding the lock of path, shared between
+    readers or exclusive for a writer
+    """
+
+    def __init__(self, path, shared=False):
+        """Describes the lock of path"""
+        self.path = path + ".lock"
+        self.shared = shared
+        self.__file = None
+
+    def __enter__(self):
+        """Waits for the lock"""
+        self.__file = open(self.path, 'a+')
+        if fcntl is None:
+            return self
+        try:
+            fcntl.flock(self.__file.fileno(),
+                        fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX)
+        except BaseException:
+            self.__file.close()
+            self.__file = None
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        """Releases the lock"""
+        if fcntl is not None:
+            fcntl.flock(self.__file.fileno(), fcntl.LOCK_UN)
+        self.__file.close()
+        self.__file = None
+
+    def count_write(self):
+        """Adds a write to the count, under an exclusive lock"""
+        f = self.__file
+        f.seek(0)
+        try:
+            count = int(f.read() or 0)
+        except ValueError:
+            count = 0
+        f.truncate(0)
+        f.write(str(count + 1))
+        f.flush()
+
+
+class ReadWriteLock:
+    """Lock held by any number of readers or by a single writer
+
+    Once a writer waits, new readers wait for it, and the readers
+    waiting when a writer releases the lock all get it before the next
+    writer, so that neither side starves. The writer can take the lock
+    again, for reading or writing, and a reader can read again, but a
+    reader can't start writing.
+    Using the lock in a with statement takes it for writing, like an
+    RLock.
+    """
+
+    def __init__(self):
+        """Creates an unlocked lock"""
+        self.__condition = threading.Condition(threading.Lock())
+        self.__readers = 0
+        self.__writer = None
+        self.__writes = 0
+        self.__waiting = 0
+        self.__waiting_readers = 0
+        self.__releases = 0
+        self.__local = threading.local()
+
+    def __enter__(self):
+        """Takes the lock for writing"""
+        self.acquire_write()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Releases the lock taken for writing"""
+        self.release_write()
+
+    @contextmanager
+    def read(self):
+        """Holds the lock for reading"""
+        self.acquire_read()
+        try:
+            yield self
+        finally:
+            self.release_read()
+
+    def acquire_write(self):
+        """Waits until no other thread holds the lock, then holds it"""
+        me = threading.get_ident()
+        if self.__writer == me:
+            self.__writes += 1
+            return
+        if getattr(self.__local, 'reads', 0):
+            raise RuntimeError("a reader can't take the lock for writing")
+        with self.__condition:
+            self.__waiting += 1
+            try:
+                while self.__writer is not None or self.__readers:
+                    self.__condition.wait()
+            finally:
+                self.__waiting -= 1
+            self.__writer = me
+            self.__writes = 1
+
+    def release_write(self):
+        """Releases one write hold of the lock"""
+        if self.__writer != threading.get_ident():
+            raise RuntimeError("the lock isn't held for writing")
+        self.__writes -= 1
+        if not self.__writes:
+            with self.__condition:
+                self.__writer = None
+                # let in the readers that waited for this writer
+                self.__readers += self.__waiting_readers
+                self.__waiting_readers = 0
+                self.__releases += 1
+                self.__condition.notify_all()
+
+    def acquire_read(self):
+        """Waits until no writer holds or waits for the lock, then
+        holds it with the other readers
+        """
+        local = self.__local
+        holds = getattr(local, 'holds', None)
+        if holds is None:
+            holds = local.holds = []
+        if self.__writer == threading.get_ident():
+            self.__writes += 1
+            holds.append(False)
+            return
+        reads = getattr(local, 'reads', 0)
+        if not reads:
+            with self.__condition:
+                if self.__writer is None and not self.__waiting:
+                    self.__readers += 1
+                else:
+                    self.__waiting_readers += 1
+                    releases = self.__releases
+                    while self.__releases == releases:
+                        self.__condition.wait()
+        local.reads = reads + 1
+        holds.append(True)
+
+    def release_read(self):
+        """Releases one read hold of the lock"""
+        local = self.__local
+        if not getattr(local, 'holds', None):
+            raise RuntimeError("the lock isn't held for reading")
+        if not local.holds.pop():
+            self.release_write()
+            return
+        local.reads -= 1
+        if not local.reads:
+            with self.__condition:
+                self.__readers -= 1
+                if not self.__readers:
+                    self.__condition.notify_all()
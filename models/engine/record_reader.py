@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+"""
+Functions reading the records of a FileStorage file
+
+They only return parsed dictionaries, so they can run in the worker
+processes of a parallel reload and leave building the instances to the
+parent process.
+"""
+import json
+import os
+from models.engine.binary_format import BinaryFormat, is_binary
+
+
+def read_records(path, ndjson=False):
+    """Yields the (key, dictionary) pairs of the file at path
+
+    Binary files are recognized by their magic bytes, ndjson tells if a
+    text file holds one dictionary per line.
+    """
+    if not os.path.exists(path):
+        return
+    if is_binary(path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        yield from BinaryFormat().records(data)
+        return
+    with open(path, 'r') as f:
+        if not ndjson:
+            yield from json.load(f).items()
+            return
+        for line in f:
+            if line.strip():
+                value = json.loads(line)
+                yield f"{value['__class__']}.{value['id']}", value
+
+
+def read_file(path, ndjson=False):
+    """Returns the list of the (key, dictionary) pairs of a file"""
+    return list(read_records(path, ndjson))
+
+
+def read_lines(path, start, end):
+    """Returns the (key, dictionary) pairs of the lines of an ndjson
+    file between the byte offsets start and end
+    """
+    records = []
+    with open(path, 'rb') as f:
+        f.seek(start)
+        for line in f.read(end - start).splitlines():
+            if line.strip():
+                value = json.loads(line)
+                records.append(
+                    (f"{value['__class__']}.{value['id']}", value))
+    return records
+
+
+def chunks(path, count):
+    """Splits an ndjson file in at most count (start, end) byte ranges
+    that begin and end on line boundaries
+    """
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, 'rb') as f:
+        for i in range(1, count):
+            offset = max(size * i // count, bounds[-1])
+            f.seek(offset)
+            f.readline()
+            if f.tell() >= size:
+                break
+            if f.tell() > bounds[-1]:
+                bounds.append(f.tell())
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
@@ -0,0 +1,198 @@
+#!/usr/bin/python3
+"""
+Grid index of objects by latitude and longitude
+
+The earth is cut in cells of cell_size degrees on each side. A radius
+or bounding box query only looks at the objects of the cells that
+overlap the query box, then checks their exact position.
+"""
+import math
+from models.engine.columns import as_number
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Returns the great-circle distance between two points in km"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def valid_position(lat, lon):
+    """Returns True if lat is in [-90, 90] and lon in [-180, 180], which
+    leaves out nan and the infinities
+    """
+    return -90 <= lat <= 90 and -180 <= lon <= 180
+
+
+def valid_radius(radius_km):
+    """Returns True if radius_km is a finite distance, not negative"""
+    return 0 <= radius_km < math.inf
+
+
+def position(obj):
+    """Returns the (latitude, longitude) of obj, or (None, None) when
+    they aren't valid coordinates
+    """
+    lat = as_number(getattr(obj, 'latitude', None))
+    lon = as_number(getattr(obj, 'longitude', None))
+    if valid_position(lat, lon):
+        return lat, lon
+    return None, None
+
+
+def check_circle(lat, lon, radius_km):
+    """Raises ValueError unless the query circle is valid"""
+    if not valid_position(lat, lon):
+        raise ValueError(f"invalid position: {lat}, {lon}")
+    if not valid_radius(radius_km):
+        raise ValueError(f"invalid radius: {radius_km}")
+
+
+def check_box(min_lat, min_lon, max_lat, max_lon):
+    """Raises ValueError unless the corners of the query box are valid"""
+    if not (valid_position(min_lat, min_lon) and
+            valid_position(max_lat, max_lon)):
+        raise ValueError(f"invalid box: {min_lat}, {min_lon}, "
+                         f"{max_lat}, {max_lon}")
+
+
+def in_box(lat, lon, min_lat, min_lon, max_lat, max_lon):
+    """Returns True if the point is in the box; a box whose min_lon is
+    greater than max_lon crosses the 180th meridian
+    """
+    if not min_lat <= lat <= max_lat:
+        return False
+    if min_lon <= max_lon:
+        return min_lon <= lon <= max_lon
+    return lon >= min_lon or lon <= max_lon
+
+
+def radius_box(lat, lon, radius_km):
+    """Returns the (min_lat, min_lon, max_lat, max_lon) box holding the
+    circle of radius_km around a point
+    """
+    delta = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = lat - delta, lat + delta
+    if min_lat <= -90 or max_lat >= 90:
+        # the circle holds a pole, so every longitude
+        return max(min_lat, -90), -180, min(max_lat, 90), 180
+    delta_lon = math.degrees(math.asin(
+        math.sin(math.radians(delta)) / math.cos(math.radians(lat))))
+    if delta_lon >= 180:
+        return min_lat, -180, max_lat, 180
+    min_lon = (lon - delta_lon + 180) % 360 - 180
+    max_lon = (lon + delta_lon + 180) % 360 - 180
+    return min_lat, min_lon, max_lat, max_lon
+
+
+class GridIndex:
+    """Objects by cell of their (latitude, longitude) position
+
+    A storage keeps the objects of the classes of follows in it with
+    index() and remove(), and calls index() again when one of the
+    attributes listed there changes.
+    """
+
+    follows = {'Place': ('latitude', 'longitude')}
+
+    def __init__(self, cell_size=0.1):
+        """Creates an empty grid of cell_size degrees"""
+        self.cell_size = cell_size
+        self.__columns = math.ceil(360 / cell_size)
+        self.__cells = {}
+        self.__positions = {}
+
+    def __len__(self):
+        """Returns the number of indexed objects"""
+        return len(self.__positions)
+
+    def add(self, key, obj, lat, lon):
+        """Indexes obj under key at a position, replacing the previous
+        one; the object is left out when the position isn't valid
+        """
+        self.remove(key)
+        if not valid_position(lat, lon):
+            return
+        cell = self.__cell(lat, lon)
+        self.__cells.setdefault(cell, {})[key] = (obj, lat, lon)
+        self.__positions[key] = cell
+
+    def index(self, key, obj):
+        """Indexes obj under key at its position(), or removes it
+        without a valid one
+        """
+        lat, lon = position(obj)
+        if lat is None:
+            self.remove(key)
+        else:
+            self.add(key, obj, lat, lon)
+
+    def remove(self, key):
+        """Removes the object indexed under key"""
+        cell = self.__positions.pop(key, None)
+        if cell is None:
+            return
+        objects = self.__cells[cell]
+        del objects[key]
+        if not objects:
+            del self.__cells[cell]
+
+    def within_box(self, min_lat, min_lon, max_lat, max_lon):
+        """Returns the objects in the box; a box whose min_lon is greater
+        than max_lon crosses the 180th meridian
+        """
+        check_box(min_lat, min_lon, max_lat, max_lon)
+        return [obj for obj, _, _ in self.__candidates(
+            min_lat, min_lon, max_lat, max_lon)]
+
+    def within(self, lat, lon, radius_km):
+        """Returns the (distance in km, object) pairs of the objects at
+        most radius_km away from a point, the closest first
+        """
+        check_circle(lat, lon, radius_km)
+        found = []
+        for obj, obj_lat, obj_lon in self.__candidates(
+                *radius_box(lat, lon, radius_km)):
+            distance = distance_km(lat, lon, obj_lat, obj_lon)
+            if distance <= radius_km:
+                found.append((distance, obj))
+        found.sort(key=lambda pair: pair[0])
+        return found
+
+    def __cell(self, lat, lon):
+        """Returns the (row, column) cell of a position"""
+        return (math.floor(lat / self.cell_size),
+                min(self.__column(lon), self.__columns - 1))
+
+    def __column(self, lon):
+        """Returns the column of a longitude, 180 being past the last"""
+        return math.floor((lon + 180) / self.cell_size)
+
+    def __candidates(self, min_lat, min_lon, max_lat, max_lon):
+        """Yields the (obj, lat, lon) entries in the box"""
+        first_row = math.floor(min_lat / self.cell_size)
+        last_row = math.floor(max_lat / self.cell_size)
+        first_column = self.__column(min_lon)
+        last_column = min(self.__column(max_lon), self.__columns - 1)
+        if min_lon <= max_lon:
+            columns = range(first_column, last_column + 1)
+        else:
+            columns = list(range(first_column, self.__columns))
+            columns.extend(range(0, last_column + 1))
+        cells = (last_row - first_row + 1) * len(columns)
+        if cells > len(self.__cells):
+            # a large box: going through the used cells is cheaper
+            keys = [cell for cell in self.__cells
+                    if first_row <= cell[0] <= last_row]
+        else:
+            keys = [(row, column)
+                    for row in range(first_row, last_row + 1)
+                    for column in columns]
+        for cell in keys:
+            for obj, lat, lon in self.__cells.get(cell, {}).values():
+                if in_box(lat, lon, min_lat, min_lon, max_lat, max_lon):
+                    yield obj, lat, lon
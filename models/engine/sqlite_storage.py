@@ -0,0 +1,260 @@
+#!/usr/bin/python3
+"""
+Class SQLiteStorage that stores instances in a SQLite database
+"""
+import json
+import sqlite3
+import threading
+from models.engine.base_storage import BaseStorage
+
+
+class SQLiteStorage(BaseStorage):
+    """Storage engine keeping one row per object in a SQLite database
+
+    Rows are keyed by (class, id), so get() and count(cls) are answered
+    by the primary key index. Loaded instances are kept in an identity
+    map; new(), mark_dirty() and delete() only record the change, which
+    is written as single-row upserts and deletes by save().
+
+    Between begin() and commit(), save() only sends the changes to the
+    database and the SQLite transaction, opened by begin(), is committed
+    by commit(). A begin() inside a transaction sends the pending
+    changes and starts a SQLite savepoint, which its rollback() rolls
+    back to, forgetting the instances changed since.
+
+    The connection can be used by any thread: every method holds an
+    RLock, which the models also hold while they set their attributes
+    (see changing()).
+    """
+
+    thread_safe = True
+
+    def __init__(self, path="hbnb.db"):
+        """Sets the database path"""
+        self.path = path
+        self.__connection = None
+        self.__objects = {}
+        self.__dirty = set()
+        self.__deleted = set()
+        self.__depth = 0
+        self.__touched = []
+        self.in_transaction = False
+        self.__lock = threading.RLock()
+
+    @property
+    def connection(self):
+        """Returns the database connection, opening it if needed"""
+        with self.__lock:
+            if self.__connection is None:
+                self.__connect()
+            return self.__connection
+
+    def changing(self):
+        """Returns the lock, so that no attribute changes while the
+        pending changes are encoded
+        """
+        return self.__lock
+
+    def all(self, cls=None):
+        """Returns the stored objects by key, or only the objects of cls"""
+        with self.__lock:
+            self.__flush()
+            if cls is None:
+                rows = self.connection.execute(
+                    "SELECT class, id, data FROM objects")
+            else:
+                rows = self.connection.execute(
+                    "SELECT class, id, data FROM objects WHERE class = ?",
+                    (self.class_name(cls),))
+            return {
+                f"{class_name}.{id}": self.__build(class_name, id, data)
+                for class_name, id, data in rows
+                }
+
+    def get(self, cls, id):
+        """Returns the object of class cls with the given id, or None"""
+        with self.__lock:
+            class_name = self.class_name(cls)
+            key = f"{class_name}.{id}"
+            if key in self.__objects:
+                return self.__objects[key]
+            if key in self.__deleted:
+                return None
+            row = self.connection.execute(
+                "SELECT data FROM objects WHERE class = ? AND id = ?",
+                (class_name, id)).fetchone()
+            if row is None:
+                return None
+            return self.__build(class_name, id, row[0])
+
+    def count(self, cls=None):
+        """Returns the number of stored objects, or of objects of cls"""
+        with self.__lock:
+            self.__flush()
+            if cls is None:
+                row = self.connection.execute(
+                    "SELECT COUNT(*) FROM objects").fetchone()
+            else:
+                row = self.connection.execute(
+                    "SELECT COUNT(*) FROM objects WHERE class = ?",
+                    (self.class_name(cls),)).fetchone()
+            return row[0]
+
+    def new(self, obj):
+        """Registers obj, it is written on the next save()"""
+        with self.__lock:
+            key = f"{obj.__class__.__name__}.{obj.id}"
+            self.__objects[key] = obj
+            self.__dirty.add(key)
+            self.__deleted.discard(key)
+            self.__touch(key)
+            self.forget_prefetched()
+
+    def mark_dirty(self, obj, name=None):
+        """Records that a stored obj has to be written again"""
+        with self.__lock:
+            key = f"{obj.__class__.__name__}.{obj.id}"
+            if self.__objects.get(key) is obj:
+                self.__dirty.add(key)
+                self.__touch(key)
+                self.forget_prefetched()
+
+    def delete(self, obj=None):
+        """Removes obj, the row is deleted on the next save()"""
+        if obj is None:
+            return
+        with self.__lock:
+            key = f"{obj.__class__.__name__}.{obj.id}"
+            self.__objects.pop(key, None)
+            self.__dirty.discard(key)
+            self.__deleted.add(key)
+            self.__touch(key)
+            self.forget_prefetched()
+
+    def save(self):
+        """Writes the pending changes and commits them"""
+        with self.__lock:
+            self.__flush()
+            if not self.in_transaction:
+                self.connection.commit()
+
+    def begin(self):
+        """Starts a transaction, or a savepoint in the one in progress"""
+        with self.__lock:
+            if self.in_transaction:
+                self.__flush()
+                self.connection.execute(f"SAVEPOINT level{self.__depth}")
+                self.__touched.append(set())
+            elif not self.connection.in_transaction:
+                # a savepoint opened outside a transaction would commit
+                # when released
+                self.connection.execute("BEGIN")
+            self.in_transaction = True
+            self.__depth += 1
+
+    def commit(self):
+        """Ends the transaction and commits its changes, or releases
+        the savepoint
+        """
+        with self.__lock:
+            if not self.in_transaction:
+                return
+            self.__depth -= 1
+            if self.__depth > 0:
+                self.connection.execute(f"RELEASE level{self.__depth}")
+                touched = self.__touched.pop()
+                if self.__touched:
+                    self.__touched[-1].update(touched)
+                return
+            self.in_transaction = False
+            self.save()
+
+    def rollback(self):
+        """Ends the transaction, or the savepoint, dropping its changes
+        and the loaded instances
+        """
+        with self.__lock:
+            if not self.in_transaction:
+                return
+            if self.__depth > 1:
+                self.__depth -= 1
+                self.connection.execute(f"ROLLBACK TO level{self.__depth}")
+                self.connection.execute(f"RELEASE level{self.__depth}")
+                # the instances loaded before the savepoint stay attached
+                for key in self.__touched.pop():
+                    self.__objects.pop(key, None)
+                    self.__dirty.discard(key)
+                    self.__deleted.discard(key)
+                self.forget_prefetched()
+                return
+            self.in_transaction = False
+            self.__depth = 0
+            self.__touched = []
+            self.connection.rollback()
+            self.__objects = {}
+            self.__dirty = set()
+            self.__deleted = set()
+            self.forget_prefetched()
+
+    def reload(self):
+        """Opens the database and forgets the loaded instances"""
+        with self.__lock:
+            self.close()
+            self.__connect()
+
+    def __connect(self):
+        """Opens the database and creates the objects table"""
+        self.__connection = sqlite3.connect(self.path,
+                                            check_same_thread=False)
+        self.__connection.execute(
+            "CREATE TABLE IF NOT EXISTS objects ("
+            "class TEXT NOT NULL, id TEXT NOT NULL, data TEXT NOT NULL, "
+            "PRIMARY KEY (class, id)) WITHOUT ROWID")
+        self.__connection.commit()
+
+    def close(self):
+        """Closes the database connection without committing"""
+        with self.__lock:
+            if self.__connection is not None:
+                self.__connection.close()
+                self.__connection = None
+            self.__objects = {}
+            self.__dirty = set()
+            self.__deleted = set()
+            self.__depth = 0
+            self.__touched = []
+            self.in_transaction = False
+            self.forget_prefetched()
+
+    def __touch(self, key):
+        """Records that key changed in the innermost savepoint"""
+        if self.__touched:
+            self.__touched[-1].add(key)
+
+    def __build(self, class_name, id, data):
+        """Returns the loaded instance of a row, building it if needed"""
+        key = f"{class_name}.{id}"
+        obj = self.__objects.get(key)
+        if obj is None:
+            obj = self.classes()[class_name].from_dict(json.loads(data))
+            self.__objects[key] = obj
+        return obj
+
+    def __flush(self):
+        """Sends the pending changes to the database, uncommitted"""
+        if self.__dirty:
+            rows = []
+            for key in self.__dirty:
+                obj = self.__objects[key]
+                rows.append((obj.__class__.__name__, obj.id,
+                             json.dumps(obj.to_dict())))
+            self.connection.executemany(
+                "INSERT INTO objects (class, id, data) VALUES (?, ?, ?) "
+                "ON CONFLICT (class, id) DO UPDATE SET data = excluded.data",
+                rows)
+            self.__dirty.clear()
+        if self.__deleted:
+            self.connection.executemany(
+                "DELETE FROM objects WHERE class = ? AND id = ?",
+                [key.split('.', 1) for key in self.__deleted])
+            self.__deleted.clear()
@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+"""
+Inverted index of the words of text attributes
+
+Texts are cut into lowercase words. Every document, an object key,
+keeps the count of each of its words, and every word the documents it
+appears in, so a search only reads the postings of its own words.
+"""
+import math
+import re
+from collections import Counter
+
+WORD = re.compile(r"\w+")
+
+
+def words(text):
+    """Returns the lowercase words of text"""
+    return WORD.findall(text.lower())
+
+
+class TextIndex:
+    """Word postings of a set of documents, ranked by TF-IDF
+
+    The documents of a storage are the objects of the classes of
+    follows, made of the words of the attributes listed there.
+    """
+
+    follows = {
+        'Place': ('name', 'description'),
+        'Review': ('text',),
+        'City': ('name',),
+        'State': ('name',),
+        'Amenity': ('name',)
+        }
+
+    def __init__(self, documents=None):
+        """Creates an index, filled from a dump() of another one"""
+        self.__documents = {}
+        self.__postings = {}
+        for key, counts in (documents or {}).items():
+            self.__insert(key, counts)
+
+    def __len__(self):
+        """Returns the number of documents"""
+        return len(self.__documents)
+
+    def add(self, key, texts):
+        """Indexes the strings of texts under key, replacing the words
+        it had before
+        """
+        self.remove(key)
+        counts = Counter()
+        for text in texts:
+            if isinstance(text, str):
+                counts.update(words(text))
+        if counts:
+            self.__insert(key, dict(counts))
+
+    def index(self, key, obj):
+        """Indexes the followed attributes of obj stored under key"""
+        names = self.follows[key.partition('.')[0]]
+        self.add(key, [getattr(obj, name, None) for name in names])
+
+    def remove(self, key):
+        """Removes the document key"""
+        counts = self.__documents.pop(key, None)
+        if counts is None:
+            return
+        for word in counts:
+            postings = self.__postings[word]
+            del postings[key]
+            if not postings:
+                del self.__postings[word]
+
+    def search(self, text, prefix=""):
+        """Returns the (key, score) pairs of the documents whose key
+        starts with prefix and holding any word of text, best first
+        """
+        scores = {}
+        total = len(self.__documents)
+        for word in set(words(text)):
+            postings = self.__postings.get(word, {})
+            if not postings:
+                continue
+            idf = math.log(1 + total / len(postings))
+            for key, count in postings.items():
+                if key.startswith(prefix):
+                    scores[key] = scores.get(key, 0) + count * idf
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def dump(self):
+        """Returns the word counts of every document"""
+        return self.__documents
+
+    def __insert(self, key, counts):
+        """Stores the word counts of a document"""
+        self.__documents[key] = counts
+        for word, count in counts.items():
+            self.__postings.setdefault(word, {})[key] = count
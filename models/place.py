@@ -2,9 +2,10 @@
 """
 Defines Place class
 """
-from models.base_model import BaseModel
+from models.base_model import BaseModel, Relation, compact
 
 
+@compact
 class Place(BaseModel):
     """Defines Place class"""
     city_id = ""
@@ -18,3 +19,8 @@ class Place(BaseModel):
     latitude = 0.0
     longitude = 0.0
     amenity_ids = []
+
+    related_city = Relation('one', 'City', 'city_id')
+    related_user = Relation('one', 'User', 'user_id')
+    related_reviews = Relation('many', 'Review', 'place_id')
+    related_amenities = Relation('ids', 'Amenity', 'amenity_ids')
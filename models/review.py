@@ -2,11 +2,15 @@
 """
 Defines review class
 """
-from models.base_model import BaseModel
+from models.base_model import BaseModel, Relation, compact
 
 
+@compact
 class Review(BaseModel):
     """Define Reviews made by users"""
     place_id = ""
     user_id = ""
     text = ""
+
+    related_place = Relation('one', 'Place', 'place_id')
+    related_user = Relation('one', 'User', 'user_id')
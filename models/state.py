@@ -2,9 +2,12 @@
 """
 Class that defines a state
 """
-from models.base_model import BaseModel
+from models.base_model import BaseModel, Relation, compact
 
 
+@compact
 class State(BaseModel):
     """class to create a state"""
     name = ""
+
+    related_cities = Relation('many', 'City', 'state_id')
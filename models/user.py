@@ -2,12 +2,16 @@
 """
 User creation class
 """
-from models.base_model import BaseModel
+from models.base_model import BaseModel, Relation, compact
 
 
+@compact
 class User(BaseModel):
     """Defines attributes for user creation"""
     email = ""
     password = ""
     first_name = ""
     last_name = ""
+
+    related_places = Relation('many', 'Place', 'user_id')
+    related_reviews = Relation('many', 'Review', 'user_id')
@@ -0,0 +1,28 @@
+#!/usr/bin/python3
+"""Base class of the tests using the file storage"""
+import os
+import shutil
+import tempfile
+import unittest
+from models.engine.file_storage import FileStorage
+
+
+class StorageTestCase(unittest.TestCase):
+    """Runs every test on an empty storage whose file, named
+    file_name, is in a temporary directory removed afterwards
+    """
+
+    file_name = 'file.json'
+
+    def setUp(self):
+        """Empties the storage and points it to the temporary file"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, self.file_name)
+        FileStorage._FileStorage__file_path = self.path
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        """Empties the storage and removes the temporary directory"""
+        FileStorage._FileStorage__file_path = "file.json"
+        FileStorage._FileStorage__objects = {}
+        shutil.rmtree(self.temp_dir)
@@ -0,0 +1,177 @@
+#!/usr/bin/python3
+"""Module for the API server test"""
+import unittest
+import http.client
+import json
+import threading
+import time
+from unittest.mock import patch
+from api.server import APIServer
+from models import storage
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from tests.storage_case import StorageTestCase
+
+
+class APIServerTests(StorageTestCase):
+    """Tests for the HTTP JSON API"""
+
+    def setUp(self):
+        """Serves the storage"""
+        super().setUp()
+        self.server = APIServer(('127.0.0.1', 0))
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       args=(0.05,))
+        self.thread.start()
+        self.connection = http.client.HTTPConnection(
+            *self.server.server_address[:2])
+
+    def tearDown(self):
+        """Stops the server"""
+        self.connection.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        super().tearDown()
+
+    def request(self, method, path, body=None, **headers):
+        """Returns the status, JSON body and headers of the answer"""
+        if body is not None and not isinstance(body, str):
+            body = json.dumps(body)
+        self.connection.request(method, "/api/v1/" + path, body, headers)
+        response = self.connection.getresponse()
+        data = response.read()
+        return (response.status, json.loads(data) if data else None,
+                response.headers)
+
+    def saved(self):
+        """Returns the objects of the file"""
+        with open(FileStorage._FileStorage__file_path, 'r') as f:
+            return json.load(f)
+
+    def test_create_update_delete(self):
+        """Objects are created, read, updated and deleted, and every
+        change is saved before it is answered
+        """
+        status, place, headers = self.request(
+            "POST", "Place", {"name": "Loft", "max_guest": 4, "id": "x"})
+        self.assertEqual(status, 201)
+        self.assertNotEqual(place['id'], "x")
+        self.assertEqual(headers['Location'], f"/api/v1/Place/{place['id']}")
+        key = f"Place.{place['id']}"
+        self.assertEqual(self.saved()[key]['name'], "Loft")
+
+        status, read, _ = self.request("GET", f"Place/{place['id']}")
+        self.assertEqual((status, read), (200, place))
+
+        status, updated, _ = self.request(
+            "PUT", f"Place/{place['id']}", {"name": "Big loft"})
+        self.assertEqual(status, 200)
+        self.assertEqual(updated['name'], "Big loft")
+        self.assertGreater(updated['updated_at'], place['updated_at'])
+        self.assertEqual(self.saved()[key]['name'], "Big loft")
+
+        status, _, _ = self.request("DELETE", f"Place/{place['id']}")
+        self.assertEqual(status, 200)
+        self.assertNotIn(key, self.saved())
+        status, error, _ = self.request("GET", f"Place/{place['id']}")
+        self.assertEqual((status, error), (404, {"error": "Not found"}))
+
+    def test_etag(self):
+        """A GET whose If-None-Match holds the ETag gets a 304 answer,
+        until the object is updated
+        """
+        place = Place()
+        status, _, headers = self.request("GET", f"Place/{place.id}")
+        etag = headers['ETag']
+        status, body, _ = self.request("GET", f"Place/{place.id}",
+                                       **{"If-None-Match": etag})
+        self.assertEqual((status, body), (304, None))
+        self.request("PUT", f"Place/{place.id}", {"name": "Loft"})
+        status, body, headers = self.request("GET", f"Place/{place.id}",
+                                             **{"If-None-Match": etag})
+        self.assertEqual(status, 200)
+        self.assertEqual(body['name'], "Loft")
+        self.assertNotEqual(headers['ETag'], etag)
+
+    def test_list(self):
+        """Lists are filtered, paginated and have an ETag of their own"""
+        places = [Place() for _ in range(5)]
+        for i, place in enumerate(places):
+            place.max_guest = i % 2
+        status, page, headers = self.request(
+            "GET", "Place?max_guest=1&limit=1&offset=1")
+        self.assertEqual(status, 200)
+        self.assertEqual(page['count'], 2)
+        self.assertEqual([obj['id'] for obj in page['results']],
+                         [places[3].id])
+        status, _, _ = self.request(
+            "GET", "Place?max_guest=1&limit=1&offset=1",
+            **{"If-None-Match": headers['ETag']})
+        self.assertEqual(status, 304)
+        _, page, _ = self.request("GET", "Place")
+        self.assertEqual(page['count'], 5)
+        _, page, _ = self.request("GET", f"Place?id={places[2].id}")
+        self.assertEqual([obj['id'] for obj in page['results']],
+                         [places[2].id])
+        self.assertEqual(page['limit'], APIServer.default_limit)
+
+    def test_errors(self):
+        """Errors are answered in JSON on the same connection"""
+        place = Place()
+        for method, path, body, status in (
+                ("GET", "Nope", None, 404),
+                ("GET", "Place/a/b", None, 404),
+                ("GET", "Place?limit=-1", None, 400),
+                ("GET", "Place?max_guest=many", None, 400),
+                ("GET", "Place?cls=x", None, 400),
+                ("GET", "Place?_Place__x=1", None, 400),
+                ("GET", "Place?related_reviews=x", None, 400),
+                ("GET", "Place?save=x", None, 400),
+                ("POST", "Place", "{not json", 400),
+                ("POST", "Place", [1], 400),
+                ("POST", "Place", {"related_reviews": []}, 400),
+                ("POST", f"Place/{place.id}", {}, 405),
+                ("PUT", "Place", {}, 405),
+                ("PUT", f"Place/{place.id}", None, 400),
+                ("PUT", f"Place/{place.id}", {"__dict__": 1}, 400),
+                ("PUT", f"Place/{place.id}", {"not a name": 1}, 400),
+                ("PUT", f"Place/{place.id}", {"save": 1}, 400),
+                ("DELETE", "Place/nope", None, 404)):
+            answer, error, _ = self.request(method, path, body)
+            self.assertEqual(answer, status, path)
+            self.assertIn('error', error)
+        sock = self.connection.sock
+        self.assertEqual(self.request("GET", f"Place/{place.id}")[0], 200)
+        self.assertIs(self.connection.sock, sock)
+        self.assertEqual(storage.count(Place), 1)
+
+    def test_unexpected_error(self):
+        """Unexpected errors are answered in JSON with a 500"""
+        place = Place()
+        with patch.object(storage, 'get', side_effect=RuntimeError):
+            status, error, _ = self.request("GET", f"Place/{place.id}")
+        self.assertEqual(status, 500)
+        self.assertIn('error', error)
+        self.assertEqual(self.request("GET", f"Place/{place.id}")[0], 200)
+
+    def test_saves_coalesced(self):
+        """The saves asked for during a write share the next one"""
+        writes = []
+
+        def slow_save():
+            writes.append(None)
+            time.sleep(0.05)
+
+        with patch.object(storage, 'save', slow_save):
+            threads = [threading.Thread(target=self.server.save)
+                       for _ in range(10)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertLessEqual(len(writes), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
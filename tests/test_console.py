@@ -1,6 +1,7 @@
 #!/usr/bin/python3
 '''This is unittests is for the console.py'''
 from io import StringIO
+import json
 import os
 import re
 import unittest
@@ -264,6 +265,146 @@ class TestHBNBCommand(unittest.TestCase):
             self.HBNB.onecmd(f"update User {my_id} name")
             self.assertEqual("** value missing **\n", f.getvalue())
 
+        with patch("sys.stdout", new=StringIO()) as f:
+            self.HBNB.onecmd(f"update User {my_id} related_places 3")
+            self.HBNB.onecmd(f'User.update("{my_id}", {{"places": 3}})')
+            self.HBNB.onecmd(f"show User {my_id}")
+            output = f.getvalue()
+            self.assertTrue(
+                output.startswith("** attribute can't be set **\n"))
+            self.assertIn("'places': '3'", output)
+
+    def test_transaction(self):
+        """Test begin, commit and rollback commands."""
+        with patch("sys.stdout", new=StringIO()) as f:
+            self.HBNB.onecmd("commit")
+            self.assertEqual(
+                "** no transaction in progress **\n", f.getvalue())
+        self.HBNB.onecmd("begin")
+        with patch("sys.stdout", new=StringIO()) as f:
+            self.HBNB.onecmd("create State")
+            self.HBNB.onecmd("create State")
+        self.assertFalse(os.path.exists("file.json"))
+        self.HBNB.onecmd("commit")
+        self.assertTrue(os.path.exists("file.json"))
+
+        self.HBNB.onecmd("begin")
+        with patch("sys.stdout", new=StringIO()) as f:
+            self.HBNB.onecmd("create State")
+        self.HBNB.onecmd("rollback")
+        with patch("sys.stdout", new=StringIO()) as f:
+            self.HBNB.onecmd("count State")
+            self.assertEqual("2\n", f.getvalue())
+
+        with open("states.ndjson", "w") as f:
+            f.write('{"name": "Nevada"}\n{"name": \n')
+        try:
+            with patch("sys.stdout", new=StringIO()) as f:
+                self.HBNB.onecmd("begin")
+                self.HBNB.onecmd("create State")
+                self.HBNB.onecmd("import State states.ndjson")
+                self.HBNB.onecmd("commit")
+                self.HBNB.onecmd("count State")
+                self.assertTrue(
+                    f.getvalue().endswith("** invalid record 2 **\n3\n"))
+        finally:
+            os.remove("states.ndjson")
+
+    def test_import_export(self):
+        """Test import and export commands."""
+        with patch("sys.stdout", new=StringIO()) as f:
+            self.HBNB.onecmd("import")
+            self.HBNB.onecmd("import MyModel users.ndjson")
+            self.HBNB.onecmd("import User")
+            self.HBNB.onecmd("import User no_such_file.ndjson")
+            self.assertEqual("** class name missing **\n"
+                             "** class doesn't exist **\n"
+                             "** file name missing **\n"
+                             "** file doesn't exist **\n", f.getvalue())
+        with open("users.ndjson", "w") as f:
+            f.write('{"first_name": "Betty"}\n{"first_name": "John"}\n')
+        try:
+            with patch("sys.stdout", new=StringIO()) as f:
+                self.HBNB.onecmd("import User users.ndjson")
+                self.assertTrue(f.getvalue().startswith("imported 2 User"))
+            with patch("sys.stdout", new=StringIO()) as f:
+                self.HBNB.onecmd("export User users.ndjson")
+                self.assertTrue(f.getvalue().startswith("exported 2 User"))
+            with open("users.ndjson", "r") as f:
+                names = sorted(json.loads(line)["first_name"] for line in f)
+            self.assertEqual(names, ["Betty", "John"])
+
+            with patch("sys.stdout", new=StringIO()) as f:
+                self.HBNB.onecmd("import Place users.ndjson")
+                self.assertEqual("** invalid record 1 **\n", f.getvalue())
+            with patch("sys.stdout", new=StringIO()) as f:
+                self.HBNB.onecmd("count Place")
+                self.assertEqual("0\n", f.getvalue())
+        finally:
+            os.remove("users.ndjson")
+
+    def test_near(self):
+        """Test near command and Place.near()."""
+        with patch("sys.stdout", new=StringIO()) as f:
+            self.HBNB.onecmd("near")
+            self.HBNB.onecmd("near MyModel 1 2 3")
+            self.HBNB.onecmd("near User 1 2 3")
+            self.HBNB.onecmd("near Place 1 2")
+            self.HBNB.onecmd("near Place a b c")
+            self.HBNB.onecmd("near Place 0 0 nan")
+            self.HBNB.onecmd("near Place 0 0 inf")
+            self.HBNB.onecmd("near Place 0 0 -1")
+            self.HBNB.onecmd("near Place nan 0 1")
+            self.HBNB.onecmd("near Place 0 -inf 1")
+            self.HBNB.onecmd("near Place 91 0 1")
+            self.HBNB.onecmd("near Place 0 181 1")
+            self.assertEqual("** class name missing **\n"
+                             "** class doesn't exist **\n"
+                             "** class has no location **\n"
+                             "** coordinates missing **\n"
+                             "** invalid coordinates **\n" +
+                             "** invalid distance **\n" * 3 +
+                             "** invalid coordinates **\n" * 4,
+                             f.getvalue())
+        ids = []
+        for lat, lon in ((37.7749, -122.4194), (37.8044, -122.2712),
+                         (34.0522, -118.2437)):
+            with patch("sys.stdout", new=StringIO()) as f:
+                self.HBNB.onecmd("create Place")
+                ids.append(f.getvalue().strip())
+            self.HBNB.onecmd(f"update Place {ids[-1]} latitude {lat}")
+            self.HBNB.onecmd(f"update Place {ids[-1]} longitude {lon}")
+        with patch("sys.stdout", new=StringIO()) as f:
+            self.HBNB.onecmd("Place.near(37.7749, -122.4194, 20)")
+            found = re.findall(r"\(([0-9a-f-]+)\)", f.getvalue())
+        self.assertEqual(found, ids[:2])
+        with patch("sys.stdout", new=StringIO()) as f:
+            self.HBNB.onecmd("near Place 37.7749 -122.4194 1")
+            found = re.findall(r"\(([0-9a-f-]+)\)", f.getvalue())
+        self.assertEqual(found, ids[:1])
+
+    def test_search(self):
+        """Test search command."""
+        with patch("sys.stdout", new=StringIO()) as f:
+            self.HBNB.onecmd("search")
+            self.HBNB.onecmd("search MyModel beach")
+            self.HBNB.onecmd("search Place")
+            self.assertEqual("** class name missing **\n"
+                             "** class doesn't exist **\n"
+                             "** search terms missing **\n", f.getvalue())
+        ids = []
+        for name in ("Beach house", "Beach beach cottage", "Loft"):
+            with patch("sys.stdout", new=StringIO()) as f:
+                self.HBNB.onecmd("create Place")
+                ids.append(f.getvalue().strip())
+            self.HBNB.onecmd(f'update Place {ids[-1]} name "{name}"')
+        with patch("sys.stdout", new=StringIO()) as f:
+            self.HBNB.onecmd('search Place "beach HOUSE"')
+            self.assertEqual(f"{[ids[0], ids[1]]}\n", f.getvalue())
+        with patch("sys.stdout", new=StringIO()) as f:
+            self.HBNB.onecmd('search Review "beach"')
+            self.assertEqual("[]\n", f.getvalue())
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,5 +1,10 @@
 #!/usr/bin/python3
 """Module for unittest for base_model.py"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
 import unittest
 from models.base_model import BaseModel
 from models import storage
@@ -46,6 +51,79 @@ class BaseModelTests(unittest.TestCase):
         self.assertEqual(first_dict['created_at'], sec_dict['created_at'])
         self.assertNotEqual(first_dict['updated_at'], sec_dict['updated_at'])
 
+    def test_from_dict(self):
+        """Checks that from_dict rebuilds an unregistered copy"""
+        my_model = BaseModel()
+        my_model.name = "From dict"
+        my_model_json = my_model.to_dict()
+        copy = BaseModel.from_dict(my_model_json)
+
+        self.assertIsNot(copy, my_model)
+        self.assertEqual(copy.to_dict(), my_model_json)
+        self.assertEqual(copy.created_at, my_model.created_at)
+        self.assertIs(storage.get(BaseModel, copy.id), my_model)
+
+    def test_save_deleted(self):
+        """Checks that saving a deleted instance doesn't store it again"""
+        my_model = BaseModel()
+        storage.delete(my_model)
+        my_model.save()
+
+        self.assertIsNone(storage.get(BaseModel, my_model.id))
+
+
+class CompactModelsTests(unittest.TestCase):
+    """Tests for the compact models of HBNB_COMPACT_MODELS=1"""
+
+    script = """
+import json
+from models import storage
+from models.place import Place
+from models.user import User
+place = Place.from_dict({
+    '__class__': 'Place', 'id': '1',
+    'created_at': '2024-01-01T00:00:00.000001',
+    'updated_at': '2024-01-01T00:00:00.000002', 'name': 'Cozy'})
+place.number_rooms = 2
+place.max_guest = 3
+place.custom = 'ad-hoc'
+storage.new(place)
+storage.begin()
+place.name = 'Changed'
+place.other = 'dropped'
+storage.rollback()
+user = User()
+print(json.dumps({
+    'dict': place.to_dict(), 'str': str(place),
+    'defaults': [place.city_id, place.latitude, user.email],
+    'has_dict': hasattr(place, '__dict__'),
+    'user': sorted(User.from_dict(user.to_dict()).to_dict())}))
+"""
+
+    def run_script(self, compact):
+        """Returns the output of script with or without compact models"""
+        env = dict(os.environ, HBNB_COMPACT_MODELS='1' if compact else '0')
+        env['PYTHONPATH'] = os.path.dirname(os.path.dirname(
+            os.path.dirname(os.path.abspath(__file__))))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output = subprocess.run(
+                [sys.executable, '-c', self.script], env=env, cwd=temp_dir,
+                check=True, capture_output=True, text=True).stdout
+        return json.loads(output)
+
+    def test_same_output(self):
+        """Compact models keep the to_dict() and __str__ output when
+        the attributes are set in the order they are declared
+        """
+        regular = self.run_script(False)
+        compact = self.run_script(True)
+        self.assertTrue(regular.pop('has_dict'))
+        self.assertFalse(compact.pop('has_dict'))
+        self.assertEqual(compact, regular)
+        self.assertEqual(regular['dict']['custom'], 'ad-hoc')
+        self.assertNotIn('other', regular['dict'])
+        self.assertEqual(regular['defaults'], ["", 0.0, ""])
+
 
 if __name__ == '__main__':
     unittest.main()
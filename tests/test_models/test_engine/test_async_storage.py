@@ -0,0 +1,154 @@
+#!/usr/bin/python3
+"""Module for AsyncFileStorage test"""
+import unittest
+import asyncio
+import json
+import threading
+import time
+from unittest.mock import patch
+from models.engine.async_storage import AsyncFileStorage
+from models.engine.file_storage import FileStorage
+from models.user import User
+from tests.storage_case import StorageTestCase
+
+
+class AsyncFileStorageTests(StorageTestCase):
+    """Tests for the asyncio facade of FileStorage"""
+
+    def setUp(self):
+        """Wraps a thread-safe storage, which the models report their
+        changes to, in the facade
+        """
+        super().setUp()
+        self.storage = FileStorage(thread_safe=True)
+        patcher = patch('models.base_model.storage', self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.facade = AsyncFileStorage(self.storage)
+
+    def test_default_storage(self):
+        """The facade wraps models.storage by default"""
+        with patch('models.storage', self.storage):
+            self.assertIs(AsyncFileStorage().storage, self.storage)
+
+    def test_thread_safe_only(self):
+        """A storage that isn't thread-safe is refused"""
+        with self.assertRaises(ValueError):
+            AsyncFileStorage(FileStorage())
+
+    def test_get_and_all(self):
+        """get(), await all() and async for all() return the objects"""
+        users = [User() for _ in range(5)]
+
+        async def read():
+            user = await self.facade.get(User, users[0].id)
+            objects = await self.facade.all(User)
+            listed = [obj async for obj in self.facade.all("User")]
+            return user, objects, listed
+
+        self.facade.batch_size = 2
+        user, objects, listed = asyncio.run(read())
+        self.assertIs(user, users[0])
+        self.assertEqual(objects, self.storage.all(User))
+        self.assertEqual(listed, list(objects.values()))
+
+    def test_lazy_read_in_executor(self):
+        """Objects left unbuilt are built in the executor"""
+        user = User()
+        user.first_name = "Betty"
+        self.storage.save()
+        lazy = FileStorage(lazy=True, thread_safe=True)
+        FileStorage._FileStorage__objects = {}
+        lazy.reload()
+        self.assertFalse(lazy.loaded(User))
+        facade = AsyncFileStorage(lazy)
+        callers = []
+        get = lazy.get
+
+        def traced(*args):
+            callers.append(threading.current_thread())
+            return get(*args)
+
+        with patch.object(lazy, 'get', traced):
+            copy = asyncio.run(facade.get(User, user.id))
+        self.assertEqual(copy.first_name, "Betty")
+        self.assertIsNot(callers[0], threading.current_thread())
+        self.assertTrue(lazy.loaded(User))
+
+    def test_save_writes(self):
+        """await save() writes the changes to the file"""
+        user = User()
+        asyncio.run(self.facade.save())
+        with open(FileStorage._FileStorage__file_path, 'r') as f:
+            self.assertIn(f"User.{user.id}", json.load(f))
+
+    def test_saves_coalesced(self):
+        """Saves called during a write share the next write, which
+        holds every change made before them
+        """
+        writes = []
+        save = self.storage.save
+
+        def slow_save():
+            writes.append(len(FileStorage._FileStorage__objects))
+            time.sleep(0.05)
+            save()
+
+        async def run():
+            first = asyncio.ensure_future(self.facade.save())
+            await asyncio.sleep(0.01)
+            User()
+            others = [self.facade.save() for _ in range(10)]
+            await asyncio.gather(first, *others)
+
+        with patch.object(self.storage, 'save', slow_save):
+            asyncio.run(run())
+        self.assertEqual(writes, [0, 1])
+        with open(FileStorage._FileStorage__file_path, 'r') as f:
+            self.assertEqual(len(json.load(f)), 1)
+
+    def test_save_error(self):
+        """Every coalesced save() raises the error of the write"""
+        def failing_save():
+            raise OSError("disk full")
+
+        async def run():
+            return await asyncio.gather(
+                *[self.facade.save() for _ in range(3)],
+                return_exceptions=True)
+
+        with patch.object(self.storage, 'save', failing_save):
+            results = asyncio.run(run())
+        self.assertEqual([str(error) for error in results],
+                         ["disk full"] * 3)
+        asyncio.run(self.facade.save())
+
+    def test_change_during_save(self):
+        """An attribute set in the event loop while the executor encodes
+        the object waits for the encoding
+        """
+        user = User()
+        encoding = threading.Event()
+        to_dict = User.to_dict
+        seen = []
+
+        def slow_to_dict(obj):
+            encoding.set()
+            time.sleep(0.05)
+            seen.append(obj.first_name)
+            return to_dict(obj)
+
+        async def run():
+            saving = asyncio.ensure_future(self.facade.save())
+            await asyncio.get_running_loop().run_in_executor(
+                None, encoding.wait)
+            user.first_name = "Betty"
+            await saving
+
+        with patch.object(User, 'to_dict', slow_to_dict):
+            asyncio.run(run())
+        self.assertNotIn("Betty", seen)
+        self.assertEqual(user.first_name, "Betty")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,11 +4,18 @@ import unittest
 import tempfile
 import shutil
 from datetime import datetime
+from functools import partial
 from models.base_model import BaseModel
+from models.engine.binary_format import BinaryFormat
 from models.engine.file_storage import FileStorage
 from models import storage
 import os
 import json
+import subprocess
+import sys
+import time
+from unittest.mock import patch
+from tests.storage_case import StorageTestCase
 
 
 class FileStorageTests(unittest.TestCase):
@@ -109,5 +116,1526 @@ class FileStorageTests(unittest.TestCase):
         self.assertEqual(os.listdir(self.temp_dir), [])
 
 
+class FileStorageDirtyTests(StorageTestCase):
+    """Tests for the dirty tracking of FileStorage"""
+
+    def setUp(self):
+        """Creates the storage"""
+        super().setUp()
+        self.storage = FileStorage()
+
+    def test_only_dirty_encoded(self):
+        """save() only calls to_dict on objects that changed"""
+        models = [BaseModel() for _ in range(5)]
+        self.storage.save()
+        models[2].name = "changed"
+
+        with patch.object(BaseModel, 'to_dict', autospec=True,
+                          side_effect=BaseModel.to_dict) as to_dict:
+            self.storage.save()
+        self.assertEqual(to_dict.call_count, 1)
+
+        with open(FileStorage._FileStorage__file_path, 'r') as f:
+            saved_data = json.load(f)
+        self.assertEqual(len(saved_data), 5)
+        self.assertEqual(
+            saved_data[f"BaseModel.{models[2].id}"]["name"], "changed")
+
+    def test_deleted_attribute_saved(self):
+        """A deleted attribute doesn't come back from the cached text"""
+        my_model = BaseModel()
+        my_model.name = "gone"
+        self.storage.save()
+        del my_model.name
+        self.storage.save()
+
+        with open(FileStorage._FileStorage__file_path, 'r') as f:
+            self.assertNotIn(
+                "name", json.load(f)[f"BaseModel.{my_model.id}"])
+
+    def test_changed_in_place(self):
+        """mark_dirty() writes a value changed in place"""
+        my_model = BaseModel()
+        my_model.ids = []
+        self.storage.save()
+        my_model.ids.append("a")
+        self.storage.mark_dirty(my_model, "ids")
+        self.storage.save()
+
+        with open(FileStorage._FileStorage__file_path, 'r') as f:
+            self.assertEqual(
+                json.load(f)[f"BaseModel.{my_model.id}"]["ids"], ["a"])
+
+    def test_unfollowed_name(self):
+        """Setting an attribute no index follows leaves the indexes be"""
+        from models.place import Place
+        place = Place()
+        with patch.object(FileStorage, '_FileStorage__sync') as sync:
+            place.number_bathrooms = 2
+        sync.assert_not_called()
+        place.city_id = "c1"
+        self.assertEqual(self.storage.find(Place, city_id="c1"), [place])
+        self.assertIn(f"Place.{place.id}", FileStorage._FileStorage__dirty)
+
+    def test_deleted_not_saved(self):
+        """Deleted objects disappear from the next snapshot"""
+        my_model = BaseModel()
+        self.storage.save()
+        self.storage.delete(my_model)
+        self.storage.save()
+
+        with open(FileStorage._FileStorage__file_path, 'r') as f:
+            self.assertEqual(json.load(f), {})
+
+
+class FileStorageJournalTests(StorageTestCase):
+    """Tests for the journal mode of FileStorage"""
+
+    def setUp(self):
+        """Creates the storage"""
+        super().setUp()
+        self.storage = FileStorage(journal=True, compact_threshold=10)
+
+    def test_save_appends(self):
+        """save() appends one record per changed object"""
+        first = BaseModel()
+        self.storage.new(first)
+        self.storage.save()
+        second = BaseModel()
+        self.storage.new(second)
+        self.storage.save()
+
+        with open(self.storage.journal_path, 'r') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[1]["op"], "put")
+        self.assertEqual(records[1]["key"], f"BaseModel.{second.id}")
+        self.assertFalse(os.path.exists(FileStorage._FileStorage__file_path))
+
+    def test_reload_replays(self):
+        """reload() applies puts and deletes over the snapshot"""
+        kept = BaseModel()
+        gone = BaseModel()
+        self.storage.new(kept)
+        self.storage.new(gone)
+        self.storage.save()
+        kept.name = "kept"
+        self.storage.new(kept)
+        self.storage.delete(gone)
+        self.storage.save()
+
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        all_objs = self.storage.all()
+        self.assertEqual(all_objs[f"BaseModel.{kept.id}"].name, "kept")
+        self.assertNotIn(f"BaseModel.{gone.id}", all_objs)
+
+    def test_torn_line_cut(self):
+        """reload() cuts a torn last line off the journal, so the
+        records appended after it are read back
+        """
+        saved = [BaseModel()]
+        self.storage.save()
+        with open(self.storage.journal_path, 'a') as f:
+            f.write('{"op": "put", "key": "BaseModel.torn", "val')
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        for _ in range(2):
+            saved.append(BaseModel())
+            self.storage.save()
+
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertEqual(set(self.storage.all()),
+                         {f"BaseModel.{model.id}" for model in saved})
+
+    def test_rollback_keeps_unbuilt(self):
+        """rollback() doesn't journal the deletion of a replaced record
+        that was never built
+        """
+        from models.user import User
+        user = User()
+        user.first_name = "Betty"
+        self.storage.save()
+        storage = FileStorage(journal=True, lazy=True, compact_threshold=10)
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+
+        with self.assertRaises(KeyError):
+            with storage.transaction():
+                User(id=user.id)
+                raise KeyError
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.get(User, user.id).first_name, "Betty")
+
+    def test_failed_append_kept(self):
+        """Changes whose append failed are written by the next save()"""
+        from models.user import User
+        user = User()
+        user.first_name = "Betty"
+        self.storage.save()
+        user.first_name = "Holberton"
+        with patch('models.engine.file_storage.open', create=True,
+                   side_effect=OSError(28, "No space left on device")):
+            with self.assertRaises(OSError):
+                self.storage.save()
+        self.storage.save()
+
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertEqual(self.storage.get(User, user.id).first_name,
+                         "Holberton")
+
+    def test_compaction(self):
+        """Reaching the threshold rewrites the snapshot"""
+        for _ in range(10):
+            self.storage.new(BaseModel())
+        self.storage.save()
+
+        self.assertFalse(os.path.exists(self.storage.journal_path))
+        with open(FileStorage._FileStorage__file_path, 'r') as f:
+            self.assertEqual(len(json.load(f)), 10)
+
+
+class FileStorageClassIndexTests(StorageTestCase):
+    """Tests for the class index of FileStorage"""
+
+    def setUp(self):
+        """Creates the storage"""
+        super().setUp()
+        self.storage = FileStorage()
+
+    def test_get(self):
+        """get() finds an object by class and id"""
+        from models.user import User
+        user = User()
+        self.assertIs(self.storage.get(User, user.id), user)
+        self.assertIs(self.storage.get("User", user.id), user)
+        self.assertIsNone(self.storage.get("Place", user.id))
+
+    def test_count_and_all(self):
+        """count() and all() only consider the requested class"""
+        from models.user import User
+        users = [User() for _ in range(3)]
+        BaseModel()
+        self.assertEqual(self.storage.count("User"), 3)
+        self.assertEqual(self.storage.count(), 4)
+        self.assertEqual(
+            list(self.storage.all(User).values()), users)
+
+        self.storage.delete(users[0])
+        self.assertEqual(self.storage.count(User), 2)
+        self.assertNotIn(users[0], self.storage.all(User).values())
+
+    def test_replaced_objects(self):
+        """The index follows a replaced __objects dictionary"""
+        BaseModel()
+        FileStorage._FileStorage__objects = {}
+        self.assertEqual(self.storage.count("BaseModel"), 0)
+
+
+class FileStorageFindTests(StorageTestCase):
+    """Tests for the attribute indexes of FileStorage"""
+
+    def setUp(self):
+        """Creates the storage"""
+        super().setUp()
+        self.storage = FileStorage()
+
+    def test_find_indexed(self):
+        """find() follows changes of an indexed attribute"""
+        from models.review import Review
+        first = Review()
+        first.place_id = "p1"
+        second = Review()
+        second.place_id = "p1"
+        Review().place_id = "p2"
+
+        self.assertEqual(self.storage.find(Review, place_id="p1"),
+                         [first, second])
+        second.place_id = "p2"
+        self.assertEqual(self.storage.find("Review", place_id="p1"),
+                         [first])
+        self.storage.delete(first)
+        self.assertEqual(self.storage.find(Review, place_id="p1"), [])
+        self.assertEqual(len(self.storage.find(Review, place_id="p2")), 2)
+
+    def test_find_scan(self):
+        """find() scans the class for attributes without an index"""
+        from models.review import Review
+        review = Review()
+        review.place_id = "p1"
+        review.text = "Great"
+        Review().text = "Great"
+
+        self.assertEqual(
+            self.storage.find(Review, place_id="p1", text="Great"), [review])
+        self.assertEqual(len(self.storage.find(Review, text="Great")), 2)
+
+
+class FileStorageLazyTests(StorageTestCase):
+    """Tests for the lazy mode of FileStorage"""
+
+    def setUp(self):
+        """Saves a few objects in a temporary file"""
+        super().setUp()
+        from models.user import User
+        self.users = [User() for _ in range(3)]
+        self.users[0].first_name = "Betty"
+        BaseModel()
+        self.storage = FileStorage(lazy=True)
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+
+    def test_count_builds_nothing(self):
+        """count() answers from the parsed dictionaries"""
+        self.assertEqual(self.storage.count("User"), 3)
+        self.assertEqual(self.storage.count(), 4)
+        self.assertEqual(len(FileStorage._FileStorage__objects), 0)
+
+    def test_get_builds_one(self):
+        """get() only builds the requested instance"""
+        user = self.storage.get("User", self.users[0].id)
+        self.assertEqual(user.first_name, "Betty")
+        self.assertIs(self.storage.get("User", self.users[0].id), user)
+        self.assertIsNone(self.storage.get("User", self.users[1].id + "x"))
+        self.assertEqual(self.storage.count("User"), 3)
+
+    def test_save_keeps_unbuilt(self):
+        """save() writes the instances that were never built"""
+        self.storage.get("User", self.users[0].id).first_name = "Holberton"
+        self.storage.save()
+        with open(FileStorage._FileStorage__file_path, 'r') as f:
+            saved_data = json.load(f)
+        self.assertEqual(len(saved_data), 4)
+        self.assertEqual(
+            saved_data[f"User.{self.users[0].id}"]["first_name"], "Holberton")
+
+
+class FileStorageNDJSONTests(StorageTestCase):
+    """Tests for the line-delimited format of FileStorage"""
+
+    file_name = 'file.ndjson'
+
+    def setUp(self):
+        """Creates the storage"""
+        super().setUp()
+        self.storage = FileStorage(format='ndjson')
+
+    def test_one_record_per_line(self):
+        """save() writes one dictionary per line"""
+        models = [BaseModel() for _ in range(3)]
+        self.storage.save()
+
+        with open(FileStorage._FileStorage__file_path, 'r') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(records, [obj.to_dict() for obj in models])
+
+    def test_reload(self):
+        """reload() streams the records back with the journal applied"""
+        from models.user import User
+        storage = FileStorage(format='ndjson', journal=True)
+        user = User()
+        gone = BaseModel()
+        storage.compact()
+        user.first_name = "Betty"
+        storage.delete(gone)
+        storage.save()
+
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.count(), 1)
+        self.assertEqual(storage.get(User, user.id).first_name, "Betty")
+
+    def test_unknown_format(self):
+        """Only the json and ndjson formats exist"""
+        with self.assertRaises(ValueError):
+            FileStorage(format='xml')
+
+
+class FileStorageTransactionTests(StorageTestCase):
+    """Tests for the transactions of FileStorage"""
+
+    def setUp(self):
+        """Creates the storage"""
+        super().setUp()
+        self.storage = FileStorage()
+
+    def tearDown(self):
+        """Ends the transaction left open"""
+        self.storage.rollback()
+        super().tearDown()
+
+    def test_commit_saves_once(self):
+        """save() calls inside a transaction are deferred to commit"""
+        path = FileStorage._FileStorage__file_path
+        with self.storage.transaction():
+            for _ in range(5):
+                BaseModel().save()
+            self.assertFalse(os.path.exists(path))
+        self.assertFalse(self.storage.in_transaction)
+        with open(path, 'r') as f:
+            self.assertEqual(len(json.load(f)), 5)
+
+    def test_rollback(self):
+        """rollback() restores new, changed and deleted objects"""
+        kept = BaseModel()
+        kept.name = "before"
+        gone = BaseModel()
+
+        with self.assertRaises(KeyError):
+            with self.storage.transaction():
+                created = BaseModel()
+                kept.name = "after"
+                kept.number = 89
+                self.storage.delete(gone)
+                raise KeyError
+
+        self.assertIsNone(self.storage.get(BaseModel, created.id))
+        self.assertIs(self.storage.get(BaseModel, gone.id), gone)
+        self.assertEqual(kept.name, "before")
+        self.assertFalse(hasattr(kept, "number"))
+        self.assertEqual(self.storage.count(BaseModel), 2)
+
+    def test_nested(self):
+        """An inner commit hands its changes to the outer transaction"""
+        self.storage.begin()
+        self.storage.begin()
+        BaseModel().save()
+        self.storage.commit()
+        self.assertTrue(self.storage.in_transaction)
+        self.storage.rollback()
+        self.assertEqual(self.storage.count(), 0)
+
+    def test_nested_rollback(self):
+        """An inner rollback only undoes the changes made since its
+        begin(), and the outer transaction goes on
+        """
+        path = FileStorage._FileStorage__file_path
+        kept = BaseModel()
+        kept.name = "before"
+        with self.storage.transaction():
+            created = BaseModel()
+            kept.name = "outer"
+            created.save()
+            with self.assertRaises(KeyError):
+                with self.storage.transaction():
+                    BaseModel()
+                    kept.name = "inner"
+                    self.storage.delete(created)
+                    raise KeyError
+            self.assertTrue(self.storage.in_transaction)
+            self.assertEqual(kept.name, "outer")
+            self.assertIs(self.storage.get(BaseModel, created.id), created)
+
+        self.assertFalse(self.storage.in_transaction)
+        self.assertEqual(self.storage.count(), 2)
+        with open(path, 'r') as f:
+            self.assertEqual(len(json.load(f)), 2)
+
+
+class FileStorageFlushTests(StorageTestCase):
+    """Tests for the atomic and background writes of FileStorage"""
+
+    def test_atomic_save(self):
+        """save() replaces the file through a synced temporary file, and
+        syncs the directory holding the rename
+        """
+        storage = FileStorage()
+        BaseModel()
+        with patch('os.fsync', wraps=os.fsync) as fsync, \
+                patch('os.replace', wraps=os.replace) as replace:
+            storage.save()
+        self.assertEqual(fsync.call_count, 2)
+        self.assertEqual(os.listdir(self.temp_dir), ['file.json'])
+        temp_path = replace.call_args[0][0]
+        self.assertEqual(os.path.dirname(temp_path), self.temp_dir)
+        self.assertNotEqual(temp_path, self.path + ".tmp")
+
+    def test_failed_save_keeps_file(self):
+        """A failing write leaves the previous file untouched"""
+        storage = FileStorage()
+        BaseModel()
+        storage.save()
+        with open(self.path, 'r') as f:
+            before = f.read()
+
+        BaseModel()
+        with patch('os.fsync', side_effect=OSError):
+            with self.assertRaises(OSError):
+                storage.save()
+        with open(self.path, 'r') as f:
+            self.assertEqual(f.read(), before)
+        self.assertEqual(os.listdir(self.temp_dir), ['file.json'])
+
+    def test_background_flush(self):
+        """Saves within flush_interval are written together, later"""
+        storage = FileStorage(flush_interval=0.2)
+        with patch('os.replace', wraps=os.replace) as replace:
+            for _ in range(5):
+                BaseModel()
+                storage.save()
+            self.assertFalse(os.path.exists(self.path))
+            storage.flush()
+        self.assertEqual(replace.call_count, 1)
+        with open(self.path, 'r') as f:
+            self.assertEqual(len(json.load(f)), 5)
+
+    def test_failed_flush_kept(self):
+        """Changes whose write failed are written by the next one"""
+        storage = FileStorage(journal=True, flush_interval=60)
+        model = BaseModel()
+        storage.save()
+        with patch('models.engine.file_storage.open', create=True,
+                   side_effect=OSError):
+            with self.assertRaises(OSError):
+                storage.flush()
+        storage.save()
+        storage.flush()
+
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertIn(f"BaseModel.{model.id}", storage.all())
+
+    def test_background_writer(self):
+        """The background writer writes without an explicit flush"""
+        storage = FileStorage(flush_interval=0.01)
+        BaseModel()
+        storage.save()
+        for _ in range(100):
+            if os.path.exists(self.path):
+                break
+            time.sleep(0.01)
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_thread_safe(self):
+        """The background writer makes the instance thread-safe"""
+        self.assertTrue(FileStorage(flush_interval=60).thread_safe)
+        self.assertFalse(FileStorage().thread_safe)
+
+
+class FileStorageBinaryTests(StorageTestCase):
+    """Tests for the binary format of FileStorage"""
+
+    file_name = 'file.bin'
+
+    def test_round_trip(self):
+        """Binary snapshots reload the same dictionaries"""
+        from models.place import Place
+        storage = FileStorage(format='binary')
+        place = Place()
+        place.name = "Cozy"
+        place.max_guest = 4
+        place.latitude = 37.77
+        place.amenity_ids = ["a", "b"]
+        other = BaseModel.from_dict(dict(BaseModel().to_dict(),
+                                         id="not-a-uuid"))
+        storage.new(other)
+        other.nested = {"a": [1, None, True]}
+        other.huge = 10 ** 30
+        storage.save()
+        expected = {key: obj.to_dict() for key, obj in storage.all().items()}
+
+        with open(self.path, 'rb') as f:
+            self.assertTrue(f.read().startswith(b"HBNBBIN"))
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(
+            {key: obj.to_dict() for key, obj in storage.all().items()},
+            expected)
+
+    def test_auto_detect(self):
+        """A binary file is read whatever the configured format"""
+        BaseModel()
+        FileStorage(format='binary').save()
+        FileStorage._FileStorage__objects = {}
+        storage = FileStorage()
+        storage.reload()
+        self.assertEqual(storage.count(BaseModel), 1)
+
+        storage.save()
+        with open(self.path, 'r') as f:
+            self.assertEqual(len(json.load(f)), 1)
+
+    def test_reload_decodes_nothing(self):
+        """reload() maps a binary file and decodes a record when it is
+        looked up; save() copies the others as they are
+        """
+        models = [BaseModel() for _ in range(3)]
+        models[0].name = "Betty"
+        storage = FileStorage(format='binary')
+        storage.save()
+        with open(self.path, 'rb') as f:
+            before = f.read()
+        FileStorage._FileStorage__objects = {}
+        with patch.object(BinaryFormat, 'decode', autospec=True,
+                          side_effect=BinaryFormat.decode) as decode:
+            storage.reload()
+            self.assertEqual(storage.count(BaseModel), 3)
+            self.assertEqual(decode.call_count, 0)
+            model = storage.get(BaseModel, models[0].id)
+            self.assertEqual(decode.call_count, 1)
+            storage.save()
+            self.assertEqual(decode.call_count, 1)
+        self.assertEqual(model.name, "Betty")
+        with open(self.path, 'rb') as f:
+            self.assertEqual(len(f.read()), len(before))
+
+    def test_smaller_than_json(self):
+        """The binary file is smaller than the JSON one"""
+        for _ in range(20):
+            BaseModel().name = "Holberton"
+        FileStorage().save()
+        json_size = os.path.getsize(self.path)
+        FileStorage(format='binary').save()
+        self.assertLess(os.path.getsize(self.path), json_size / 2)
+
+
+class FileStorageIndexedTests(StorageTestCase):
+    """Tests for the indexed format of FileStorage"""
+
+    file_name = 'file.idx'
+
+    def reloaded(self, **options):
+        """Returns a storage reloaded from the saved file"""
+        FileStorage._FileStorage__objects = {}
+        storage = FileStorage(**options)
+        storage.reload()
+        return storage
+
+    def test_get_without_loading(self):
+        """get() decodes one record and builds nothing else"""
+        from models.user import User
+        models = [BaseModel() for _ in range(10)]
+        user = User()
+        user.email = "a@b.c"
+        FileStorage(format='indexed').save()
+        with open(self.path, 'rb') as f:
+            self.assertTrue(f.read().startswith(b"HBNBIDX"))
+
+        storage = self.reloaded(format='indexed')
+        self.assertEqual(len(FileStorage._FileStorage__objects), 0)
+        self.assertEqual(storage.count(), 11)
+        self.assertEqual(storage.count(User), 1)
+        found = storage.get(BaseModel, models[3].id)
+        self.assertEqual(found.to_dict(), models[3].to_dict())
+        self.assertIs(storage.get(BaseModel, models[3].id), found)
+        self.assertEqual(storage.get(User, user.id).email, "a@b.c")
+        self.assertIsNone(storage.get(User, models[0].id))
+        self.assertEqual(len(FileStorage._FileStorage__objects), 2)
+        self.assertEqual(storage.count(), 11)
+
+    def test_changes_round_trip(self):
+        """Built, new and deleted records are saved with the others"""
+        models = [BaseModel() for _ in range(5)]
+        FileStorage(format='indexed').save()
+
+        storage = self.reloaded(format='indexed')
+        storage.get(BaseModel, models[0].id).name = "changed"
+        storage.delete(storage.get(BaseModel, models[1].id))
+        storage.delete(models[2])
+        added = BaseModel()
+        self.assertEqual(storage.count(BaseModel), 4)
+        storage.save()
+
+        storage = self.reloaded()
+        self.assertEqual(storage.count(BaseModel), 4)
+        self.assertEqual(storage.get(BaseModel, models[0].id).name,
+                         "changed")
+        self.assertIsNone(storage.get(BaseModel, models[1].id))
+        self.assertIsNone(storage.get(BaseModel, models[2].id))
+        self.assertIsNotNone(storage.get(BaseModel, added.id))
+        self.assertEqual(set(storage.all(BaseModel)),
+                         {f"BaseModel.{obj.id}"
+                          for obj in (models[0], models[3], models[4],
+                                      added)})
+
+    def test_convert(self):
+        """An indexed file is read whatever the configured format"""
+        BaseModel()
+        FileStorage(format='indexed').save()
+        storage = self.reloaded()
+        storage.save()
+        with open(self.path, 'r') as f:
+            self.assertEqual(len(json.load(f)), 1)
+
+    def test_rollback(self):
+        """rollback() restores a mapped record deleted in a transaction"""
+        model = BaseModel()
+        FileStorage(format='indexed').save()
+        storage = self.reloaded(format='indexed')
+        with self.assertRaises(RuntimeError):
+            with storage.transaction():
+                storage.delete(storage.get(BaseModel, model.id))
+                raise RuntimeError
+        self.assertEqual(storage.get(BaseModel, model.id).to_dict(),
+                         model.to_dict())
+
+
+class FileStorageShardTests(StorageTestCase):
+    """Tests for the sharded mode of FileStorage"""
+
+    def reloaded(self, **options):
+        """Returns a sharded storage reloaded from the saved shards"""
+        FileStorage._FileStorage__objects = {}
+        storage = FileStorage(sharded=True, **options)
+        storage.reload()
+        return storage
+
+    def test_one_file_per_class(self):
+        """Each class is saved to its own file"""
+        from models.user import User
+        storage = FileStorage(sharded=True)
+        user = User()
+        models = [BaseModel(), BaseModel()]
+        storage.save()
+        self.assertEqual(sorted(os.listdir(self.temp_dir)),
+                         ['file.BaseModel.json', 'file.User.json'])
+        with open(storage.shard_path('BaseModel'), 'r') as f:
+            self.assertEqual(set(json.load(f)),
+                             {f"BaseModel.{obj.id}" for obj in models})
+
+        storage = self.reloaded()
+        self.assertEqual(storage.count(), 3)
+        self.assertEqual(storage.get(User, user.id).to_dict(),
+                         user.to_dict())
+
+    def test_only_dirty_shards_written(self):
+        """save() leaves the shards without changes alone"""
+        from models.user import User
+        storage = FileStorage(sharded=True)
+        user = User()
+        BaseModel()
+        storage.save()
+        path = storage.shard_path('BaseModel')
+        os.utime(path, (0, 0))
+        user.email = "a@b.c"
+        storage.save()
+        self.assertEqual(os.path.getmtime(path), 0)
+        self.assertEqual(self.reloaded().get(User, user.id).email, "a@b.c")
+
+    def test_failed_write_kept(self):
+        """Changes whose shard write failed are written by the next
+        save()
+        """
+        from models.user import User
+        storage = FileStorage(sharded=True)
+        user = User()
+        storage.save()
+        user.email = "a@b.c"
+        with patch('os.replace', side_effect=OSError):
+            with self.assertRaises(OSError):
+                storage.save()
+        storage.save()
+        self.assertEqual(self.reloaded().get(User, user.id).email, "a@b.c")
+
+    def test_shards_read_on_demand(self):
+        """Only the shards of the classes used are read"""
+        from models.user import User
+        storage = FileStorage(sharded=True)
+        user = User()
+        model = BaseModel()
+        storage.save()
+
+        storage = self.reloaded()
+        self.assertIsNotNone(storage.get(User, user.id))
+        self.assertEqual(list(FileStorage._FileStorage__objects),
+                         [f"User.{user.id}"])
+        storage.delete(storage.get(BaseModel, model.id))
+        storage.save()
+        self.assertEqual(self.reloaded().count(), 1)
+
+    def test_buckets(self):
+        """With buckets, a class is split over several files"""
+        storage = FileStorage(sharded=True, buckets=4)
+        models = [BaseModel() for _ in range(40)]
+        storage.save()
+        paths = [storage.shard_path('BaseModel', bucket)
+                 for bucket in range(4)]
+        self.assertEqual(sorted(os.listdir(self.temp_dir)),
+                         sorted(os.path.basename(path) for path in paths))
+
+        storage = self.reloaded(buckets=4)
+        self.assertEqual(set(storage.all(BaseModel)),
+                         {f"BaseModel.{obj.id}" for obj in models})
+        storage.get(BaseModel, models[0].id).name = "changed"
+        storage.save()
+        storage = self.reloaded(buckets=4)
+        self.assertEqual(storage.get(BaseModel, models[0].id).name,
+                         "changed")
+        self.assertEqual(storage.count(), 40)
+
+    def test_options(self):
+        """Sharded mode rejects the journal and the indexed format"""
+        with self.assertRaises(ValueError):
+            FileStorage(sharded=True, journal=True)
+        with self.assertRaises(ValueError):
+            FileStorage(sharded=True, format='indexed')
+        with self.assertRaises(ValueError):
+            FileStorage(sharded=True, buckets=0)
+
+
+class FileStorageWorkersTests(StorageTestCase):
+    """Tests for the parallel reload of FileStorage"""
+
+    def setUp(self):
+        """Saves BaseModels with a number each"""
+        super().setUp()
+        self.expected = {}
+        for i in range(50):
+            model = BaseModel()
+            model.number = i
+            self.expected[f"BaseModel.{model.id}"] = model.to_dict()
+
+    def reloaded(self, **options):
+        """Returns the dictionaries reloaded with options"""
+        FileStorage._FileStorage__objects = {}
+        storage = FileStorage(**options)
+        storage.reload()
+        return {key: obj.to_dict() for key, obj in storage.all().items()}
+
+    def test_chunks(self):
+        """chunks() covers the file with ranges ending on new lines"""
+        from models.engine.record_reader import chunks
+        FileStorage(format='ndjson').save()
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        ranges = chunks(self.path, 4)
+        self.assertEqual(len(ranges), 4)
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], len(data))
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, start)
+            self.assertEqual(data[end - 1:end], b"\n")
+
+    def test_ndjson_chunks(self):
+        """An ndjson file is reloaded in chunks by the workers"""
+        FileStorage(format='ndjson').save()
+        self.assertEqual(self.reloaded(format='ndjson', workers=3),
+                         self.expected)
+
+    def test_shards(self):
+        """The shards are reloaded by the workers"""
+        from models.user import User
+        user = User()
+        self.expected[f"User.{user.id}"] = user.to_dict()
+        FileStorage(sharded=True, buckets=4).save()
+        self.assertEqual(
+            self.reloaded(sharded=True, buckets=4, workers=2),
+            self.expected)
+
+    def test_console_start(self):
+        """The console starts with the workers set: the import-time
+        reload doesn't wait on worker processes importing models
+        """
+        FileStorage(format='ndjson').save()
+        root = os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.dirname(os.path.abspath(__file__)))))
+        env = dict(os.environ, HBNB_FILE_FORMAT='ndjson',
+                   HBNB_FILE_WORKERS='2', PYTHONPATH=root)
+        env.pop('HBNB_TYPE_STORAGE', None)
+        result = subprocess.run(
+            [sys.executable, os.path.join(root, 'console.py')],
+            input='count BaseModel\n', capture_output=True, text=True,
+            env=env, cwd=self.temp_dir, timeout=60)
+        self.assertIn('50', result.stdout.split())
+
+
+class FileStorageSelectTests(StorageTestCase):
+    """Tests for the numeric columns and select() of FileStorage"""
+
+    def setUp(self):
+        """Creates Places with various prices and capacities"""
+        super().setUp()
+        from models.place import Place
+        self.storage = FileStorage()
+        self.places = []
+        for price, guests in ((40, 2), (50, 4), (90, 6), (120, 4), (200, 8)):
+            place = Place()
+            place.price_by_night = price
+            place.max_guest = guests
+            self.places.append(place)
+
+    def ids(self, **bounds):
+        """Returns the set of the ids of the selected Places"""
+        from models.place import Place
+        return {obj.id for obj in self.storage.select(Place, **bounds)}
+
+    def test_ranges(self):
+        """select() keeps the Places within every range"""
+        places = self.places
+        self.assertEqual(self.ids(price_by_night=(50, 120),
+                                  max_guest=(4, None)),
+                         {places[1].id, places[2].id, places[3].id})
+        self.assertEqual(self.ids(price_by_night=(None, 50)),
+                         {places[0].id, places[1].id})
+        self.assertEqual(self.ids(max_guest=(9, None)), set())
+
+    def test_changes(self):
+        """Changed and deleted Places are kept up to date"""
+        places = self.places
+        places[0].price_by_night = "100"
+        places[4].price_by_night = "unknown"
+        self.storage.delete(places[2])
+        self.assertEqual(self.ids(price_by_night=(50, 120)),
+                         {places[0].id, places[1].id, places[3].id})
+
+    def test_without_columns(self):
+        """Attributes without a column are filtered by a scan"""
+        self.places[0].rating = 4.5
+        self.assertEqual(self.ids(rating=(4, 5)), {self.places[0].id})
+        model = BaseModel()
+        model.size = 3
+        self.assertEqual(self.storage.select(BaseModel, size=(1, 3)),
+                         [model])
+
+
+class FileStorageSpatialTests(StorageTestCase):
+    """Tests for the location queries of FileStorage"""
+
+    def setUp(self):
+        """Creates Places around the world"""
+        super().setUp()
+        from models.place import Place
+        self.storage = FileStorage()
+        self.places = {}
+        for name, lat, lon in (('sf', 37.7749, -122.4194),
+                               ('oakland', 37.8044, -122.2712),
+                               ('la', 34.0522, -118.2437),
+                               ('fiji', -17.7134, 178.065),
+                               ('samoa', -13.759, -172.1046)):
+            place = Place()
+            place.latitude = lat
+            place.longitude = lon
+            self.places[name] = place
+        Place().name = "nowhere"
+
+    def names(self, places):
+        """Returns the names of places"""
+        names = {id(place): name for name, place in self.places.items()}
+        return [names[id(place)] for place in places]
+
+    def test_places_within(self):
+        """places_within() returns the closest Places first"""
+        storage = self.storage
+        self.assertEqual(
+            self.names(storage.places_within(37.79, -122.3, 20)),
+            ['oakland', 'sf'])
+        self.assertEqual(
+            self.names(storage.places_within(37.7749, -122.4194, 600)),
+            ['sf', 'oakland', 'la'])
+        self.assertEqual(
+            self.names(storage.places_within(-16, 179.9, 500)),
+            ['fiji'])
+        self.assertEqual(
+            self.names(storage.places_within(-16, 179.9, 1000)),
+            ['fiji', 'samoa'])
+
+    def test_places_in_box(self):
+        """places_in_box() handles boxes crossing the 180th meridian"""
+        storage = self.storage
+        self.assertEqual(
+            sorted(self.names(storage.places_in_box(30, -125, 40, -120))),
+            ['oakland', 'sf'])
+        self.assertEqual(
+            sorted(self.names(storage.places_in_box(-20, 170, -10, -170))),
+            ['fiji', 'samoa'])
+
+    def test_changes(self):
+        """Moved and deleted Places are kept up to date"""
+        storage = self.storage
+        self.places['la'].latitude = "37.78"
+        self.places['la'].longitude = "-122.41"
+        storage.delete(self.places['oakland'])
+        self.assertEqual(
+            self.names(storage.places_within(37.7749, -122.4194, 20)),
+            ['sf', 'la'])
+
+    def test_same_as_scan(self):
+        """The grid returns what a scan of every Place returns"""
+        from models.engine.base_storage import BaseStorage
+        for lat, lon, km in ((37.7, -122.4, 50), (0, 0, 20000),
+                             (89.9, 0, 100), (-15, 180, 800)):
+            self.assertEqual(
+                self.storage.places_within(lat, lon, km),
+                BaseStorage.places_within(self.storage, lat, lon, km))
+
+    def test_follows(self):
+        """The grid follows the classes and attributes of its follows"""
+        from models.city import City
+        from models.engine.spatial import GridIndex
+        follows = dict(GridIndex.follows, City=('latitude', 'longitude'))
+        with patch.object(GridIndex, 'follows', follows):
+            FileStorage._FileStorage__objects = {}
+            city = City()
+            city.latitude = 1.5
+            city.longitude = 2.5
+            self.assertEqual(self.storage.places_in_box(0, 0, 3, 3), [city])
+            city.latitude = 5.5
+            self.assertEqual(self.storage.places_in_box(0, 0, 3, 3), [])
+
+    def test_invalid_queries(self):
+        """Positions off the earth, and radiuses that are negative or not
+        finite, raise ValueError in both engines' queries
+        """
+        from models.engine.base_storage import BaseStorage
+        nan, inf = float('nan'), float('inf')
+        for places_within in (self.storage.places_within,
+                              partial(BaseStorage.places_within,
+                                      self.storage)):
+            for lat, lon, km in ((0, 0, nan), (0, 0, inf), (0, 0, -1),
+                                 (nan, 0, 1), (0, -inf, 1), (91, 0, 1),
+                                 (0, 181, 1)):
+                with self.assertRaises(ValueError):
+                    places_within(lat, lon, km)
+        for places_in_box in (self.storage.places_in_box,
+                              partial(BaseStorage.places_in_box,
+                                      self.storage)):
+            for box in ((nan, 0, 1, 1), (0, 0, 1, inf), (-91, 0, 1, 1)):
+                with self.assertRaises(ValueError):
+                    places_in_box(*box)
+
+
+class FileStorageSearchTests(StorageTestCase):
+    """Tests for the text index of FileStorage"""
+
+    def setUp(self):
+        """Creates Places and a Review with text"""
+        super().setUp()
+        from models.place import Place
+        from models.review import Review
+        self.storage = FileStorage()
+        self.places = []
+        for name, description in (("Beach house", "Sea view"),
+                                  ("Loft", "Near the beach, beach bar"),
+                                  ("Cabin", "Quiet woods")):
+            place = Place()
+            place.name = name
+            place.description = description
+            self.places.append(place)
+        self.review = Review()
+        self.review.text = "Lovely beach"
+
+    def test_ranking(self):
+        """search() ranks the ids by the weight of the words found"""
+        from models.place import Place
+        places = self.places
+        self.assertEqual(self.storage.search(Place, "Beach"),
+                         [places[1].id, places[0].id])
+        self.assertEqual(self.storage.search(Place, "quiet sea"),
+                         sorted([places[0].id, places[2].id]))
+        self.assertEqual(self.storage.search('Review', "beach"),
+                         [self.review.id])
+        self.assertEqual(self.storage.search(Place, "mountain"), [])
+
+    def test_changes(self):
+        """Changed and deleted objects are kept up to date"""
+        from models.place import Place
+        self.storage.search(Place, "beach")
+        self.places[2].name = "Beach cabin"
+        self.storage.delete(self.places[1])
+        self.assertEqual(self.storage.search(Place, "beach"),
+                         sorted([self.places[0].id, self.places[2].id]))
+        self.storage.begin()
+        self.places[2].name = "Cabin"
+        self.storage.rollback()
+        self.assertIn(self.places[2].id, self.storage.search(Place, "beach"))
+
+    def test_saved_index(self):
+        """close() saves the index, and the first search() after
+        reload() reads it while the data is the same
+        """
+        from models.place import Place
+        self.storage.search(Place, "beach")
+        self.storage.save()
+        self.assertFalse(os.path.exists(self.storage.text_index_path))
+        self.storage.close()
+        self.assertTrue(os.path.exists(self.storage.text_index_path))
+
+        FileStorage._FileStorage__objects = {}
+        storage = FileStorage(lazy=True)
+        storage.reload()
+        self.assertFalse(FileStorage._FileStorage__text_ready)
+        # the changes not saved yet are indexed over the saved index
+        storage.get(Place, self.places[2].id).name = "Hut"
+        self.assertEqual(storage.search(Place, "beach"),
+                         [self.places[1].id, self.places[0].id])
+        self.assertEqual(storage.search(Place, "hut"), [self.places[2].id])
+        self.assertEqual(len(FileStorage._FileStorage__objects), 1)
+
+        # journal appends leave the saved index behind
+        FileStorage._FileStorage__objects = {}
+        storage = FileStorage(journal=True)
+        storage.reload()
+        storage.get(Place, self.places[2].id).name = "Loft"
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertFalse(FileStorage._FileStorage__text_ready)
+        self.assertEqual(storage.search(Place, "loft"),
+                         sorted([self.places[1].id, self.places[2].id]))
+
+
+class FileStorageReviewStatsTests(StorageTestCase):
+    """Tests for the review statistics of FileStorage"""
+
+    def setUp(self):
+        """Creates reviews of two places by two users"""
+        super().setUp()
+        from models.review import Review
+        self.storage = FileStorage()
+        self.reviews = []
+        for place_id, user_id in (('p1', 'u1'), ('p1', 'u2'), ('p2', 'u1')):
+            review = Review()
+            review.place_id = place_id
+            review.user_id = user_id
+            self.reviews.append(review)
+
+    def test_stats(self):
+        """Counts and latest dates follow the stored reviews"""
+        storage = self.storage
+        reviews = self.reviews
+        self.assertEqual(storage.review_stats('p1'),
+                         {'count': 2, 'latest': reviews[1].created_at})
+        self.assertEqual(storage.review_stats('p3'),
+                         {'count': 0, 'latest': None})
+        self.assertEqual(storage.user_review_count('u1'), 2)
+        self.assertEqual(storage.user_review_count('u3'), 0)
+
+    def test_changes(self):
+        """Moved, deleted and rolled back reviews are counted again"""
+        storage = self.storage
+        reviews = self.reviews
+        reviews[1].place_id = 'p2'
+        self.assertEqual(storage.review_stats('p1'),
+                         {'count': 1, 'latest': reviews[0].created_at})
+        self.assertEqual(storage.review_stats('p2')['count'], 2)
+        storage.delete(reviews[0])
+        self.assertEqual(storage.review_stats('p1'),
+                         {'count': 0, 'latest': None})
+        self.assertEqual(storage.user_review_count('u1'), 1)
+
+        storage.begin()
+        reviews[2].user_id = 'u2'
+        storage.rollback()
+        self.assertEqual(storage.user_review_count('u1'), 1)
+        self.assertEqual(storage.user_review_count('u2'), 1)
+        self.assertTrue(storage.recompute_review_stats())
+
+    def test_recompute(self):
+        """recompute_review_stats() tells when the stats were wrong"""
+        self.assertTrue(self.storage.recompute_review_stats())
+        # a change the storage isn't told about
+        object.__setattr__(self.reviews[0], 'place_id', 'p3')
+        self.assertFalse(self.storage.recompute_review_stats())
+        self.assertEqual(self.storage.review_stats('p3')['count'], 1)
+        self.assertTrue(self.storage.recompute_review_stats())
+
+
+class FileStorageRelationTests(StorageTestCase):
+    """Tests for the relationship accessors and storage.prefetch()"""
+
+    def setUp(self):
+        """Creates a state with a city holding two places"""
+        super().setUp()
+        from models.amenity import Amenity
+        from models.city import City
+        from models.place import Place
+        from models.review import Review
+        from models.state import State
+        self.state = State()
+        self.city = City()
+        self.city.state_id = self.state.id
+        self.places = [Place(), Place()]
+        self.amenity = Amenity()
+        for place in self.places:
+            place.city_id = self.city.id
+        self.places[0].amenity_ids = [self.amenity.id, 'missing']
+        self.review = Review()
+        self.review.place_id = self.places[0].id
+
+    def test_accessors(self):
+        """Relations return the related stored objects"""
+        self.assertEqual(self.state.related_cities, [self.city])
+        self.assertIs(self.city.related_state, self.state)
+        self.assertCountEqual(self.city.related_places, self.places)
+        self.assertEqual(self.places[0].related_reviews, [self.review])
+        self.assertEqual(self.places[1].related_reviews, [])
+        self.assertEqual(self.places[0].related_amenities, [self.amenity])
+        self.assertEqual(self.places[1].related_amenities, [])
+        self.assertIs(self.review.related_place, self.places[0])
+        self.assertIsNone(self.review.related_user)
+        with self.assertRaises(AttributeError):
+            self.state.related_cities = []
+
+    def test_attribute_named_like_relation(self):
+        """A stored attribute hidden by a relation is read back and
+        written again
+        """
+        from models.place import Place
+        place = self.places[0]
+        place.city = "Paris"
+        data = dict(place.to_dict(), related_city="Paris")
+        with open(self.path, 'w') as f:
+            json.dump({f"Place.{place.id}": data}, f)
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        loaded = storage.get(Place, place.id)
+        self.assertEqual(loaded.city, "Paris")
+        self.assertIsNone(loaded.related_city)
+        self.assertEqual(loaded.to_dict()["related_city"], "Paris")
+
+    def test_group_by(self):
+        """The attribute index and the scan group the same objects"""
+        from models.engine.base_storage import BaseStorage
+        from models.place import Place
+        ids = {self.city.id, 'other'}
+        self.assertEqual(
+            {value: sorted(obj.id for obj in objs) for value, objs in
+             storage.group_by(Place, 'city_id', ids).items()},
+            {value: sorted(obj.id for obj in objs) for value, objs in
+             BaseStorage.group_by(storage, Place, 'city_id', ids).items()})
+
+    def test_prefetch(self):
+        """prefetch() loads a relation at once until the next change"""
+        from models.place import Place
+        from models.review import Review
+        related = storage.prefetch(self.places, 'related_reviews')
+        self.assertEqual(related, {self.places[0].id: [self.review],
+                                   self.places[1].id: []})
+        with patch.object(FileStorage, 'group_by') as group_by:
+            self.assertEqual(self.places[0].related_reviews, [self.review])
+            self.assertEqual(self.places[1].related_reviews, [])
+            group_by.assert_not_called()
+
+        review = Review()
+        review.place_id = self.places[1].id
+        self.assertEqual(self.places[1].related_reviews, [review])
+
+    def test_prefetch_mixed(self):
+        """prefetch() takes objects of different classes"""
+        from models.user import User
+        user = User()
+        self.places[0].user_id = user.id
+        self.review.user_id = user.id
+        related = storage.prefetch(self.places + [self.review],
+                                   'related_user')
+        self.assertEqual(related, {self.places[0].id: user,
+                                   self.places[1].id: None,
+                                   self.review.id: user})
+        self.assertIs(self.review.related_user, user)
+
+
+class FileStorageSharedTests(StorageTestCase):
+    """Tests for the shared mode of FileStorage"""
+
+    def setUp(self):
+        """Creates the storage"""
+        super().setUp()
+        self.storage = FileStorage(shared=True)
+
+    def write_elsewhere(self, change):
+        """Saves the file as another process would, change being called
+        with the dictionary of the saved records
+        """
+        from models.engine.locks import FileLock
+        with FileLock(self.path) as lock:
+            with open(self.path, 'r') as f:
+                records = json.load(f)
+            change(records)
+            with open(self.path + ".tmp", 'w') as f:
+                json.dump(records, f)
+            os.replace(self.path + ".tmp", self.path)
+            lock.count_write()
+
+    def test_options(self):
+        """Shared mode needs a plain snapshot file"""
+        with self.assertRaises(ValueError):
+            FileStorage(shared=True, journal=True)
+        with self.assertRaises(ValueError):
+            FileStorage(shared=True, sharded=True)
+        with self.assertRaises(ValueError):
+            FileStorage(shared=True, format='indexed')
+
+    def test_merge_on_save(self):
+        """save() keeps the objects saved by another process"""
+        from models.user import User
+        first = User()
+        self.storage.save()
+        other = User.from_dict({'id': 'other', '__class__': 'User',
+                                'created_at': first.to_dict()['created_at'],
+                                'updated_at': first.to_dict()['updated_at']})
+        records = {"User.other": other.to_dict()}
+        self.write_elsewhere(lambda saved: saved.update(records))
+
+        third = User()
+        self.storage.save()
+        with open(self.path, 'r') as f:
+            saved = json.load(f)
+        self.assertEqual(set(saved), {f"User.{first.id}",
+                                      f"User.{other.id}",
+                                      f"User.{third.id}"})
+        self.assertIsNotNone(self.storage.get(User, other.id))
+
+    def test_refresh(self):
+        """refresh() reads the changed objects in place, and only when
+        the file changed
+        """
+        from models.user import User
+        kept, removed = User(), User()
+        self.storage.save()
+        self.assertFalse(self.storage.refresh())
+
+        def change(saved):
+            saved[f"User.{kept.id}"]['first_name'] = "Betty"
+            del saved[f"User.{removed.id}"]
+        self.write_elsewhere(change)
+        self.assertTrue(self.storage.refresh())
+        self.assertIs(self.storage.get(User, kept.id), kept)
+        self.assertEqual(kept.first_name, "Betty")
+        self.assertEqual(self.storage.find(User, first_name="Betty"),
+                         [kept])
+        self.assertIsNone(self.storage.get(User, removed.id))
+        self.assertFalse(self.storage.refresh())
+
+    def test_local_changes_kept(self):
+        """Objects changed since the last save keep their changes"""
+        from models.user import User
+        user = User()
+        self.storage.save()
+        user.first_name = "Holberton"
+
+        def change(saved):
+            saved[f"User.{user.id}"]['first_name'] = "Betty"
+        self.write_elsewhere(change)
+        self.storage.refresh()
+        self.assertEqual(user.first_name, "Holberton")
+        self.storage.save()
+        with open(self.path, 'r') as f:
+            saved = json.load(f)
+        self.assertEqual(saved[f"User.{user.id}"]['first_name'],
+                         "Holberton")
+
+    def test_no_refresh_on_write(self):
+        """Creating, changing and deleting objects don't read the file"""
+        from models.user import User
+        self.storage.save()
+        with patch.object(self.storage, 'refresh') as refresh:
+            user = User()
+            user.first_name = "Betty"
+            self.storage.delete(user)
+        refresh.assert_not_called()
+
+    def test_processes(self):
+        """No write is lost when processes save at the same time"""
+        script = ("from models.user import User\n"
+                  "for _ in range(25):\n"
+                  "    User().save()\n")
+        env = dict(os.environ, HBNB_FILE_SHARED='1',
+                   PYTHONPATH=os.path.dirname(os.path.dirname(
+                       os.path.dirname(os.path.dirname(
+                           os.path.abspath(__file__))))))
+        env.pop('HBNB_TYPE_STORAGE', None)
+        processes = [
+            subprocess.Popen([sys.executable, '-c', script], env=env,
+                             cwd=self.temp_dir)
+            for _ in range(4)
+            ]
+        for process in processes:
+            self.assertEqual(process.wait(), 0)
+        with open(self.path, 'r') as f:
+            self.assertEqual(len(json.load(f)), 100)
+
+    def test_binary_refresh(self):
+        """refresh() follows the changes another process saved over a
+        mapped binary file
+        """
+        from models.user import User
+        storage = FileStorage(shared=True, format='binary')
+        users = [User() for _ in range(3)]
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        script = ("from models import storage\n"
+                  "from models.user import User\n"
+                  f"storage.delete(storage.get(User, '{users[0].id}'))\n"
+                  "User()\n"
+                  "storage.save()\n")
+        env = dict(os.environ, HBNB_FILE_SHARED='1',
+                   HBNB_FILE_FORMAT='binary',
+                   PYTHONPATH=os.path.dirname(os.path.dirname(
+                       os.path.dirname(os.path.dirname(
+                           os.path.abspath(__file__))))))
+        env.pop('HBNB_TYPE_STORAGE', None)
+        subprocess.run([sys.executable, '-c', script], env=env,
+                       cwd=self.temp_dir, check=True)
+
+        self.assertTrue(storage.refresh())
+        self.assertEqual(storage.count(User), 3)
+        self.assertIsNone(storage.get(User, users[0].id))
+        self.assertEqual(len(storage.all(User)), 3)
+
+
+class ReadWriteLockTests(unittest.TestCase):
+    """Tests for the ReadWriteLock of locks.py"""
+
+    def setUp(self):
+        """Creates a lock"""
+        from models.engine.locks import ReadWriteLock
+        self.lock = ReadWriteLock()
+
+    def test_reentrant(self):
+        """The writer can read and write again, a reader read again"""
+        with self.lock:
+            with self.lock:
+                with self.lock.read():
+                    pass
+        with self.lock.read():
+            with self.lock.read():
+                with self.assertRaises(RuntimeError):
+                    self.lock.acquire_write()
+        with self.lock:
+            pass
+
+    def test_exclusion(self):
+        """Readers share the lock, a writer waits for them"""
+        import threading
+        events = []
+        reading = threading.Event()
+        with self.lock.read():
+            reader = threading.Thread(target=self.read_while, args=(
+                reading, events))
+            reader.start()
+            self.assertTrue(reading.wait(5))
+            writer = threading.Thread(target=self.write, args=(events,))
+            writer.start()
+            time.sleep(0.05)
+            events.append('read')
+        reader.join(5)
+        writer.join(5)
+        self.assertEqual(events, ['read', 'write'])
+
+    def read_while(self, reading, events):
+        """Holds the lock for reading until the main thread read"""
+        with self.lock.read():
+            reading.set()
+            while 'read' not in events:
+                time.sleep(0.01)
+
+    def write(self, events):
+        """Takes the lock for writing"""
+        with self.lock:
+            events.append('write')
+
+
+class FileStorageThreadTests(StorageTestCase):
+    """Tests for the thread-safe mode of FileStorage"""
+
+    def setUp(self):
+        """Creates the storage the models report their changes to"""
+        super().setUp()
+        self.storage = FileStorage(thread_safe=True)
+        patcher = patch('models.base_model.storage', self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_all_copy(self):
+        """all() returns a copy of the objects"""
+        model = BaseModel()
+        objects = self.storage.all()
+        self.assertIsNot(objects, FileStorage._FileStorage__objects)
+        self.assertEqual(objects, {f"BaseModel.{model.id}": model})
+
+    def test_set_under_lock(self):
+        """Attributes are set under the write side of the lock, so that
+        save() never encodes an object in the middle of a change
+        """
+        import threading
+        model = BaseModel()
+        thread = threading.Thread(target=setattr,
+                                  args=(model, 'name', "Betty"))
+        with self.storage._FileStorage__lock:
+            thread.start()
+            thread.join(0.1)
+            self.assertFalse(hasattr(model, 'name'))
+        thread.join()
+        self.assertEqual(model.name, "Betty")
+
+    def test_other_instances(self):
+        """A thread-safe instance leaves the lock of the others alone"""
+        from models.engine.file_storage import UNLOCKED
+        other = FileStorage()
+        self.assertIs(other.changing(), UNLOCKED)
+        self.assertIsNot(other._FileStorage__lock,
+                         self.storage._FileStorage__lock)
+        self.assertIs(FileStorage(thread_safe=True).changing(),
+                      self.storage.changing())
+
+    def test_stress(self):
+        """Readers, writers and saves run together without errors and
+        the last save holds every object
+        """
+        import threading
+        from models.place import Place
+        storage = self.storage
+        errors = []
+        done = threading.Event()
+        created = []
+
+        def run(function):
+            try:
+                function()
+            except Exception as error:
+                errors.append(error)
+                done.set()
+
+        def write():
+            for i in range(100):
+                place = Place()
+                place.city_id = f"city {i % 7}"
+                place.max_guest = i % 10
+                created.append(place.id)
+                if i % 3 == 0:
+                    storage.delete(place)
+                    created.remove(place.id)
+
+        def read():
+            while not done.is_set():
+                for obj in storage.all().values():
+                    obj.to_dict()
+                storage.find(Place, city_id="city 3")
+                storage.select(Place, max_guest=(2, 5))
+                storage.count(Place)
+
+        def save():
+            while not done.is_set():
+                storage.save()
+
+        threads = [threading.Thread(target=run, args=(read,))
+                   for _ in range(4)]
+        threads.append(threading.Thread(target=run, args=(save,)))
+        writers = [threading.Thread(target=run, args=(write,))
+                   for _ in range(3)]
+        for thread in threads + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        done.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+        storage.save()
+        with open(FileStorage._FileStorage__file_path, 'r') as f:
+            saved = json.load(f)
+        self.assertEqual(set(saved), {f"Place.{id}" for id in created})
+        self.assertEqual(len(storage.find(Place, city_id="city 3")),
+                         sum(1 for value in saved.values()
+                             if value['city_id'] == "city 3"))
+
+
 if __name__ == '__main__':
     unittest.main()
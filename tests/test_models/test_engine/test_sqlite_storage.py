@@ -0,0 +1,164 @@
+#!/usr/bin/python3
+"""Module for SQLiteStorage test"""
+import unittest
+import tempfile
+import shutil
+import os
+import threading
+from io import StringIO
+from unittest.mock import patch
+from models.engine.base_storage import BaseStorage
+from models.engine.sqlite_storage import SQLiteStorage
+from models.user import User
+from models.place import Place
+
+
+class SQLiteStorageTests(unittest.TestCase):
+    """Tests for the SQLite storage engine"""
+
+    def setUp(self):
+        """Opens a database in a temporary directory"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage = SQLiteStorage(os.path.join(self.temp_dir, 'hbnb.db'))
+        self.storage.reload()
+        self.patch = patch('models.base_model.storage', self.storage)
+        self.patch.start()
+
+    def tearDown(self):
+        """Closes the database and removes it"""
+        self.patch.stop()
+        self.storage.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_interface(self):
+        """SQLiteStorage implements the storage interface"""
+        self.assertIsInstance(self.storage, BaseStorage)
+
+    def test_save_reload(self):
+        """Saved objects are read back from the database"""
+        user = User()
+        user.first_name = "Betty"
+        user.save()
+        Place().save()
+
+        self.storage.reload()
+        copy = self.storage.get(User, user.id)
+        self.assertIsNot(copy, user)
+        self.assertEqual(copy.to_dict(), user.to_dict())
+        self.assertEqual(self.storage.count(User), 1)
+        self.assertEqual(self.storage.count(), 2)
+        self.assertEqual(list(self.storage.all("User")), [f"User.{user.id}"])
+
+    def test_update_and_delete(self):
+        """Changes and deletions reach the database on save()"""
+        user = User()
+        user.save()
+        user.first_name = "Holberton"
+        self.storage.save()
+        gone = Place()
+        gone.save()
+        self.storage.delete(gone)
+        self.storage.save()
+
+        self.storage.reload()
+        self.assertEqual(self.storage.get(User, user.id).first_name,
+                         "Holberton")
+        self.assertIsNone(self.storage.get(Place, gone.id))
+        self.assertEqual(self.storage.find(User, first_name="Holberton"),
+                         [self.storage.get(User, user.id)])
+
+    def test_threads(self):
+        """Other threads can use the storage"""
+        errors = []
+
+        def use():
+            try:
+                User().save()
+                self.storage.count(User)
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=use) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.storage.reload()
+        self.assertEqual(self.storage.count(User), 4)
+
+    def test_unsaved_changes_dropped(self):
+        """reload() forgets what was never saved"""
+        User()
+        self.assertEqual(self.storage.count(User), 1)
+        self.storage.reload()
+        self.assertEqual(self.storage.count(User), 0)
+
+    def test_transaction(self):
+        """Changes of a rolled back transaction never reach the database"""
+        with self.storage.transaction():
+            User().save()
+        with self.assertRaises(KeyError):
+            with self.storage.transaction():
+                Place().save()
+                raise KeyError
+
+        self.assertFalse(self.storage.in_transaction)
+        self.assertEqual(self.storage.count(User), 1)
+        self.assertEqual(self.storage.count(Place), 0)
+
+    def test_nested_rollback(self):
+        """An inner rollback only drops the changes of the savepoint"""
+        with self.storage.transaction():
+            user = User()
+            kept = User()
+            with self.assertRaises(KeyError):
+                with self.storage.transaction():
+                    Place()
+                    self.storage.delete(user)
+                    raise KeyError
+            self.assertTrue(self.storage.in_transaction)
+            self.assertIs(self.storage.get(User, kept.id), kept)
+            kept.first_name = "Betty"
+
+        self.storage.reload()
+        self.assertEqual(self.storage.count(User), 2)
+        self.assertEqual(self.storage.count(Place), 0)
+        self.assertIsNotNone(self.storage.get(User, user.id))
+        self.assertEqual(self.storage.get(User, kept.id).first_name, "Betty")
+
+    def test_nested_in_empty(self):
+        """A savepoint committed in a transaction that sent nothing yet
+        is still rolled back with it
+        """
+        self.storage.begin()
+        with self.storage.transaction():
+            User()
+            self.storage.save()
+        self.storage.rollback()
+
+        self.storage.reload()
+        self.assertEqual(self.storage.count(User), 0)
+
+    def test_console(self):
+        """The console works unchanged on the SQLite engine"""
+        from console import HBNBCommand
+        with patch('console.storage', self.storage):
+            with patch('sys.stdout', new=StringIO()) as f:
+                HBNBCommand().onecmd('create User first_name="Betty"')
+                user_id = f.getvalue().strip()
+            with patch('sys.stdout', new=StringIO()) as f:
+                HBNBCommand().onecmd(f'update User {user_id} age 89')
+                HBNBCommand().onecmd('count User')
+                HBNBCommand().onecmd(f'show User {user_id}')
+                output = f.getvalue()
+            self.assertTrue(output.startswith("1\n"))
+            self.assertIn("'age': '89'", output)
+            with patch('sys.stdout', new=StringIO()) as f:
+                HBNBCommand().onecmd(f'destroy User {user_id}')
+                HBNBCommand().onecmd('count User')
+                self.assertEqual(f.getvalue(), "0\n")
+
+
+if __name__ == '__main__':
+    unittest.main()